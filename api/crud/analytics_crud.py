@@ -2,16 +2,17 @@
 CRUD / Analytics operations for Book and Category.
 """
 
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 from sqlmodel import Session, select
 from sqlalchemy import func
-from db.database import engine
-from db.models import Book, Category
+from db.database import get_engine
+from db.models import Book, Category, CrawlRollup, CrawlRun
 
 
 def get_average_book_price() -> float | None:
     """Return the average price_incl_tax of all books."""
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         avg_price = session.exec(select(func.avg(Book.price_incl_tax))).one()
         return avg_price
 
@@ -21,7 +22,7 @@ def get_average_price_per_category() -> List[dict]:
     Return average price_incl_tax grouped by category.
     Each dict contains: {"category_name": str, "avg_price": float}.
     """
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         statement = (
             select(Category.name, func.avg(Book.price_incl_tax))
             .join(Book, Category.id == Book.category_id)
@@ -36,7 +37,7 @@ def get_top_categories_by_book_count(limit: int = 5) -> List[dict]:
     Return top N categories ordered by book count.
     Each dict contains: {"category_name": str, "book_count": int}.
     """
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         statement = (
             select(Category.name, func.count(Book.id))
             .join(Book, Category.id == Book.category_id)
@@ -46,3 +47,34 @@ def get_top_categories_by_book_count(limit: int = 5) -> List[dict]:
         )
         results = session.exec(statement).all()
         return [{"category_name": name, "book_count": count} for name, count in results]
+
+
+def get_rollup_history(
+    dimension: str,
+    dimension_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[dict]:
+    """
+    Return per-crawl aggregates of a dimension ("category" or "product_type"),
+    ordered by crawl then name. Reads the `crawl_rollups` table written at the
+    end of each crawl: cost grows with crawls x dimension values, not snapshots.
+    """
+    with Session(get_engine()) as session:
+        statement = (
+            select(CrawlRollup, CrawlRun.finished_at)
+            .join(CrawlRun, CrawlRun.id == CrawlRollup.crawl_id)
+            .where(CrawlRollup.dimension == dimension)
+        )
+        if dimension_id is not None:
+            statement = statement.where(CrawlRollup.dimension_id == dimension_id)
+        if since is not None:
+            statement = statement.where(CrawlRun.finished_at >= since)
+        if until is not None:
+            statement = statement.where(CrawlRun.finished_at < until)
+        statement = statement.order_by(CrawlRollup.crawl_id, CrawlRollup.dimension_name)
+        results = session.exec(statement).all()
+        return [
+            {**rollup.model_dump(exclude={"id", "dimension"}), "crawled_at": finished_at}
+            for rollup, finished_at in results
+        ]
@@ -2,109 +2,224 @@
 CRUD operations for Book and related models.
 """
 
-from typing import List, Optional, Type
+from typing import Iterable, List, Optional, Sequence, Tuple, Type
 from sqlmodel import Session, select
-from sqlalchemy.orm import selectinload
-from db.database import engine
+from sqlalchemy import Integer, String, any_, bindparam, desc, func, select as sql_select, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY
+from db.database import get_engine
 from db.models import Book, Category
-from api.schemas.book import BookSchema
-
-
-def get_all_books() -> List[BookSchema]:
-    """Retrieve all books with related category, product type, and tax."""
-    with Session(engine) as session:
-        statement = select(Book).options(
-            selectinload(Book.category),
-            selectinload(Book.product_type),
-            selectinload(Book.tax),
+from api.schemas.book import BookSchema, CategorySchema
+from api.crud.dimension_crud import dimensions
+from api.utils.formatter import BOOK_ROW_FIELDS
+
+
+def _keyset(statement, after_id: Optional[int], limit: Optional[int], key=Book.id):
+    """Order a statement by its primary key and apply keyset pagination bounds."""
+    statement = statement.order_by(key)
+    if after_id is not None:
+        statement = statement.where(key > after_id)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
+
+
+def _book_schemas(books: List[Book]) -> List[BookSchema]:
+    """Build book schemas, attaching category, product type and tax from the dimension cache."""
+    return [
+        BookSchema(
+            **book.model_dump(exclude={"category_id", "product_type_id", "tax_id"}),
+            **dimensions.relations(book.category_id, book.product_type_id, book.tax_id),
         )
-        books = session.exec(statement).all()
-        return [BookSchema.model_validate(book, from_attributes=True) for book in books]
-
-
-def get_all_categories() -> list[Category]:
-    """Return all categories."""
-    with Session(engine) as session:
-        statement = select(Category)
-        return session.exec(statement).all()
-
-
-def get_books_with_category(category_id: Optional[int] = None) -> List[BookSchema]:
-    """Retrieve books filtered by category ID if provided."""
-    with Session(engine) as session:
-        statement = select(Book).options(
-            selectinload(Book.category),
-            selectinload(Book.product_type),
-            selectinload(Book.tax),
-        )
-        if category_id is not None:
-            statement = statement.where(Book.category_id == category_id)
-        books = session.exec(statement).all()
-        return [BookSchema.model_validate(book, from_attributes=True) for book in books]
-
-
-def get_books_by_category_name(category_name: str) -> List[BookSchema]:
-    """Retrieve books filtered by category name (fuzzy search)."""
-    with Session(engine) as session:
-        statement = (
-            select(Book)
-            .join(Category)
-            .where(Category.name.ilike(f"%{category_name}%"))
-            .options(
-                selectinload(Book.category),
-                selectinload(Book.product_type),
-                selectinload(Book.tax),
-            )
-        )
-        books = session.exec(statement).all()
-        return [BookSchema.model_validate(book, from_attributes=True) for book in books]
-
-
-def get_books_by_title(title: str) -> List[BookSchema]:
-    """Retrieve books using fuzzy search on title."""
-    with Session(engine) as session:
-        statement = (
-            select(Book)
-            .where(Book.title.ilike(f"%{title}%"))
-            .options(
-                selectinload(Book.category),
-                selectinload(Book.product_type),
-                selectinload(Book.tax),
-            )
-        )
-        books = session.exec(statement).all()
-        return [BookSchema.model_validate(book, from_attributes=True) for book in books]
-
-
-def get_books_by_rating(min_rating: float = 0, max_rating: float = 5) -> List[BookSchema]:
-    """Retrieve books filtered by rating range."""
-    with Session(engine) as session:
-        statement = (
-            select(Book)
-            .where(Book.rating >= min_rating, Book.rating <= max_rating)
-            .options(
-                selectinload(Book.category),
-                selectinload(Book.product_type),
-                selectinload(Book.tax),
-            )
-        )
-        books = session.exec(statement).all()
-        return [BookSchema.model_validate(book, from_attributes=True) for book in books]
+        for book in books
+    ]
+
+
+# SQL expression of each row column (see `BOOK_ROW_FIELDS`). Relation attributes
+# are selected as the book's foreign key and resolved from the dimension cache
+# (`book_rows`), so no query joins the relation tables.
+BOOK_ROW_COLUMNS = {
+    "id": Book.id,
+    "title": Book.title,
+    "upc": Book.upc,
+    "price_excl_tax": Book.price_excl_tax,
+    "price_incl_tax": Book.price_incl_tax,
+    "availability": Book.availability,
+    "number_of_reviews": Book.number_of_reviews,
+    "rating": Book.rating,
+    "description": Book.description,
+    "image_url": Book.image_url,
+    "category_id": Book.category_id,
+    "category_name": Book.category_id,
+    "product_type_id": Book.product_type_id,
+    "product_type_type_name": Book.product_type_id,
+    "tax_id": Book.tax_id,
+    "tax_amount": Book.tax_id,
+}
+
+
+def book_rows_statement(columns: Optional[List[str]] = None):
+    """
+    Select books as plain column tuples (no ORM objects), in the order of `columns`
+    (defaults to the full `BOOK_ROW_FIELDS` layout). Only `books` is read: pass
+    the result through `book_rows` to fill in relation attributes.
+    """
+    columns = columns or BOOK_ROW_FIELDS
+    # Plain SQLAlchemy select: always yields row tuples, even for a single column
+    return sql_select(*(BOOK_ROW_COLUMNS[column] for column in columns)).select_from(Book)
+
+
+def book_rows(rows: Iterable[Sequence], columns: Optional[List[str]] = None) -> List[Tuple]:
+    """Replace the foreign keys selected for relation attributes by their values."""
+    resolve = dimensions.row_resolver(columns or BOOK_ROW_FIELDS)
+    if resolve is None:
+        return list(rows)
+    return [resolve(row) for row in rows]
+
+
+def _filter_books(
+    statement,
+    title: Optional[str] = None,
+    category_id: Optional[int] = None,
+    category_name: Optional[str] = None,
+    min_rating: Optional[float] = None,
+    max_rating: Optional[float] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_availability: Optional[int] = None,
+):
+    """
+    Apply any combination of book filters to a `book_rows_statement`. The
+    `title` substring search is served by the trigram index on `books.title`.
+    """
+    if title is not None:
+        statement = statement.where(Book.title.ilike(f"%{title}%"))
+    if category_id is not None:
+        statement = statement.where(Book.category_id == category_id)
+    if category_name is not None:
+        statement = statement.join(Category, Category.id == Book.category_id)
+        statement = statement.where(Category.name.ilike(f"%{category_name}%"))
+    if min_rating is not None:
+        statement = statement.where(Book.rating >= min_rating)
+    if max_rating is not None:
+        statement = statement.where(Book.rating <= max_rating)
+    if min_price is not None:
+        statement = statement.where(Book.price_incl_tax >= min_price)
+    if max_price is not None:
+        statement = statement.where(Book.price_incl_tax <= max_price)
+    if min_availability is not None:
+        statement = statement.where(Book.availability >= min_availability)
+    return statement
+
+
+def get_book_rows(
+    columns: Optional[List[str]] = None,
+    category_id: Optional[int] = None,
+    category_name: Optional[str] = None,
+    title: Optional[str] = None,
+    min_rating: Optional[float] = None,
+    max_rating: Optional[float] = None,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> List[Tuple]:
+    """
+    Fast path for book lists: one query returning row tuples of `columns`.
+    Filters can be combined.
+    """
+    columns = columns or BOOK_ROW_FIELDS
+    statement = _filter_books(
+        book_rows_statement(columns),
+        title=title,
+        category_id=category_id,
+        category_name=category_name,
+        min_rating=min_rating,
+        max_rating=max_rating,
+    )
+    statement = _keyset(statement, after_id, limit)
+    with Session(get_engine()) as session:
+        return book_rows(session.exec(statement), columns)
+
+
+def get_book_rows_by_keys(
+    columns: List[str],
+    ids: Optional[List[int]] = None,
+    upcs: Optional[List[str]] = None,
+) -> List[Tuple]:
+    """
+    Batch lookup of books by IDs or UPCs: one `= ANY(array)` query. Rows come
+    back in no particular order and only for the keys that exist; `columns`
+    must contain the key.
+    """
+    if ids is not None:
+        condition = Book.id == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+    else:
+        condition = Book.upc == any_(bindparam("upcs", upcs, type_=ARRAY(String)))
+    statement = book_rows_statement(columns).where(condition)
+    with Session(get_engine()) as session:
+        return book_rows(session.exec(statement), columns)
+
+
+# Row columns a book query can be sorted on (ties are broken by ID)
+SORTABLE_BOOK_COLUMNS = {
+    "id": int,
+    "title": str,
+    "price_excl_tax": float,
+    "price_incl_tax": float,
+    "availability": int,
+    "number_of_reviews": int,
+    "rating": int,
+}
+
+
+def query_books(
+    columns: List[str],
+    sort_by: str = "id",
+    descending: bool = False,
+    after: Optional[Tuple] = None,
+    limit: Optional[int] = None,
+    with_total: bool = False,
+    **filters,
+) -> List[Tuple]:
+    """
+    Composable book search: any mix of `_filter_books` filters and a sort, in a
+    single SQL statement. `after` is the (sort value, id) key of the last row of
+    the previous page. With `with_total`, each row gets a trailing
+    `count(*) OVER ()` value: the number of matching books, computed in the same
+    scan as the page itself.
+    """
+    sort_column = BOOK_ROW_COLUMNS[sort_by]
+    statement = _filter_books(book_rows_statement(columns), **filters)
+    if with_total:
+        statement = statement.add_columns(func.count().over())
+    if after is not None:
+        key = tuple_(sort_column, Book.id)
+        statement = statement.where(key < after if descending else key > after)
+    if descending:
+        statement = statement.order_by(desc(sort_column), desc(Book.id))
+    else:
+        statement = statement.order_by(sort_column, Book.id)
+    if limit is not None:
+        statement = statement.limit(limit)
+    with Session(get_engine()) as session:
+        # The trailing total (if any) is past the last relation column: kept as is
+        return book_rows(session.exec(statement), columns)
+
+
+def get_all_categories() -> list[CategorySchema]:
+    """Return all categories (from the dimension cache)."""
+    return dimensions.all_categories()
 
 
 def get_book_by_id(book_id: int) -> Optional[BookSchema]:
     """Retrieve a single book by its ID along with related category, product type, and tax."""
-    with Session(engine) as session:
-        statement = select(Book).where(Book.id == book_id).options(
-            selectinload(Book.category),
-            selectinload(Book.product_type),
-            selectinload(Book.tax),
-        )
-        book = session.exec(statement).first()
-        return BookSchema.model_validate(book, from_attributes=True) if book else None
+    with Session(get_engine()) as session:
+        book = session.exec(select(Book).where(Book.id == book_id)).first()
+        return _book_schemas([book])[0] if book else None
 
 
-def get_table_data(table_class: Type) -> List:
-    """Return all rows from a given table class."""
-    with Session(engine) as session:
-        return session.exec(select(table_class)).all()
+def get_table_data(
+    table_class: Type, after_id: Optional[int] = None, limit: Optional[int] = None
+) -> List:
+    """Return rows from a given table class, ordered by primary key."""
+    with Session(get_engine()) as session:
+        statement = _keyset(select(table_class), after_id, limit, key=table_class.id)
+        return session.exec(statement).all()
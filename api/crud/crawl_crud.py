@@ -0,0 +1,21 @@
+"""
+CRUD operations for CrawlRun (one row per completed crawl).
+"""
+
+from typing import Optional
+from sqlmodel import Session, select
+from sqlalchemy import func
+from db.crawl_lock import CRAWL_IN_PROGRESS
+from db.database import get_engine
+from db.models import CrawlRun
+
+
+def get_data_generation() -> Optional[int]:
+    """
+    Return the data generation (the latest crawl ID, 0 if none), or None while
+    a crawl is in progress: its items are committed one by one, so the data is
+    partial until the crawl is recorded (see `db.crawl_lock`).
+    """
+    with Session(get_engine()) as session:
+        latest, in_progress = session.exec(select(func.max(CrawlRun.id), CRAWL_IN_PROGRESS)).one()
+    return None if in_progress else latest or 0
@@ -0,0 +1,110 @@
+"""
+Process-wide cache of the dimension tables: categories, product types and taxes.
+
+These tables are tiny and only grow when the pipeline meets a new category,
+product type or tax. Book reads fetch `books` rows only and attach their
+relations from this cache instead of loading them for every request.
+The cache is reloaded when the data generation changes (a crawl ended) and
+when a book refers to an ID it does not know yet (an entry created by a
+crawl still running).
+"""
+
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from pydantic import BaseModel
+from sqlmodel import Session, select
+from db.database import get_engine
+from db.models import Category, ProductType, Tax
+from api.schemas.book import CategorySchema, ProductTypeSchema, TaxSchema
+from api.utils.cache import response_cache
+
+# Row column holding a relation attribute -> (dimension, attribute)
+DIMENSION_ROW_COLUMNS = {
+    "category_name": ("categories", "name"),
+    "product_type_type_name": ("product_types", "type_name"),
+    "tax_amount": ("taxes", "amount"),
+}
+
+
+class DimensionCache:
+    """In-memory copy of the dimension tables, keyed by ID."""
+
+    def __init__(self, generation_loader: Callable[[], Optional[int]] = response_cache.current_generation):
+        self.generation_loader = generation_loader
+        self.generation: Optional[int] = None
+        self.categories: Dict[int, CategorySchema] = {}
+        self.product_types: Dict[int, ProductTypeSchema] = {}
+        self.taxes: Dict[int, TaxSchema] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def reload(self) -> None:
+        """Read the three tables again (one session, three small queries)."""
+        with Session(get_engine()) as session:
+            categories = {c.id: CategorySchema(id=c.id, name=c.name) for c in session.exec(select(Category))}
+            product_types = {
+                p.id: ProductTypeSchema(id=p.id, type_name=p.type_name) for p in session.exec(select(ProductType))
+            }
+            taxes = {t.id: TaxSchema(id=t.id, amount=t.amount) for t in session.exec(select(Tax))}
+        self.categories, self.product_types, self.taxes = categories, product_types, taxes
+        self._loaded = True
+
+    def fresh(self) -> "DimensionCache":
+        """Reload first if never loaded or if a new crawl was recorded."""
+        generation = self.generation_loader()
+        if not self._loaded or (generation is not None and generation != self.generation):
+            with self._lock:
+                if not self._loaded or generation != self.generation:
+                    self.reload()
+                    self.generation = generation
+        return self
+
+    def _lookup(self, dimension: str, key: int):
+        entry = getattr(self, dimension).get(key)
+        if entry is None and key is not None:
+            # Created since the last load (e.g. by a crawl in progress)
+            with self._lock:
+                if key not in getattr(self, dimension):
+                    self.reload()
+            entry = getattr(self, dimension).get(key)
+        return entry
+
+    def relations(self, category_id: int, product_type_id: int, tax_id: int) -> Dict[str, BaseModel]:
+        """Return the `category`, `product_type` and `tax` of a book, as `BookSchema` expects them."""
+        self.fresh()
+        return {
+            "category": self._lookup("categories", category_id),
+            "product_type": self._lookup("product_types", product_type_id),
+            "tax": self._lookup("taxes", tax_id),
+        }
+
+    def all_categories(self) -> List[CategorySchema]:
+        """Return every category, ordered by ID."""
+        return sorted(self.fresh().categories.values(), key=lambda category: category.id)
+
+    def row_resolver(self, columns: Sequence[str]) -> Optional[Callable[[Sequence], Tuple]]:
+        """
+        Return a function replacing relation IDs by their attribute in book row
+        tuples (e.g. `category_name` is selected as `category_id`), or None if
+        `columns` holds no relation attribute.
+        """
+        positions = [
+            (index, *DIMENSION_ROW_COLUMNS[column])
+            for index, column in enumerate(columns)
+            if column in DIMENSION_ROW_COLUMNS
+        ]
+        if not positions:
+            return None
+        self.fresh()
+
+        def resolve(row: Sequence) -> Tuple:
+            values = list(row)
+            for index, dimension, attribute in positions:
+                entry = self._lookup(dimension, values[index])
+                values[index] = getattr(entry, attribute) if entry is not None else None
+            return tuple(values)
+
+        return resolve
+
+
+dimensions = DimensionCache()
@@ -0,0 +1,127 @@
+"""
+Streaming read operations for bulk exports of books and snapshots.
+
+Rows are read through a server-side cursor (`yield_per`) and yielded as flat
+dicts one at a time, or as batches of row tuples for columnar (Arrow) exports,
+so memory use does not grow with the size of the table.
+Snapshot exports also cover the Parquet archive (`db.archive`): the archived
+snapshots matching the filters are streamed first, one record batch at a time,
+then the hot window in Postgres.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from sqlmodel import Session, select
+from db.database import get_engine
+from db.models import Book, BookSnapshot
+from db.archive import get_snapshot_archive
+from api.crud.books_crud import book_rows_statement
+from api.crud.dimension_crud import dimensions
+from api.utils.formatter import BOOK_ROW_FIELDS, format_datetime
+
+EXPORT_BATCH_SIZE = 1000
+
+# Column names follow the flattened layout produced by `format_books`.
+# Tuples: they are the default `columns` of the functions below.
+BOOK_EXPORT_COLUMNS = tuple(BOOK_ROW_FIELDS)
+
+SNAPSHOT_EXPORT_COLUMNS = (
+    "id", "book_id", "scraped_at", "title", "price_excl_tax", "price_incl_tax",
+    "availability", "number_of_reviews", "rating",
+)
+
+
+def _book_export_statement(columns: Sequence[str]):
+    return (
+        book_rows_statement(list(columns))
+        .order_by(Book.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+
+def iter_books_for_export(columns: Sequence[str] = BOOK_EXPORT_COLUMNS) -> Iterator[Dict[str, Any]]:
+    """Yield every book with its category, product type and tax, ordered by ID."""
+    for rows in iter_book_row_batches(columns):
+        for row in rows:
+            yield dict(zip(columns, row))
+
+
+def iter_book_row_batches(columns: Sequence[str] = BOOK_EXPORT_COLUMNS) -> Iterator[List[Tuple]]:
+    """Yield every book as row tuples in `columns` order, ordered by ID, `EXPORT_BATCH_SIZE` rows at a time."""
+    resolve = dimensions.row_resolver(columns)
+    with Session(get_engine()) as session:
+        for partition in session.exec(_book_export_statement(columns)).partitions():
+            yield [resolve(row) for row in partition] if resolve is not None else partition
+
+
+def _snapshot_export_statement(
+    columns: Sequence[str],
+    book_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    statement = select(*(getattr(BookSnapshot, column) for column in columns))
+    if book_id is not None:
+        statement = statement.where(BookSnapshot.book_id == book_id)
+    if start is not None:
+        statement = statement.where(BookSnapshot.scraped_at >= start)
+    if end is not None:
+        statement = statement.where(BookSnapshot.scraped_at < end)
+    return statement.order_by(
+        BookSnapshot.book_id, BookSnapshot.scraped_at, BookSnapshot.id
+    ).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+def iter_snapshots_for_export(
+    book_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    columns: Sequence[str] = SNAPSHOT_EXPORT_COLUMNS,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield book snapshots, optionally for a single book and scraped in
+    [start, end): the archived ones, file by file (each file ordered by book
+    and scrape time), then the ones still in Postgres, ordered by book and
+    scrape time.
+    """
+    for rows in iter_snapshot_row_batches(book_id, start, end, columns):
+        for row in rows:
+            snapshot = dict(zip(columns, row))
+            if "scraped_at" in snapshot:
+                snapshot["scraped_at"] = format_datetime(snapshot["scraped_at"])
+            yield snapshot
+
+
+def iter_snapshot_row_batches(
+    book_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    columns: Sequence[str] = SNAPSHOT_EXPORT_COLUMNS,
+) -> Iterator[List[Tuple]]:
+    """Same as `iter_snapshots_for_export`, as row tuples in `columns` order, `EXPORT_BATCH_SIZE` rows at a time."""
+    yield from _iter_archived_row_batches(book_id, start, end, columns)
+    statement = _snapshot_export_statement(columns, book_id, start, end)
+    with Session(get_engine()) as session:
+        for partition in session.exec(statement).partitions():
+            yield partition
+
+
+def _iter_archived_row_batches(
+    book_id: Optional[int],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    columns: Sequence[str],
+) -> Iterator[List[Tuple]]:
+    """Archived snapshots matching the filters as row tuple batches, streamed file by file."""
+    archive = get_snapshot_archive()
+    if not archive.covers(start, end):
+        return
+    batches = archive.iter_batches(
+        book_ids=None if book_id is None else [book_id],
+        start=start,
+        end=end,
+        columns=columns,
+        batch_size=EXPORT_BATCH_SIZE,
+    )
+    for batch in batches:
+        yield list(zip(*(column.to_pylist() for column in batch.columns)))
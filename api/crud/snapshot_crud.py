@@ -1,25 +1,66 @@
 """
 CRUD operations for BookSnapshot (historical snapshots of books).
 Optimized for per-book analysis: price and rating evolution.
+
+Postgres only holds the latest snapshots of each book; older ones are in the
+Parquet archive (`db.archive`). Per-book history and time series read the
+archive too, only when the request reaches past what Postgres holds.
 """
 
-from typing import List, Dict
+from datetime import datetime
+from typing import Any, List, Dict, Optional, Sequence, Tuple
 from sqlmodel import Session, select
-from sqlalchemy import func, desc
-from db.database import engine
-from db.models import Book, BookSnapshot
+from sqlalchemy import Float, Integer, any_, bindparam, func, desc, literal_column, or_, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by
+from db.archive import get_snapshot_archive
+from db.database import get_engine
+from db.models import Book, BookSnapshot, CrawlRun
 from api.schemas.book import BookSnapshotSchema
 
 
-def get_snapshots_by_book_id(book_id: int) -> List[BookSnapshotSchema]:
-    """Retrieve all snapshots for a given book_id."""
-    with Session(engine) as session:
-        snapshots = session.exec(
+def get_snapshots_by_book_id(
+    book_id: int,
+    before: Optional[Tuple[datetime, int]] = None,
+    limit: Optional[int] = None,
+) -> List[BookSnapshotSchema]:
+    """
+    Retrieve snapshots for a given book_id, newest first.
+    `before` is the (scraped_at, id) key of the last snapshot of the previous page.
+    """
+    with Session(get_engine()) as session:
+        statement = (
             select(BookSnapshot)
             .where(BookSnapshot.book_id == book_id)
-            .order_by(desc(BookSnapshot.scraped_at))
-        ).all()
-        return [BookSnapshotSchema.model_validate(s, from_attributes=True) for s in snapshots]
+            .order_by(desc(BookSnapshot.scraped_at), desc(BookSnapshot.id))
+        )
+        if before is not None:
+            statement = statement.where(tuple_(BookSnapshot.scraped_at, BookSnapshot.id) < before)
+        if limit is not None:
+            statement = statement.limit(limit)
+        snapshots = [
+            BookSnapshotSchema.model_validate(s, from_attributes=True) for s in session.exec(statement).all()
+        ]
+    archive = get_snapshot_archive()
+    if (limit is None or len(snapshots) < limit) and archive.months():
+        # Past the hot window: archived snapshots are all older than the stored ones
+        archived = archive.read(book_ids=[book_id], before=before).sort_by(
+            [("scraped_at", "descending"), ("id", "descending")]
+        )
+        if limit is not None:
+            archived = archived.slice(0, limit - len(snapshots))
+        snapshots += [BookSnapshotSchema(**row) for row in archived.to_pylist()]
+    return snapshots
+
+
+def _archived_history(book_id: int, columns: Sequence[str]) -> List[Tuple]:
+    """Return the archived snapshots of a book as tuples of `columns`, oldest first."""
+    archive = get_snapshot_archive()
+    if not archive.months():
+        return []
+    table = archive.read(
+        book_ids=[book_id], columns=list(dict.fromkeys(["scraped_at", "id", *columns]))
+    ).sort_by([("scraped_at", "ascending"), ("id", "ascending")])
+    return list(zip(*(table[column].to_pylist() for column in columns)))
 
 
 def compare_snapshots_price(book_id: int) -> List[Dict]:
@@ -27,13 +68,14 @@ def compare_snapshots_price(book_id: int) -> List[Dict]:
     Return snapshots for a book showing only date + price evolution.
     Sorted by date ascending.
     """
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         snapshots = session.exec(
-            select(BookSnapshot)
+            select(BookSnapshot.scraped_at, BookSnapshot.price_incl_tax)
             .where(BookSnapshot.book_id == book_id)
             .order_by(BookSnapshot.scraped_at)
         ).all()
-        return [{"scraped_at": s.scraped_at, "price_incl_tax": s.price_incl_tax} for s in snapshots]
+    snapshots = _archived_history(book_id, ("scraped_at", "price_incl_tax")) + list(snapshots)
+    return [{"scraped_at": scraped_at, "price_incl_tax": price} for scraped_at, price in snapshots]
 
 
 def compare_snapshots_rating(book_id: int) -> List[Dict]:
@@ -41,23 +83,266 @@ def compare_snapshots_rating(book_id: int) -> List[Dict]:
     Return snapshots for a book showing only date + rating evolution.
     Sorted by date ascending.
     """
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         snapshots = session.exec(
-            select(BookSnapshot)
+            select(BookSnapshot.scraped_at, BookSnapshot.rating)
             .where(BookSnapshot.book_id == book_id)
             .order_by(BookSnapshot.scraped_at)
         ).all()
-        return [{"scraped_at": s.scraped_at, "rating": s.rating} for s in snapshots]
+    snapshots = _archived_history(book_id, ("scraped_at", "rating")) + list(snapshots)
+    return [{"scraped_at": scraped_at, "rating": rating} for scraped_at, rating in snapshots]
 
 
 def get_price_stats(book_id: int) -> Dict:
-    """Get min, max, and avg price_incl_tax for a book's historical snapshots."""
-    with Session(engine) as session:
-        min_price, max_price, avg_price = session.exec(
+    """Get min, max, and avg price_incl_tax for a book's historical snapshots (archive included)."""
+    with Session(get_engine()) as session:
+        count, min_price, max_price, total = session.exec(
             select(
+                func.count(BookSnapshot.id),
                 func.min(BookSnapshot.price_incl_tax),
                 func.max(BookSnapshot.price_incl_tax),
-                func.avg(BookSnapshot.price_incl_tax)
+                func.sum(BookSnapshot.price_incl_tax),
             ).where(BookSnapshot.book_id == book_id)
         ).one()
-        return {"min_price": min_price, "max_price": max_price, "avg_price": avg_price}
+    archived = [price for (price,) in _archived_history(book_id, ("price_incl_tax",))]
+    if archived:
+        prices = archived + ([min_price, max_price] if count else [])
+        min_price, max_price = min(prices), max(prices)
+        count, total = count + len(archived), (total or 0.0) + sum(archived)
+    avg_price = total / count if count else None
+    return {"min_price": min_price, "max_price": max_price, "avg_price": avg_price}
+
+
+# Time-series options: date_trunc units, metric columns and per-bucket aggregates
+TIMESERIES_INTERVALS = ("hour", "day", "week", "month")
+TIMESERIES_METRICS = {
+    "price": BookSnapshot.price_incl_tax,
+    "availability": BookSnapshot.availability,
+    "rating": BookSnapshot.rating,
+}
+TIMESERIES_AGGREGATIONS = {
+    "min": func.min,
+    "max": func.max,
+    # avg() of an integer column is NUMERIC in PostgreSQL: return floats
+    "avg": lambda column: func.avg(column).cast(Float),
+    # Value of the most recent snapshot in the bucket
+    "last": lambda column: func.array_agg(
+        aggregate_order_by(column, BookSnapshot.scraped_at.desc())
+    )[1],
+}
+
+
+def get_snapshot_timeseries(
+    book_ids: Optional[List[int]] = None,
+    category_id: Optional[int] = None,
+    interval: str = "day",
+    metrics: Sequence[str] = ("price",),
+    aggregations: Sequence[str] = ("avg",),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Bucket the snapshot history of many books (by IDs and/or category) in one
+    grouped query. Returns one dict per (book, bucket), ordered by book and time,
+    with a `<metric>_<aggregation>` key per requested combination.
+    """
+    if interval not in TIMESERIES_INTERVALS:
+        raise ValueError(f"Unsupported interval: {interval}")
+    if get_snapshot_archive().covers(start, end):
+        return _snapshot_timeseries_with_archive(
+            book_ids, category_id, interval, metrics, aggregations, start, end
+        )
+    # The unit is inlined (validated above) so SELECT and GROUP BY share one expression
+    bucket = func.date_trunc(literal_column(f"'{interval}'"), BookSnapshot.scraped_at).label("bucket")
+    values = [
+        TIMESERIES_AGGREGATIONS[aggregation](TIMESERIES_METRICS[metric]).label(f"{metric}_{aggregation}")
+        for metric in metrics
+        for aggregation in aggregations
+    ]
+    statement = select(BookSnapshot.book_id, bucket, *values)
+    if book_ids is not None:
+        statement = statement.where(
+            BookSnapshot.book_id == any_(bindparam("book_ids", book_ids, type_=ARRAY(Integer)))
+        )
+    if category_id is not None:
+        statement = statement.join(Book, Book.id == BookSnapshot.book_id).where(
+            Book.category_id == category_id
+        )
+    if start is not None:
+        statement = statement.where(BookSnapshot.scraped_at >= start)
+    if end is not None:
+        statement = statement.where(BookSnapshot.scraped_at < end)
+    statement = statement.group_by(BookSnapshot.book_id, bucket).order_by(BookSnapshot.book_id, bucket)
+
+    with Session(get_engine()) as session:
+        return [dict(row._mapping) for row in session.exec(statement)]
+
+
+# Per-bucket aggregates in pyarrow terms ("last" relies on the rows being sorted by time)
+ARROW_AGGREGATIONS = {"min": "min", "max": "max", "avg": "mean", "last": "last"}
+
+
+def _snapshot_timeseries_with_archive(
+    book_ids: Optional[List[int]],
+    category_id: Optional[int],
+    interval: str,
+    metrics: Sequence[str],
+    aggregations: Sequence[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+) -> List[Dict[str, Any]]:
+    """
+    `get_snapshot_timeseries` when the range reaches archived months: the
+    matching rows of Postgres (a few per book) and of the archive are bucketed
+    together with pyarrow, with the same results as the SQL path.
+    """
+    # pylint: disable=import-outside-toplevel  # pyarrow is only needed past the hot window
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from db.archive import archive_schema
+
+    columns = ["id", "book_id", "scraped_at", *dict.fromkeys(TIMESERIES_METRICS[m].key for m in metrics)]
+    statement = select(*(getattr(BookSnapshot, column) for column in columns))
+    with Session(get_engine()) as session:
+        if category_id is not None:
+            category_books = session.exec(select(Book.id).where(Book.category_id == category_id)).all()
+            requested = None if book_ids is None else set(book_ids)
+            book_ids = [i for i in category_books if requested is None or i in requested]
+        if book_ids is not None:
+            statement = statement.where(
+                BookSnapshot.book_id == any_(bindparam("book_ids", book_ids, type_=ARRAY(Integer)))
+            )
+        if start is not None:
+            statement = statement.where(BookSnapshot.scraped_at >= start)
+        if end is not None:
+            statement = statement.where(BookSnapshot.scraped_at < end)
+        hot_rows = session.exec(statement).all()
+
+    schema = archive_schema()
+    hot = pa.Table.from_pylist(
+        [dict(zip(columns, row)) for row in hot_rows], schema=pa.schema([schema.field(name) for name in columns])
+    )
+    archived = get_snapshot_archive().read(book_ids=book_ids, start=start, end=end, columns=columns)
+    table = pa.concat_tables([archived, hot]).sort_by(
+        [("book_id", "ascending"), ("scraped_at", "ascending"), ("id", "ascending")]
+    )
+    table = table.append_column(
+        "bucket", pc.floor_temporal(table["scraped_at"], unit=interval, week_starts_monday=True)
+    )
+    grouped = table.group_by(["book_id", "bucket"], use_threads=False).aggregate([
+        (TIMESERIES_METRICS[metric].key, ARROW_AGGREGATIONS[aggregation])
+        for metric in metrics
+        for aggregation in aggregations
+    ]).sort_by([("book_id", "ascending"), ("bucket", "ascending")])
+
+    rows = []
+    for row in grouped.to_pylist():
+        point = {"book_id": row["book_id"], "bucket": row["bucket"]}
+        for metric in metrics:
+            for aggregation in aggregations:
+                column = TIMESERIES_METRICS[metric].key
+                point[f"{metric}_{aggregation}"] = row[f"{column}_{ARROW_AGGREGATIONS[aggregation]}"]
+        rows.append(point)
+    return rows
+
+
+def get_latest_crawl_start() -> Optional[datetime]:
+    """Return when the latest recorded crawl started, or None if none was recorded."""
+    with Session(get_engine()) as session:
+        return session.exec(
+            select(CrawlRun.started_at).order_by(desc(CrawlRun.id)).limit(1)
+        ).first()
+
+
+def get_book_changes(
+    since: Optional[datetime] = None,
+    category_id: Optional[int] = None,
+    min_price_change: float = 0.0,
+    before: Optional[Tuple[datetime, int]] = None,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Return price/stock/rating changes, newest first, computed in one query.
+
+    A snapshot holds the values of a book just before a crawl updated it, so
+    the values that crawl stored are the next snapshot's (`LEAD()`), or the
+    current `books` row for the latest one. Only rows where something changed
+    (and the price moved by at least `min_price_change`) are returned.
+    `before` is the (changed_at, snapshot_id) key of the last row of the previous page.
+    """
+    window = {"partition_by": BookSnapshot.book_id, "order_by": (BookSnapshot.scraped_at, BookSnapshot.id)}
+
+    def next_value(snapshot_column, book_column):
+        return func.coalesce(func.lead(snapshot_column).over(**window), book_column)
+
+    history = (
+        select(
+            BookSnapshot.id.label("snapshot_id"),
+            BookSnapshot.book_id,
+            Book.title,
+            Book.category_id,
+            BookSnapshot.scraped_at.label("changed_at"),
+            BookSnapshot.price_incl_tax.label("old_price"),
+            next_value(BookSnapshot.price_incl_tax, Book.price_incl_tax).label("new_price"),
+            BookSnapshot.availability.label("old_availability"),
+            next_value(BookSnapshot.availability, Book.availability).label("new_availability"),
+            BookSnapshot.rating.label("old_rating"),
+            next_value(BookSnapshot.rating, Book.rating).label("new_rating"),
+        )
+        .join(Book, Book.id == BookSnapshot.book_id)
+    )
+    # Safe inside the window: a snapshot's successor is always more recent
+    if since is not None:
+        history = history.where(BookSnapshot.scraped_at >= since)
+    if category_id is not None:
+        history = history.where(Book.category_id == category_id)
+    history = history.subquery()
+
+    price_change = (history.c.new_price - history.c.old_price).label("price_change")
+    statement = select(history, price_change).where(
+        or_(
+            history.c.old_price != history.c.new_price,
+            history.c.old_availability != history.c.new_availability,
+            history.c.old_rating != history.c.new_rating,
+        )
+    )
+    if min_price_change > 0:
+        statement = statement.where(func.abs(price_change) >= min_price_change)
+    if before is not None:
+        statement = statement.where(tuple_(history.c.changed_at, history.c.snapshot_id) < before)
+    statement = statement.order_by(desc(history.c.changed_at), desc(history.c.snapshot_id))
+    if limit is not None:
+        statement = statement.limit(limit)
+
+    with Session(get_engine()) as session:
+        return [dict(row._mapping) for row in session.exec(statement)]
+
+
+def get_snapshot_rows_after(after_id: int = 0) -> List[Tuple]:
+    """
+    Bulk-read snapshots with an ID above `after_id` as plain tuples:
+    (id, book_id, scraped_at, price_incl_tax, availability, rating).
+    """
+    with Session(get_engine()) as session:
+        return session.exec(
+            select(
+                BookSnapshot.id, BookSnapshot.book_id, BookSnapshot.scraped_at,
+                BookSnapshot.price_incl_tax, BookSnapshot.availability, BookSnapshot.rating,
+            )
+            .where(BookSnapshot.id > after_id)
+            .order_by(BookSnapshot.id)
+        ).all()
+
+
+def get_snapshot_ids(max_id: int) -> List[int]:
+    """Return the IDs of the snapshots still stored up to `max_id` (others were archived)."""
+    with Session(get_engine()) as session:
+        return session.exec(select(BookSnapshot.id).where(BookSnapshot.id <= max_id)).all()
+
+
+def get_current_book_values() -> List[Tuple]:
+    """Return (id, category_id, price_incl_tax, availability, rating) for every book."""
+    with Session(get_engine()) as session:
+        return session.exec(
+            select(Book.id, Book.category_id, Book.price_incl_tax, Book.availability, Book.rating)
+        ).all()
@@ -1,14 +1,47 @@
 """
 Main FastAPI application entry point.
 Initializes the API and includes all route modules.
+On startup, the process warms itself up before it accepts connections (see
+`api.utils.warmup`); `/ready` reports the outcome.
 """
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from api.routes import books, analytics, snapshot
+from config.settings import settings
+from api.routes import books, analytics, snapshot, export, cache, metrics, events, health
+from api.utils.metrics import MetricsMiddleware
+from api.utils.warmup import startup_warmup
+
+
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    """
+    Warm the process up before the server accepts connections: with several
+    workers sharing one socket, only warm workers take requests. Past
+    API_WARMUP_TIMEOUT_SECONDS the worker starts anyway.
+    """
+    if settings.api_warmup:
+        try:
+            await asyncio.wait_for(startup_warmup.run(application), timeout=settings.api_warmup_timeout_seconds)
+        except asyncio.TimeoutError:
+            print(f"[WARNING] Warm-up not finished after {settings.api_warmup_timeout_seconds}s, starting anyway.")
+            startup_warmup.mark_ready()
+    else:
+        startup_warmup.mark_ready()
+    yield
+
 
-app = FastAPI(title="Books API")
+app = FastAPI(title="Books API", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 # Include API routers
 app.include_router(books.router)
 app.include_router(analytics.router)
-app.include_router(snapshot.router) 
\ No newline at end of file
+app.include_router(snapshot.router)
+app.include_router(export.router)
+app.include_router(cache.router)
+app.include_router(metrics.router)
+app.include_router(events.router)
+app.include_router(health.router)
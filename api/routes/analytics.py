@@ -2,17 +2,30 @@
 FastAPI routes for analytics endpoints.
 """
 
-from typing import List
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from typing import List, Optional
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query
 
-from api.schemas.analytics import AveragePricePerCategorySchema, TopCategorySchema
+from api.schemas.analytics import (
+    AveragePricePerCategorySchema,
+    BookVolatilitySchema,
+    CategoryHistogramSchema,
+    PriceHistogramSchema,
+    PricePercentilesSchema,
+    RollupHistorySchema,
+    TopCategorySchema,
+)
 from api.crud.analytics_crud import (
     get_average_book_price,
     get_average_price_per_category,
+    get_rollup_history,
     get_top_categories_by_book_count,
 )
+from api.utils.cache import CachedRoute
+from api.utils.snapshot_engine import snapshot_engine
 
-router = APIRouter(prefix="/analytics", tags=["analytics"])
+router = APIRouter(prefix="/analytics", tags=["analytics"], route_class=CachedRoute)
 
 
 @router.get("/average-book-price", response_model=float)
@@ -42,3 +55,94 @@ def read_top_categories(limit: int = 5) -> List[TopCategorySchema]:
     if not results:
         raise HTTPException(status_code=404, detail="No categories found")
     return [TopCategorySchema(**r) for r in results]
+
+
+@router.get("/history/categories", response_model=List[RollupHistorySchema])
+def read_category_history(
+    category_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[RollupHistorySchema]:
+    """Return per-crawl aggregates (count, prices, rating, stock) per category."""
+    results = get_rollup_history("category", category_id, since, until)
+    if not results:
+        raise HTTPException(status_code=404, detail="No category history found")
+    return [RollupHistorySchema(**r) for r in results]
+
+
+@router.get("/history/product-types", response_model=List[RollupHistorySchema])
+def read_product_type_history(
+    product_type_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[RollupHistorySchema]:
+    """Return per-crawl aggregates (count, prices, rating, stock) per product type."""
+    results = get_rollup_history("product_type", product_type_id, since, until)
+    if not results:
+        raise HTTPException(status_code=404, detail="No product type history found")
+    return [RollupHistorySchema(**r) for r in results]
+
+
+def _category_or_none(category_id: int) -> Optional[int]:
+    """Books that are no longer in the catalog have category -1."""
+    return None if category_id < 0 else int(category_id)
+
+
+@router.get("/volatility", response_model=List[BookVolatilitySchema])
+def read_price_volatility(
+    category_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=1000),
+) -> List[BookVolatilitySchema]:
+    """Return the books with the most volatile prices (std of log returns)."""
+    history = snapshot_engine.get()
+    stats = history.volatility()
+    candidates = np.flatnonzero(history.book_mask(category_id))
+    if not len(candidates):
+        raise HTTPException(status_code=404, detail="No books found")
+    top = candidates[np.argsort(-stats["volatility"][candidates], kind="stable")[:limit]]
+    latest = history.latest_price
+    return [
+        BookVolatilitySchema(
+            book_id=int(history.books[i]),
+            category_id=_category_or_none(history.category[i]),
+            observations=int(stats["observations"][i]),
+            price_changes=int(stats["price_changes"][i]),
+            volatility=float(stats["volatility"][i]),
+            latest_price=float(latest[i]),
+        )
+        for i in top
+    ]
+
+
+@router.get("/price-percentiles", response_model=PricePercentilesSchema)
+def read_price_percentiles(
+    category_id: Optional[int] = None,
+    q: List[float] = Query([5, 25, 50, 75, 95]),
+) -> PricePercentilesSchema:
+    """Return percentiles of the latest book prices, optionally for one category."""
+    if any(value < 0 or value > 100 for value in q):
+        raise HTTPException(status_code=422, detail="Percentiles must be between 0 and 100")
+    book_count, values = snapshot_engine.get().price_percentiles(q, category_id)
+    if not book_count:
+        raise HTTPException(status_code=404, detail="No books found")
+    return PricePercentilesSchema(
+        category_id=category_id,
+        book_count=book_count,
+        percentiles={f"p{value:g}": float(result) for value, result in zip(q, values)},
+    )
+
+
+@router.get("/price-histogram", response_model=PriceHistogramSchema)
+def read_price_histogram(bins: int = Query(10, ge=1, le=200)) -> PriceHistogramSchema:
+    """Return latest-price histograms per category, on bins shared by all categories."""
+    history = snapshot_engine.get()
+    if not len(history.books):
+        raise HTTPException(status_code=404, detail="No books found")
+    edges, categories, counts = history.price_histograms(bins)
+    return PriceHistogramSchema(
+        bin_edges=edges.tolist(),
+        categories=[
+            CategoryHistogramSchema(category_id=_category_or_none(category), counts=row.tolist())
+            for category, row in zip(categories, counts)
+        ],
+    )
@@ -2,31 +2,79 @@
 FastAPI routes for book endpoints.
 """
 
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Literal, Optional, Dict, Any
+import orjson
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import Response
 from db.models import Book, Category, ProductType, Tax
-from api.schemas.book import BookSchema
+from api.schemas.book import BookBatchRequestSchema, BookBatchResponseSchema, BookSchema, SimilarBookSchema
+from api.schemas.pagination import CountedPage, Page
 from api.crud.books_crud import (
-    get_all_books,
+    SORTABLE_BOOK_COLUMNS,
     get_all_categories,
-    get_books_by_category_name,
-    get_books_with_category,
-    get_books_by_title,
-    get_books_by_rating,
+    get_book_rows,
+    get_book_rows_by_keys,
     get_book_by_id,
     get_table_data,
+    query_books,
 )
-from api.utils.formatter import format_books
+from api.utils.formatter import BOOK_ROW_FIELDS, book_row_columns, format_book_rows
+from api.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, paginate
+from api.utils.cache import CachedRoute
+from api.utils.metrics import serialization_timer
+from db.similar_books import SIMILAR_BOOKS_K, get_similar_books_index
 
 
-router = APIRouter(prefix="/books", tags=["books"])
+router = APIRouter(prefix="/books", tags=["books"], route_class=CachedRoute)
 
 
-@router.get("/", response_model=List[BookSchema])
-def read_all_books(fields: Optional[List[str]] = Query(None)) -> List[Dict[str, Any]]:
-    """Return all books. Optionally select specific fields."""
-    books = get_all_books()
-    return format_books(books, fields, flatten=False)
+def _after_id(cursor: Optional[str]) -> Optional[int]:
+    """Decode a book list cursor into the last seen ID, or raise a 400."""
+    if cursor is None:
+        return None
+    try:
+        (after_id,) = decode_cursor(cursor, int)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return after_id
+
+
+def _page_of_books(
+    rows: List[Any],
+    limit: int,
+    fields: Optional[List[str]],
+    columns: List[str],
+    flatten: bool = False,
+    key: Optional[Callable[[Any], tuple]] = None,
+    total: Optional[int] = None,
+) -> Response:
+    """
+    Build a page of formatted books from a `limit + 1` fetch of `columns` row tuples.
+    The rows are serialized directly with orjson: `response_model` only documents
+    the payload and is not re-validated.
+    """
+    page, next_cursor = paginate(rows, limit, key=key or (lambda row: (row[0],)))
+    with serialization_timer():
+        payload = {
+            "items": format_book_rows(page, fields=fields, flatten=flatten, columns=columns),
+            "next_cursor": next_cursor,
+        }
+        if total is not None:
+            payload["total"] = total
+        content = orjson.dumps(payload)
+    return Response(content=content, media_type="application/json")
+
+
+@router.get("/", response_model=Page[BookSchema])
+def read_all_books(
+    fields: Optional[List[str]] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+) -> Response:
+    """Return a page of books ordered by ID. Optionally select specific fields."""
+    columns = book_row_columns(fields, flatten=False)
+    books = get_book_rows(columns, after_id=_after_id(cursor), limit=limit + 1)
+    return _page_of_books(books, limit, fields, columns)
 
 
 @router.get("/categories", response_model=List[Dict[str, Any]])
@@ -38,55 +86,174 @@ def read_all_categories() -> List[Dict[str, Any]]:
     return [{"id": c.id, "name": c.name} for c in categories]
 
 
-@router.get("/with-category", response_model=List[BookSchema])
+@router.get("/with-category", response_model=Page[BookSchema])
 def read_books_with_category(
-    category_id: Optional[int] = None, fields: Optional[List[str]] = Query(None)
-) -> List[Dict[str, Any]]:
-    """Return books filtered by category ID if provided."""
-    books = get_books_with_category(category_id)
-    return format_books(books, fields, flatten=False)
+    category_id: Optional[int] = None,
+    fields: Optional[List[str]] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+) -> Response:
+    """Return a page of books filtered by category ID if provided."""
+    columns = book_row_columns(fields, flatten=False)
+    books = get_book_rows(
+        columns, category_id=category_id, after_id=_after_id(cursor), limit=limit + 1
+    )
+    return _page_of_books(books, limit, fields, columns)
 
 
-@router.get("/search-title", response_model=List[BookSchema])
-def search_books_title(title: str = Query(..., min_length=1), fields: Optional[List[str]] = Query(None)) -> List[Dict[str, Any]]:
+@router.get("/search-title", response_model=Page[BookSchema])
+def search_books_title(
+    title: str = Query(..., min_length=1),
+    fields: Optional[List[str]] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+) -> Response:
     """Search books by fuzzy title."""
-    books = get_books_by_title(title)
+    columns = book_row_columns(fields, flatten=False)
+    books = get_book_rows(columns, title=title, after_id=_after_id(cursor), limit=limit + 1)
     if not books:
         raise HTTPException(status_code=404, detail="No books match this title")
-    return format_books(books, fields=fields, flatten=False)
+    return _page_of_books(books, limit, fields, columns)
 
 
-@router.get("/search-category", response_model=List[BookSchema])
-def search_books_category(category_name: str = Query(..., min_length=1), fields: Optional[List[str]] = Query(None)) -> List[Dict[str, Any]]:
+@router.get("/search-category", response_model=Page[BookSchema])
+def search_books_category(
+    category_name: str = Query(..., min_length=1),
+    fields: Optional[List[str]] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+) -> Response:
     """Search books by fuzzy category name."""
-    books = get_books_by_category_name(category_name)
+    columns = book_row_columns(fields, flatten=False)
+    books = get_book_rows(
+        columns, category_name=category_name, after_id=_after_id(cursor), limit=limit + 1
+    )
     if not books:
         raise HTTPException(status_code=404, detail="No books found for this category")
-    return format_books(books, fields=fields, flatten=False)
+    return _page_of_books(books, limit, fields, columns)
 
 
-@router.get("/search-rating", response_model=List[BookSchema])
+@router.get("/search-rating", response_model=Page[BookSchema])
 def search_books_rating(
     min_rating: float = Query(0, ge=0, le=5),
     max_rating: float = Query(5, ge=0, le=5),
     fields: Optional[List[str]] = Query(None),
-) -> List[Dict[str, Any]]:
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+) -> Response:
     """
     Retrieve books filtered by rating range.
-    Uses SQL filter via CRUD.
+    Uses a single SQL range filter via CRUD so pages are stable.
     """
-    books = []
-    # On récupère tous les ratings possibles et on filtre en Python (alternativement, on pourrait faire un CRUD SQL range)
-    for rating in range(int(min_rating*2), int(max_rating*2)+1):  # Convert float range to steps of 0.5 si rating float
-        books += get_books_by_rating(rating/2)
+    columns = book_row_columns(fields, flatten=False)
+    books = get_book_rows(
+        columns,
+        min_rating=min_rating,
+        max_rating=max_rating,
+        after_id=_after_id(cursor),
+        limit=limit + 1,
+    )
     if not books:
         raise HTTPException(status_code=404, detail="No books match this rating range")
-    return format_books(books, fields=fields, flatten=False)
+    return _page_of_books(books, limit, fields, columns)
+
+
+@router.get("/query", response_model=CountedPage[BookSchema])
+def query_books_combined(
+    title: Optional[str] = Query(None, min_length=1),
+    category_id: Optional[int] = None,
+    category_name: Optional[str] = Query(None, min_length=1),
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    max_rating: Optional[float] = Query(None, ge=0, le=5),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    min_availability: Optional[int] = Query(None, ge=0),
+    sort_by: Literal[
+        "id", "title", "price_excl_tax", "price_incl_tax",
+        "availability", "number_of_reviews", "rating",
+    ] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    fields: Optional[List[str]] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+) -> Response:
+    """
+    Search books with any combination of filters and a sort, in a single SQL query.
+    The total number of matches is computed with the first page and carried
+    in the cursor of the next ones.
+    """
+    columns = book_row_columns(fields, flatten=False)
+    if sort_by not in columns:
+        columns = [column for column in BOOK_ROW_FIELDS if column in columns or column == sort_by]
+    sort_index = columns.index(sort_by)
 
+    after, total = None, None
+    if cursor is not None:
+        try:
+            sort_value, after_id, total = decode_cursor(
+                cursor, SORTABLE_BOOK_COLUMNS[sort_by], int, int
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        after = (sort_value, after_id)
 
-@router.get("/table/{table_name}", response_model=List)
-def read_table(table_name: str) -> List:
-    """Return all rows from a table by its name."""
+    rows = query_books(
+        columns,
+        sort_by=sort_by,
+        descending=order == "desc",
+        after=after,
+        limit=limit + 1,
+        with_total=cursor is None,
+        title=title,
+        category_id=category_id,
+        category_name=category_name,
+        min_rating=min_rating,
+        max_rating=max_rating,
+        min_price=min_price,
+        max_price=max_price,
+        min_availability=min_availability,
+    )
+    if cursor is None:
+        total = rows[0][-1] if rows else 0
+        rows = [row[:-1] for row in rows]
+
+    return _page_of_books(
+        rows, limit, fields, columns,
+        key=lambda row: (row[sort_index], row[0], total),
+        total=total,
+    )
+
+
+@router.post("/batch", response_model=BookBatchResponseSchema)
+def read_books_batch(request: BookBatchRequestSchema) -> Response:
+    """
+    Resolve many books by ID or UPC in a single query.
+    Results follow the input order; unknown keys give `null` and are listed in `missing`.
+    """
+    key_field = "id" if request.ids is not None else "upc"
+    keys = request.ids if request.ids is not None else request.upcs
+    columns = book_row_columns(request.fields, flatten=False)
+    if key_field not in columns:
+        columns = [column for column in BOOK_ROW_FIELDS if column in columns or column == key_field]
+    rows = get_book_rows_by_keys(columns, ids=request.ids, upcs=request.upcs)
+
+    key_index = columns.index(key_field)
+    with serialization_timer():
+        formatted = format_book_rows(rows, fields=request.fields, flatten=False, columns=columns)
+        by_key = {row[key_index]: book for row, book in zip(rows, formatted)}
+        items = [by_key.get(key) for key in keys]
+        missing = [key for key, book in zip(keys, items) if book is None]
+        content = orjson.dumps({"items": items, "missing": missing})
+    return Response(content=content, media_type="application/json")
+
+
+@router.get("/table/{table_name}", response_model=Page[Any])
+def read_table(
+    table_name: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Return a page of rows from a table by its name, ordered by ID."""
     table_mapping = {
         "book": Book,
         "category": Category,
@@ -96,16 +263,22 @@ def read_table(table_name: str) -> List:
     table_class = table_mapping.get(table_name.lower())
     if not table_class:
         raise HTTPException(status_code=404, detail="Table not found")
-    return get_table_data(table_class)
+    rows = get_table_data(table_class, after_id=_after_id(cursor), limit=limit + 1)
+    page, next_cursor = paginate(rows, limit, key=lambda row: (row.id,))
+    return {"items": page, "next_cursor": next_cursor}
 
 
-@router.get("/formatted", response_model=List[Dict[str, Any]])
+@router.get("/formatted", response_model=Page[Dict[str, Any]])
 def get_books_formatted(
-    fields: Optional[List[str]] = Query(None), flatten: bool = True
-) -> List[Dict[str, Any]]:
-    """Return books formatted, optionally flattening nested relations."""
-    books = get_all_books()
-    return format_books(books, fields=fields, flatten=flatten)
+    fields: Optional[List[str]] = Query(None),
+    flatten: bool = True,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+) -> Response:
+    """Return a page of books formatted, optionally flattening nested relations."""
+    columns = book_row_columns(fields, flatten=flatten)
+    books = get_book_rows(columns, after_id=_after_id(cursor), limit=limit + 1)
+    return _page_of_books(books, limit, fields, columns, flatten=flatten)
 
 
 @router.get("/{book_id}", response_model=BookSchema)
@@ -115,3 +288,37 @@ def read_book_by_id(book_id: int) -> BookSchema:
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     return book
+
+
+@router.get("/{book_id}/similar", response_model=List[SimilarBookSchema])
+def read_similar_books(
+    book_id: int,
+    limit: int = Query(10, ge=1, le=SIMILAR_BOOKS_K),
+    fields: Optional[List[str]] = Query(None),
+) -> Response:
+    """
+    Return the books whose title, description and category are the most
+    similar to this book's, best first, from the precomputed index.
+    """
+    index = get_similar_books_index()
+    if index.load() is None:
+        raise HTTPException(status_code=503, detail="Similar books index not built yet")
+    neighbors = index.neighbors(book_id)
+    if neighbors is None:
+        raise HTTPException(status_code=404, detail="Book not found in the similar books index")
+    neighbor_ids, scores = neighbors[0][:limit].tolist(), neighbors[1][:limit].tolist()
+
+    columns = book_row_columns(fields, flatten=False)
+    rows = get_book_rows_by_keys(columns, ids=neighbor_ids) if neighbor_ids else []
+    id_index = columns.index("id")
+    with serialization_timer():
+        formatted = format_book_rows(rows, fields=fields, flatten=False, columns=columns)
+        by_id = {row[id_index]: book for row, book in zip(rows, formatted)}
+        # Books deleted since the last build are skipped
+        items = [
+            {"score": round(score, 6), "book": by_id[neighbor_id]}
+            for neighbor_id, score in zip(neighbor_ids, scores)
+            if neighbor_id in by_id
+        ]
+        content = orjson.dumps(items)
+    return Response(content=content, media_type="application/json")
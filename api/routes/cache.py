@@ -0,0 +1,16 @@
+"""
+FastAPI routes exposing the response cache metrics.
+"""
+
+from typing import Any, Dict
+from fastapi import APIRouter
+
+from api.utils.cache import response_cache
+
+router = APIRouter(prefix="/cache", tags=["cache"])
+
+
+@router.get("/stats", response_model=Dict[str, Any])
+def read_cache_stats() -> Dict[str, Any]:
+    """Return cache hits, misses, hit ratio, entry count and memory use."""
+    return response_cache.stats()
@@ -0,0 +1,61 @@
+"""
+Server-Sent Events stream of catalog changes (crawls landing, books created or changed).
+"""
+
+import asyncio
+from typing import AsyncIterator, List, Optional
+
+import orjson
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+
+from api.utils.events import EventSubscription, catalog_events
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+HEARTBEAT_SECONDS = 15.0
+
+
+def format_sse(event: dict) -> bytes:
+    """Format one event as an SSE message, named after its type."""
+    return b"event: " + event.get("type", "message").encode() + b"\ndata: " + orjson.dumps(event) + b"\n\n"
+
+
+async def _stream(subscription: EventSubscription) -> AsyncIterator[bytes]:
+    """Yield the subscription's events, with a comment line as heartbeat when idle."""
+    try:
+        yield b"retry: 5000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        catalog_events.unsubscribe(subscription)
+
+
+@router.get("")
+async def stream_events(
+    category_id: Optional[List[int]] = Query(None),
+    book_id: Optional[List[int]] = Query(None),
+) -> StreamingResponse:
+    """
+    Stream catalog events as Server-Sent Events (`text/event-stream`):
+    `crawl` when a crawl lands, `book` when a book is created or its price,
+    stock or rating changed. `category_id` / `book_id` (repeatable) restrict
+    `book` events to those categories or books.
+    """
+    subscription = catalog_events.subscribe(category_ids=category_id, book_ids=book_id)
+    return StreamingResponse(
+        _stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/stats")
+def read_event_stats() -> dict:
+    """Return the listener state, number of connected clients and event counters."""
+    return catalog_events.stats()
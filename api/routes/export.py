@@ -0,0 +1,115 @@
+"""
+FastAPI routes for streaming bulk exports of books and snapshots.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Literal, Optional, Sequence
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from api.crud.export_crud import (
+    BOOK_EXPORT_COLUMNS,
+    SNAPSHOT_EXPORT_COLUMNS,
+    iter_book_row_batches,
+    iter_books_for_export,
+    iter_snapshot_row_batches,
+    iter_snapshots_for_export,
+)
+from api.utils.export import (
+    book_arrow_schema,
+    iter_arrow_ipc,
+    iter_csv,
+    iter_gzip,
+    iter_ndjson,
+    snapshot_arrow_schema,
+)
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+ExportFormat = Literal["ndjson", "csv", "arrow", "arrows"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    # Arrow IPC file format (random access, memory-mappable) and stream format
+    "arrow": "application/vnd.apache.arrow.file",
+    "arrows": "application/vnd.apache.arrow.stream",
+}
+ARROW_FORMATS = ("arrow", "arrows")
+
+
+def _columns(requested: Optional[List[str]], available: Sequence[str]) -> List[str]:
+    """Selected columns in the requested order (all of them by default), or raise a 400."""
+    if not requested:
+        return list(available)
+    unknown = [column for column in requested if column not in available]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown columns: {', '.join(unknown)}. Available: {', '.join(available)}",
+        )
+    return list(dict.fromkeys(requested))
+
+
+def _stream(
+    rows: Iterator[Dict[str, Any]],
+    columns: List[str],
+    name: str,
+    fmt: str,
+    gzip: bool,
+) -> StreamingResponse:
+    """Wrap a row iterator into an NDJSON/CSV streaming response, optionally gzipped."""
+    body = iter_ndjson(rows) if fmt == "ndjson" else iter_csv(rows, columns)
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{fmt}"'}
+    if gzip:
+        body = iter_gzip(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+
+def _stream_arrow(batches: Iterator[Sequence], schema, name: str, fmt: str, gzip: bool) -> StreamingResponse:
+    """Wrap row batches into an Arrow IPC streaming response (one record batch per DB batch)."""
+    if gzip:
+        raise HTTPException(status_code=400, detail="Arrow exports are not compressed, so they can be memory-mapped")
+    body = iter_arrow_ipc(batches, schema, file_format=fmt == "arrow")
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{fmt}"'}
+    return StreamingResponse(body, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+
+@router.get("/books")
+def export_books(
+    format: ExportFormat = "ndjson",  # pylint: disable=redefined-builtin
+    gzip: bool = False,
+    columns: Optional[List[str]] = Query(None),
+) -> StreamingResponse:
+    """
+    Stream every book with its category, product type and tax as NDJSON, CSV
+    or Arrow IPC (`arrow`: file format, `arrows`: stream format).
+    `columns` (repeatable) selects and orders the exported columns.
+    """
+    columns = _columns(columns, BOOK_EXPORT_COLUMNS)
+    if format in ARROW_FORMATS:
+        return _stream_arrow(iter_book_row_batches(columns), book_arrow_schema(columns), "books", format, gzip)
+    return _stream(iter_books_for_export(columns), columns, "books", format, gzip)
+
+
+@router.get("/snapshots")
+def export_snapshots(
+    format: ExportFormat = "ndjson",  # pylint: disable=redefined-builtin
+    gzip: bool = False,
+    book_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    columns: Optional[List[str]] = Query(None),
+) -> StreamingResponse:
+    """
+    Stream book snapshots as NDJSON, CSV or Arrow IPC, optionally for a single
+    book and scraped in [start, end). `columns` (repeatable) selects and orders
+    the exported columns.
+    """
+    columns = _columns(columns, SNAPSHOT_EXPORT_COLUMNS)
+    if format in ARROW_FORMATS:
+        batches = iter_snapshot_row_batches(book_id, start, end, columns)
+        return _stream_arrow(batches, snapshot_arrow_schema(columns), "book_snapshots", format, gzip)
+    rows = iter_snapshots_for_export(book_id, start, end, columns)
+    return _stream(rows, columns, "book_snapshots", format, gzip)
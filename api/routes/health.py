@@ -0,0 +1,17 @@
+"""
+Readiness endpoint for load balancers and orchestrators.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from api.utils.warmup import startup_warmup
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/ready")
+def read_readiness() -> JSONResponse:
+    """Return 200 once the process is warmed up, 503 before; with the warm-up steps."""
+    stats = startup_warmup.stats()
+    return JSONResponse(stats, status_code=200 if stats["ready"] else 503)
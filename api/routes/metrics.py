@@ -0,0 +1,73 @@
+"""
+Prometheus endpoint: request metrics, SQL totals, connection pool, cache and event stream stats.
+Every sample is labelled with the `worker` that answered (see `api.utils.metrics`).
+"""
+
+from typing import Dict, List
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from db.database import get_engine, query_totals
+from api.utils.cache import response_cache
+from api.utils.events import catalog_events
+from api.utils.metrics import REQUEST_METRICS, format_labels, worker_labels
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _sample(name: str, metric_type: str, help_text: str, value: float, labels: Dict[str, str]) -> List[str]:
+    """Return a single sample with `labels` in Prometheus text format."""
+    return [
+        f"# HELP {name} {help_text}",
+        f"# TYPE {name} {metric_type}",
+        f"{name}{format_labels(tuple(labels), tuple(labels.values()))} {value:g}",
+    ]
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def read_metrics() -> PlainTextResponse:
+    """Return all metrics of the answering worker in Prometheus text format."""
+    worker = worker_labels()
+    lines = []
+    for metric in REQUEST_METRICS:
+        lines += metric.render(worker)
+
+    samples = [
+        ("db_queries_total", "counter", "SQL queries run by this process.", query_totals.queries),
+        (
+            "db_query_duration_seconds_total", "counter", "Time spent in SQL queries by this process.",
+            query_totals.seconds,
+        ),
+    ]
+
+    pool = get_engine().pool
+    for name, help_text, stat in [
+        ("db_pool_size", "Configured size of the connection pool.", "size"),
+        ("db_pool_checked_out", "Connections currently in use.", "checkedout"),
+        ("db_pool_checked_in", "Idle connections in the pool.", "checkedin"),
+        ("db_pool_overflow", "Connections opened beyond the pool size.", "overflow"),
+    ]:
+        if hasattr(pool, stat):
+            # QueuePool.overflow() is negative until the pool has been filled
+            samples.append((name, "gauge", help_text, max(getattr(pool, stat)(), 0)))
+
+    cache = response_cache.stats()
+    samples += [
+        ("api_cache_hits_total", "counter", "Response cache hits.", cache["hits"]),
+        ("api_cache_misses_total", "counter", "Response cache misses.", cache["misses"]),
+        ("api_cache_entries", "gauge", "Responses currently cached.", cache["entries"]),
+        ("api_cache_memory_bytes", "gauge", "Memory used by cached responses.", cache["memory_bytes"]),
+        ("api_data_generation", "gauge", "Latest crawl id seen by the API.", cache["generation"] or 0),
+    ]
+
+    events = catalog_events.stats()
+    samples += [
+        ("api_event_subscriptions", "gauge", "Clients connected to /events.", events["subscriptions"]),
+        ("api_events_received_total", "counter", "Catalog events received with LISTEN.", events["events_received"]),
+    ]
+
+    for sample in samples:
+        lines += _sample(*sample, worker)
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=PROMETHEUS_CONTENT_TYPE)
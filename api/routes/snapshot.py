@@ -1,24 +1,44 @@
-from typing import List, Dict, Any
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+from typing import List, Dict, Any, Literal, Optional
+from fastapi import APIRouter, HTTPException, Query
 
-from api.schemas.book import BookSnapshotSchema
+from api.schemas.book import BookChangeSchema, BookSnapshotSchema, SnapshotTimeSeriesSchema
+from api.schemas.pagination import Page
 from api.crud.snapshot_crud import (
     get_snapshots_by_book_id,
     compare_snapshots_price,
     compare_snapshots_rating,
+    get_snapshot_timeseries,
+    get_book_changes,
+    get_latest_crawl_start,
 )
-from api.utils.formatter import format_books
+from api.utils.formatter import format_books, format_datetime
+from api.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, paginate
+from api.utils.cache import CachedRoute
 
-router = APIRouter(prefix="/snapshots", tags=["snapshots"])
+router = APIRouter(prefix="/snapshots", tags=["snapshots"], route_class=CachedRoute)
 
 
-@router.get("/book/{book_id}", response_model=List[BookSnapshotSchema])
-def read_snapshots_by_book(book_id: int) -> List[BookSnapshotSchema]:
-    """Return all snapshots for a specific book by ID."""
-    snapshots = get_snapshots_by_book_id(book_id)
-    if not snapshots:
+@router.get("/book/{book_id}", response_model=Page[BookSnapshotSchema])
+def read_snapshots_by_book(
+    book_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Return a page of snapshots for a specific book by ID, newest first."""
+    before = None
+    if cursor is not None:
+        try:
+            before = decode_cursor(cursor, datetime, int)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+    snapshots = get_snapshots_by_book_id(book_id, before=before, limit=limit + 1)
+    if not snapshots and before is None:
         raise HTTPException(status_code=404, detail="No snapshots found for this book")
-    return snapshots
+    page, next_cursor = paginate(snapshots, limit, key=lambda s: (s.scraped_at, s.id))
+    return {"items": page, "next_cursor": next_cursor}
 
 
 @router.get("/compare-price/{book_id}", response_model=List[Dict[str, Any]])
@@ -37,3 +57,70 @@ def compare_rating(book_id: int) -> List[Dict[str, Any]]:
     if not snapshots:
         raise HTTPException(status_code=404, detail="No snapshots found to compare ratings")
     return snapshots
+
+
+@router.get("/timeseries", response_model=SnapshotTimeSeriesSchema)
+def read_snapshot_timeseries(
+    book_ids: Optional[List[int]] = Query(None, max_length=1000),
+    category_id: Optional[int] = None,
+    interval: Literal["hour", "day", "week", "month"] = "day",
+    metrics: List[Literal["price", "availability", "rating"]] = Query(["price"]),
+    aggregations: List[Literal["min", "max", "avg", "last"]] = Query(["avg"]),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Return the snapshot history of many books (by IDs and/or a category),
+    bucketed by `interval`, with the requested aggregations of each metric.
+    """
+    if book_ids is None and category_id is None:
+        raise HTTPException(status_code=400, detail="Provide book_ids or category_id")
+    rows = get_snapshot_timeseries(
+        book_ids=book_ids,
+        category_id=category_id,
+        interval=interval,
+        metrics=list(dict.fromkeys(metrics)),
+        aggregations=list(dict.fromkeys(aggregations)),
+        start=start,
+        end=end,
+    )
+    if not rows:
+        raise HTTPException(status_code=404, detail="No snapshots found for these books")
+    series = []
+    for book_id, points in groupby(rows, key=itemgetter("book_id")):
+        points = [{key: value for key, value in point.items() if key != "book_id"} for point in points]
+        for point in points:
+            point["bucket"] = format_datetime(point["bucket"])
+        series.append({"book_id": book_id, "points": points})
+    return {"interval": interval, "series": series}
+
+
+@router.get("/changes", response_model=Page[BookChangeSchema])
+def read_book_changes(
+    since: Optional[datetime] = None,
+    category_id: Optional[int] = None,
+    min_price_change: float = Query(0.0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Return books whose price, stock or rating changed, newest first.
+    Defaults to the changes of the latest crawl when `since` is not given.
+    """
+    before = None
+    if cursor is not None:
+        try:
+            before = decode_cursor(cursor, datetime, int)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if since is None:
+        since = get_latest_crawl_start()
+    changes = get_book_changes(
+        since=since,
+        category_id=category_id,
+        min_price_change=min_price_change,
+        before=before,
+        limit=limit + 1,
+    )
+    page, next_cursor = paginate(changes, limit, key=lambda c: (c["changed_at"], c["snapshot_id"]))
+    return {"items": page, "next_cursor": next_cursor}
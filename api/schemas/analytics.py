@@ -2,8 +2,10 @@
 Pydantic schemas for analytics endpoints.
 """
 
-from typing import Optional
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Dict, List, Optional
+from pydantic import BaseModel, field_serializer
+from ..utils.formatter import format_datetime
 
 
 class AveragePricePerCategorySchema(BaseModel):
@@ -30,3 +32,51 @@ class TotalTaxPerProductTypeSchema(BaseModel):
     """Schema representing total tax aggregated per product type."""
     product_type_name: str
     total_tax: float
+
+
+class RollupHistorySchema(BaseModel):
+    """Schema representing the aggregates of a category or product type at one crawl."""
+    crawl_id: int
+    crawled_at: datetime
+    dimension_id: int
+    dimension_name: str
+    book_count: int
+    avg_price: float
+    min_price: float
+    max_price: float
+    avg_rating: float
+    total_stock: int
+
+    @field_serializer("crawled_at")
+    def serialize_crawled_at(self, value: datetime) -> str:
+        """Serialize crawled_at using the shared datetime formatter."""
+        return format_datetime(value)
+
+
+class BookVolatilitySchema(BaseModel):
+    """Schema representing the price volatility of a book over its history."""
+    book_id: int
+    category_id: Optional[int] = None
+    observations: int
+    price_changes: int
+    volatility: float
+    latest_price: float
+
+
+class PricePercentilesSchema(BaseModel):
+    """Schema representing percentiles of the latest book prices."""
+    category_id: Optional[int] = None
+    book_count: int
+    percentiles: Dict[str, Optional[float]]
+
+
+class CategoryHistogramSchema(BaseModel):
+    """Schema representing the price histogram of one category."""
+    category_id: Optional[int] = None
+    counts: List[int]
+
+
+class PriceHistogramSchema(BaseModel):
+    """Schema representing price histograms per category on shared bins."""
+    bin_edges: List[float]
+    categories: List[CategoryHistogramSchema]
@@ -3,8 +3,8 @@ Pydantic schemas for Book, Category, ProductType, Tax, and BookSnapshot.
 """
 
 from datetime import datetime, timezone
-from typing import Optional
-from pydantic import BaseModel, Field, field_serializer
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field, field_serializer, model_validator
 from ..utils.formatter import format_datetime
 
 
@@ -67,6 +67,38 @@ class BookCreateSchema(BaseModel):
     tax_id: int
 
 
+MAX_BATCH_SIZE = 5000
+
+
+class BookBatchRequestSchema(BaseModel):
+    """Schema for a batch lookup of books by IDs or by UPCs (exactly one of them)."""
+    ids: Optional[List[int]] = Field(None, max_length=MAX_BATCH_SIZE)
+    upcs: Optional[List[str]] = Field(None, max_length=MAX_BATCH_SIZE)
+    fields: Optional[List[str]] = None
+
+    @model_validator(mode="after")
+    def check_single_key_list(self) -> "BookBatchRequestSchema":
+        """Require exactly one of `ids` / `upcs`."""
+        if (self.ids is None) == (self.upcs is None):
+            raise ValueError("Provide exactly one of 'ids' or 'upcs'")
+        return self
+
+
+class BookBatchResponseSchema(BaseModel):
+    """
+    Schema for a batch lookup result: `items` follows the input order,
+    with `null` for every key that was not found (also listed in `missing`).
+    """
+    items: List[Optional[Dict[str, Any]]]
+    missing: List[Any]
+
+
+class SimilarBookSchema(BaseModel):
+    """A book similar to another one, with the cosine similarity of their text (0 to 1)."""
+    score: float
+    book: Dict[str, Any]
+
+
 class BookSnapshotSchema(BaseModel):
     """
     Schema representing a snapshot of a scraped book at a given time.
@@ -91,3 +123,41 @@ class BookSnapshotSchema(BaseModel):
     def serialize_scraped_at(self, value: datetime) -> str:
         """Serialize scraped_at using the shared datetime formatter."""
         return format_datetime(value)
+
+
+class SnapshotSeriesSchema(BaseModel):
+    """Schema representing the bucketed snapshot history of one book."""
+    book_id: int
+    points: List[Dict[str, Any]] = Field(
+        description="One entry per bucket: `bucket` plus a `<metric>_<aggregation>` key per requested value",
+    )
+
+
+class SnapshotTimeSeriesSchema(BaseModel):
+    """Schema representing bucketed snapshot histories for several books."""
+    interval: str
+    series: List[SnapshotSeriesSchema]
+
+
+class BookChangeSchema(BaseModel):
+    """
+    Schema representing a change of price, stock or rating of a book during a crawl:
+    the values before the crawl (`old_*`) and the ones it stored (`new_*`).
+    """
+    snapshot_id: int
+    book_id: int
+    title: str
+    category_id: int
+    changed_at: datetime
+    old_price: float
+    new_price: float
+    price_change: float
+    old_availability: int
+    new_availability: int
+    old_rating: int
+    new_rating: int
+
+    @field_serializer("changed_at")
+    def serialize_changed_at(self, value: datetime) -> str:
+        """Serialize changed_at using the shared datetime formatter."""
+        return format_datetime(value)
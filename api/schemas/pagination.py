@@ -0,0 +1,19 @@
+"""
+Pydantic schemas for paginated list responses.
+"""
+
+from typing import Generic, List, Optional, TypeVar
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    """A page of results with the opaque cursor of the next page."""
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+class CountedPage(Page[T], Generic[T]):
+    """A page of results that also carries the total number of matches."""
+    total: Optional[int] = None
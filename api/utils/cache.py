@@ -0,0 +1,313 @@
+"""
+Server-side response cache for read-only API routes.
+
+Book, snapshot and analytics data only changes when the Scrapy pipeline
+commits a crawl, so full response bodies are cached and keyed on the
+normalized route + query string and on the data generation (the latest
+`crawl_runs` id). When a new crawl lands the generation changes and every
+cached response is invalidated at once. While a crawl is in progress the
+pipeline commits its items one by one, so there is no generation: responses
+are neither cached nor tagged until the crawl is recorded.
+
+The same generation is the data version behind HTTP conditional requests:
+responses carry an `ETag` derived from it, and `If-None-Match` is answered
+with `304 Not Modified` before the route runs any query.
+
+Two backends are available:
+- `MemoryCacheBackend`: per-process LRU with TTL (default, and the stand-in for tests)
+- `RedisCacheBackend`: shared between workers, enabled with `CACHE_REDIS_URL`
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.responses import StreamingResponse
+
+from config.settings import settings
+from api.crud.crawl_crud import get_data_generation
+from api.utils.metrics import TimedRoute
+
+# (content-type, body)
+CacheEntry = Tuple[str, bytes]
+
+
+class MemoryCacheBackend:
+    """Thread-safe in-process LRU cache with TTL and entry/byte bounds."""
+
+    def __init__(self, ttl_seconds: int, max_entries: int, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[float, CacheEntry]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return a cached entry, or None if missing or expired."""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, entry = item
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        """Store an entry, evicting least recently used ones beyond the bounds."""
+        size = len(key) + len(entry[0]) + len(entry[1])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, entry)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of entries and the approximate memory they use."""
+        with self._lock:
+            return {"entries": len(self._entries), "memory_bytes": self._bytes}
+
+    def _remove(self, key: str) -> None:
+        _, (content_type, body) = self._entries.pop(key)
+        self._bytes -= len(key) + len(content_type) + len(body)
+
+
+class RedisCacheBackend:
+    """
+    Cache shared by all workers, stored in Redis with a TTL per entry.
+    LRU eviction is left to Redis (`maxmemory-policy allkeys-lru`).
+    """
+
+    PREFIX = "books-api:cache:"
+
+    def __init__(self, url: str, ttl_seconds: int):
+        import redis  # pylint: disable=import-outside-toplevel  # optional dependency
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return a cached entry, or None if missing or expired."""
+        raw = self.client.get(self.PREFIX + key)
+        if raw is None:
+            return None
+        content_type, _, body = raw.partition(b"\n")
+        return content_type.decode(), body
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        """Store an entry with the configured TTL."""
+        content_type, body = entry
+        self.client.setex(self.PREFIX + key, self.ttl_seconds, content_type.encode() + b"\n" + body)
+
+    def clear(self) -> None:
+        """Delete every cached entry (keys found with SCAN, deleted in batches)."""
+        batch = []
+        for key in self.client.scan_iter(match=self.PREFIX + "*", count=1000):
+            batch.append(key)
+            if len(batch) >= 1000:
+                self.client.delete(*batch)
+                batch = []
+        if batch:
+            self.client.delete(*batch)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of keys and the memory used by the Redis server."""
+        return {
+            "entries": self.client.dbsize(),
+            "memory_bytes": self.client.info("memory").get("used_memory", 0),
+        }
+
+
+class ResponseCache:
+    """Response cache bound to the data generation, with hit/miss metrics."""
+
+    def __init__(
+        self,
+        backend,
+        generation_loader: Callable[[], Optional[int]],
+        poll_seconds: float = 1.0,
+        enabled: bool = True,
+    ):
+        self.backend = backend
+        self.generation_loader = generation_loader
+        self.poll_seconds = poll_seconds
+        self.enabled = enabled
+        self.generation: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self._polled_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def current_generation(self) -> Optional[int]:
+        """
+        Return the data generation, re-reading it at most every `poll_seconds`.
+        Clears the backend when it changed. Returns None if it cannot be read
+        or while a crawl is in progress.
+        """
+        now = time.monotonic()
+        if self._polled_at is not None and now - self._polled_at < self.poll_seconds:
+            return self.generation
+        try:
+            generation = self.generation_loader()
+        except SQLAlchemyError:
+            return None
+        with self._lock:
+            self._polled_at = now
+            if generation != self.generation:
+                self.backend.clear()
+                self.generation = generation
+        return generation
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the cached response for `key` in the current generation."""
+        generation = self.current_generation()
+        if generation is None:
+            return None
+        entry = self.backend.get(f"{generation}:{key}")
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        """Cache a response for `key` in the current generation."""
+        generation = self.current_generation()
+        if generation is not None:
+            self.backend.set(f"{generation}:{key}", entry)
+
+    def invalidate(self) -> None:
+        """Forget the current generation and drop every entry."""
+        with self._lock:
+            self.generation = None
+            self._polled_at = None
+            self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters, hit ratio, size and memory use."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            **self.backend.stats(),
+        }
+
+
+def cache_key(request: Request) -> str:
+    """
+    Normalize a request into a cache key: path + query parameters sorted by name.
+    Repeated parameters (e.g. `fields`) keep their relative order, which matters.
+    """
+    params = sorted(request.query_params.multi_items(), key=lambda item: item[0])
+    return f"{request.url.path}?{urlencode(params)}"
+
+
+def generation_etag(generation: int) -> str:
+    """Return the (weak) ETag of every response produced in a data generation."""
+    return f'W/"crawl-{generation}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an `If-None-Match` header against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+
+def _build_response_cache() -> ResponseCache:
+    """Create the process-wide cache from settings."""
+    backend = None
+    if settings.cache_redis_url:
+        try:
+            backend = RedisCacheBackend(settings.cache_redis_url, settings.cache_ttl_seconds)
+        except ImportError:
+            print("[WARNING] CACHE_REDIS_URL is set but `redis` is not installed. Using memory cache.")
+    if backend is None:
+        backend = MemoryCacheBackend(
+            settings.cache_ttl_seconds, settings.cache_max_entries, settings.cache_max_bytes
+        )
+    return ResponseCache(
+        backend,
+        get_data_generation,
+        poll_seconds=settings.cache_generation_poll_seconds,
+        enabled=settings.cache_enabled,
+    )
+
+
+response_cache = _build_response_cache()
+
+
+class CachedRoute(TimedRoute):
+    """
+    Route class adding HTTP and server-side caching to GET routes:
+    - `ETag` / `Cache-Control` headers, and `304` answers to a matching `If-None-Match`
+    - successful responses stored in `response_cache` (streaming responses excluded)
+    Use it with `APIRouter(route_class=CachedRoute)`.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def cached_handler(request: Request) -> Response:
+            if request.method != "GET":
+                return await handler(request)
+
+            generation = await run_in_threadpool(response_cache.current_generation)
+            http_headers = {}
+            if generation is not None:
+                etag = generation_etag(generation)
+                http_headers = {
+                    "ETag": etag,
+                    "Cache-Control": f"public, max-age={settings.http_cache_max_age}, must-revalidate",
+                }
+                if etag_matches(request.headers.get("if-none-match"), etag):
+                    return Response(status_code=304, headers=http_headers)
+
+            if not response_cache.enabled:
+                response = await handler(request)
+                if response.status_code == 200:
+                    response.headers.update(http_headers)
+                return response
+
+            key = cache_key(request)
+            entry = await run_in_threadpool(response_cache.get, key)
+            if entry is not None:
+                content_type, body = entry
+                return Response(
+                    content=body,
+                    headers={"content-type": content_type, "X-Cache": "HIT", **http_headers},
+                )
+
+            response = await handler(request)
+            if response.status_code == 200 and not isinstance(response, StreamingResponse):
+                content_type = response.headers.get("content-type", "application/json")
+                await run_in_threadpool(response_cache.set, key, (content_type, bytes(response.body)))
+                response.headers["X-Cache"] = "MISS"
+                response.headers.update(http_headers)
+            return response
+
+        return cached_handler
@@ -0,0 +1,164 @@
+"""
+Fan-out of catalog change events to connected clients.
+
+The pipeline publishes events with Postgres `NOTIFY` (`db.notifications`).
+Each API process holds a single `LISTEN` connection, opened by a background
+thread when the first client subscribes, and hands every event to the
+subscriptions whose filters match. `/events` streams them to clients as
+Server-Sent Events, so one push replaces repeated polling.
+"""
+
+import asyncio
+import json
+import select
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from db.database import get_engine
+from db.notifications import CHANNEL
+
+# Events buffered per client before new ones are dropped (slow consumer)
+SUBSCRIPTION_QUEUE_SIZE = 1000
+# Reconnection delay: doubled after each failed attempt, up to the maximum
+RECONNECT_DELAY_SECONDS = 1.0
+MAX_RECONNECT_DELAY_SECONDS = 60.0
+POLL_TIMEOUT_SECONDS = 1.0
+
+
+class EventSubscription:
+    """
+    Events for one client. `book` events are kept if they match any of the
+    given categories or books (all of them without filters); `crawl` events
+    are always kept.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        category_ids: Optional[Iterable[int]] = None,
+        book_ids: Optional[Iterable[int]] = None,
+    ):
+        self.loop = loop
+        self.category_ids = set(category_ids) if category_ids else None
+        self.book_ids = set(book_ids) if book_ids else None
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(SUBSCRIPTION_QUEUE_SIZE)
+        self.dropped = 0
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        """Whether the client asked for `event`."""
+        if event.get("type") != "book" or (self.category_ids is None and self.book_ids is None):
+            return True
+        return (self.category_ids is not None and event.get("category_id") in self.category_ids) or (
+            self.book_ids is not None and event.get("book_id") in self.book_ids
+        )
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        """Queue an event (on the event loop); dropped if the client lags too far behind."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+
+class CatalogEventListener:
+    """One `LISTEN` connection per process, shared by every subscription."""
+
+    def __init__(self, channel: str = CHANNEL):
+        self.channel = channel
+        self.subscriptions: List[EventSubscription] = []
+        self.events_received = 0
+        self.connected = False
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, **filters) -> EventSubscription:
+        """Register a subscription on the running event loop; starts listening if needed."""
+        subscription = EventSubscription(asyncio.get_running_loop(), **filters)
+        with self._lock:
+            self.subscriptions.append(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="catalog-events", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: EventSubscription) -> None:
+        """Forget a subscription (the client disconnected)."""
+        with self._lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+
+    def dispatch(self, payload: str) -> None:
+        """Hand the events of one NOTIFY payload to the matching subscriptions."""
+        try:
+            events = json.loads(payload)
+        except ValueError:
+            return
+        with self._lock:
+            subscriptions = list(self.subscriptions)
+        for event in events if isinstance(events, list) else [events]:
+            self.events_received += 1
+            for subscription in subscriptions:
+                if subscription.matches(event):
+                    try:
+                        subscription.loop.call_soon_threadsafe(subscription.offer, event)
+                    except RuntimeError:  # its event loop is closed
+                        self.unsubscribe(subscription)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the listener state, subscription count and event counters."""
+        with self._lock:
+            subscriptions = list(self.subscriptions)
+        return {
+            "connected": self.connected,
+            "subscriptions": len(subscriptions),
+            "events_received": self.events_received,
+            "events_dropped": sum(subscription.dropped for subscription in subscriptions),
+        }
+
+    def _connect(self):
+        """Open a dedicated connection (outside the pool: it is held forever) and LISTEN."""
+        # pylint: disable=import-outside-toplevel
+        import psycopg2
+
+        url = get_engine().url.set(drivername="postgresql")
+        connection = psycopg2.connect(url.render_as_string(hide_password=False))
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return connection
+
+    def _run(self) -> None:
+        """
+        Listen forever, reconnecting with backoff after any error (connection,
+        `select` or dispatch). Should the thread still die, the next
+        subscription starts a new one.
+        """
+        delay = RECONNECT_DELAY_SECONDS
+        try:
+            while True:
+                connection = None
+                try:
+                    connection = self._connect()
+                    self.connected = True
+                    delay = RECONNECT_DELAY_SECONDS
+                    while True:
+                        readable, _, _ = select.select([connection], [], [], POLL_TIMEOUT_SECONDS)
+                        if not readable:
+                            continue
+                        connection.poll()
+                        while connection.notifies:
+                            self.dispatch(connection.notifies.pop(0).payload)
+                except Exception as exc:  # pylint: disable=broad-except  # the listener must outlive any error
+                    print(f"[WARNING] Catalog event listener stopped, retrying in {delay:g}s: {exc!r}")
+                finally:
+                    self.connected = False
+                    if connection is not None and not connection.closed:
+                        connection.close()
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY_SECONDS)
+        finally:
+            with self._lock:
+                self._thread = None
+
+catalog_events = CatalogEventListener()
@@ -0,0 +1,138 @@
+"""
+Streaming encoders for bulk exports (NDJSON, CSV, optional gzip, Arrow IPC).
+
+The text encoders consume an iterator of flat dicts, the Arrow encoder an
+iterator of row batches; all yield bytes chunks, so a response can start
+before the whole dataset has been read.
+Arrow IPC output is columnar and uncompressed: consumers can memory-map it
+and read columns without parsing (`pyarrow.ipc.open_file(pyarrow.memory_map(path))`).
+pyarrow is imported on first use.
+"""
+
+import csv
+import io
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import orjson
+
+from db.archive import archive_schema
+
+ROWS_PER_CHUNK = 500
+
+# Arrow type of each book export column (`pyarrow` type factory)
+BOOK_ARROW_TYPES = {
+    "id": "int64", "title": "string", "upc": "string",
+    "price_excl_tax": "float64", "price_incl_tax": "float64",
+    "availability": "int64", "number_of_reviews": "int64", "rating": "int64",
+    "description": "string", "image_url": "string",
+    "category_id": "int64", "category_name": "string",
+    "product_type_id": "int64", "product_type_type_name": "string",
+    "tax_id": "int64", "tax_amount": "float64",
+}
+
+
+def iter_ndjson(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Encode rows as newline-delimited JSON, one object per line."""
+    chunk: List[bytes] = []
+    for row in rows:
+        chunk.append(orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE))
+        if len(chunk) >= ROWS_PER_CHUNK:
+            yield b"".join(chunk)
+            chunk = []
+    if chunk:
+        yield b"".join(chunk)
+
+
+def iter_csv(rows: Iterable[Dict[str, Any]], columns: List[str]) -> Iterator[bytes]:
+    """Encode rows as CSV with a header line; the header is sent immediately."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    yield buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate()
+
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count >= ROWS_PER_CHUNK:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+    if count:
+        yield buffer.getvalue().encode("utf-8")
+
+
+def iter_gzip(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a stream of bytes chunks into a single gzip stream."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def book_arrow_schema(columns: Sequence[str]):
+    """Arrow schema of a book export with `columns`."""
+    import pyarrow as pa  # pylint: disable=import-outside-toplevel
+
+    return pa.schema([(column, getattr(pa, BOOK_ARROW_TYPES[column])()) for column in columns])
+
+
+def snapshot_arrow_schema(columns: Sequence[str]):
+    """Arrow schema of a snapshot export with `columns` (the types of the snapshot archive)."""
+    import pyarrow as pa  # pylint: disable=import-outside-toplevel
+
+    schema = archive_schema()
+    return pa.schema([schema.field(column) for column in columns])
+
+
+class _ChunkSink(io.RawIOBase):
+    """Output of the Arrow IPC writer: keeps what was written until it is sent."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self.chunks.append(chunk)
+        return len(chunk)
+
+    def take(self) -> bytes:
+        """Return and forget the bytes written so far."""
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_arrow_ipc(batches: Iterable[Sequence[Tuple]], schema, file_format: bool = False) -> Iterator[bytes]:
+    """
+    Encode row batches (tuples in `schema` order) as one Arrow record batch each.
+    Writes the IPC stream format (`.arrows`), or the file format (`.arrow`,
+    random access, ends with a footer) with `file_format`.
+    """
+    import pyarrow as pa  # pylint: disable=import-outside-toplevel
+
+    sink = _ChunkSink()
+    writer = pa.ipc.new_file(sink, schema) if file_format else pa.ipc.new_stream(sink, schema)
+    yield sink.take()
+    for rows in batches:
+        if not rows:
+            continue
+        columns = list(zip(*rows))
+        writer.write_batch(
+            pa.record_batch(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+            )
+        )
+        yield sink.take()
+    writer.close()
+    yield sink.take()
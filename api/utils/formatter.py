@@ -2,9 +2,30 @@
 Utility functions for formatting API responses.
 """
 
-from typing import List, Any, Dict, Optional
+from typing import List, Any, Dict, Optional, Sequence
 from datetime import datetime, timezone
 
+# Column layout of book row tuples (see `books_crud.book_rows_statement`).
+# The first ten are book columns, then id/name pairs of the three relations,
+# named as in the flattened output of `format_books`.
+BOOK_ROW_FIELDS = [
+    "id", "title", "upc", "price_excl_tax", "price_incl_tax", "availability",
+    "number_of_reviews", "rating", "description", "image_url",
+    "category_id", "category_name",
+    "product_type_id", "product_type_type_name",
+    "tax_id", "tax_amount",
+]
+
+# Flattened relation column -> (nested relation key, attribute)
+_RELATION_FIELDS = {
+    "category_id": ("category", "id"),
+    "category_name": ("category", "name"),
+    "product_type_id": ("product_type", "id"),
+    "product_type_type_name": ("product_type", "type_name"),
+    "tax_id": ("tax", "id"),
+    "tax_amount": ("tax", "amount"),
+}
+
 
 def format_books(
     books: List[Any],
@@ -36,6 +57,57 @@ def format_books(
     return formatted_books
 
 
+def book_row_columns(fields: Optional[List[str]] = None, flatten: bool = True) -> List[str]:
+    """
+    Return the row columns (in `BOOK_ROW_FIELDS` order) needed to output `fields`.
+    `id` is always included since it is the pagination key. Unknown fields are
+    ignored, as in `format_books`.
+    """
+    if not fields:
+        return list(BOOK_ROW_FIELDS)
+    needed = {"id"}
+    for field in fields:
+        if field in BOOK_ROW_FIELDS and (flatten or field not in _RELATION_FIELDS):
+            needed.add(field)
+        elif not flatten:
+            needed.update(
+                column for column, (relation, _) in _RELATION_FIELDS.items() if relation == field
+            )
+    return [column for column in BOOK_ROW_FIELDS if column in needed]
+
+
+def format_book_rows(
+    rows: Sequence[Sequence[Any]],
+    fields: Optional[List[str]] = None,
+    flatten: bool = True,
+    columns: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """Fast path of `format_books` for plain row tuples: builds the same dictionaries
+    without going through ORM objects or pydantic models. `columns` names the row
+    values (defaults to the full `BOOK_ROW_FIELDS` layout)."""
+    columns = columns or BOOK_ROW_FIELDS
+    nested = [(column, None if flatten else _RELATION_FIELDS.get(column)) for column in columns]
+    formatted_books = []
+
+    for row in rows:
+        if flatten:
+            book_dict = dict(zip(columns, row))
+        else:
+            book_dict = {}
+            for (column, relation), value in zip(nested, row):
+                if relation:
+                    book_dict.setdefault(relation[0], {})[relation[1]] = value
+                else:
+                    book_dict[column] = value
+
+        if fields:
+            book_dict = {field: book_dict[field] for field in fields if field in book_dict}
+
+        formatted_books.append(book_dict)
+
+    return formatted_books
+
+
 def format_datetime(dt: datetime) -> str:
     """Format datetime into ISO 8601 string in UTC."""
     if dt.tzinfo is None:
@@ -0,0 +1,275 @@
+"""
+Request instrumentation: `Server-Timing` headers and Prometheus metrics.
+
+`MetricsMiddleware` times every HTTP request and counts its queries with the
+engine hooks of `db.database`. Each response carries a `Server-Timing` header:
+- `db`: time spent in SQL queries (and how many were run)
+- `serialize`: time spent building the response body from query results
+- `total`: time until the response headers were sent
+
+Routes declared with `TimedRoute` (or `CachedRoute`, which extends it) split
+serialization from the endpoint itself. The same numbers feed per-route
+histograms and counters, exposed in Prometheus text format by `/metrics`.
+
+Metrics live in the memory of each process. With pre-forked workers
+(`API_ENV=production`) a scrape reaches one worker, so every sample carries
+a `worker` label (the process ID): sum over it in queries, e.g.
+`sum without (worker) (rate(http_requests_total[5m]))`.
+"""
+
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from db.database import QueryStats, track_queries
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+UNMATCHED_ROUTE = "<unmatched>"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Format Prometheus labels, e.g. `{method="GET",route="/books/"}`."""
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def worker_labels() -> Dict[str, str]:
+    """Labels of every sample of this process (read at render time: workers are forked after import)."""
+    return {"worker": str(os.getpid())}
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Labels, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Labels, amount: float = 1.0) -> None:
+        """Add `amount` to the counter of `labels`."""
+        with self._lock:
+            self._values[labels] += amount
+
+    def render(self, const_labels: Optional[Dict[str, str]] = None) -> List[str]:
+        """Return the counter in Prometheus text format, with `const_labels` on every sample."""
+        const_labels = const_labels or {}
+        names = (*const_labels, *self.label_names)
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(names, (*const_labels.values(), *labels))} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Histogram with fixed buckets and labels."""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # labels -> (count per bucket, sum, count)
+        self._values: Dict[Labels, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Labels, value: float) -> None:
+        """Record one observation."""
+        with self._lock:
+            counts, total, count = self._values.get(labels) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[labels] = [counts, total + value, count + 1]
+
+    def render(self, const_labels: Optional[Dict[str, str]] = None) -> List[str]:
+        """
+        Return the histogram (cumulative buckets, sum, count) in Prometheus text
+        format, with `const_labels` on every sample.
+        """
+        const_labels = const_labels or {}
+        label_names = (*const_labels, *self.label_names)
+        bucket_names = (*label_names, "le")
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._values.items()):
+                values = (*const_labels.values(), *labels)
+                for bound, bucket_count in zip(self.buckets, counts):
+                    bucket_labels = format_labels(bucket_names, (*values, f"{bound:g}"))
+                    lines.append(f"{self.name}_bucket{bucket_labels} {bucket_count}")
+                lines.append(f"{self.name}_bucket{format_labels(bucket_names, (*values, '+Inf'))} {count}")
+                lines.append(f"{self.name}_sum{format_labels(label_names, values)} {total:g}")
+                lines.append(f"{self.name}_count{format_labels(label_names, values)} {count}")
+        return lines
+
+
+ROUTE_LABELS = ("method", "route")
+
+requests_total = Counter(
+    "http_requests_total", "HTTP requests by route and status code.", (*ROUTE_LABELS, "status")
+)
+request_duration = Histogram(
+    "http_request_duration_seconds", "Time until the response headers are sent.", ROUTE_LABELS, LATENCY_BUCKETS
+)
+request_queries = Histogram(
+    "http_request_db_queries", "SQL queries run per request.", ROUTE_LABELS, QUERY_COUNT_BUCKETS
+)
+request_db_seconds = Counter(
+    "http_request_db_duration_seconds_total", "Time spent in SQL queries by route.", ROUTE_LABELS
+)
+request_serialize_seconds = Counter(
+    "http_request_serialization_seconds_total", "Time spent serializing responses by route.", ROUTE_LABELS
+)
+REQUEST_METRICS = [requests_total, request_duration, request_queries, request_db_seconds, request_serialize_seconds]
+
+
+class RequestTimings:
+    """Where the time of one request went, besides SQL (seconds)."""
+
+    def __init__(self):
+        self.endpoint = 0.0
+        self.serialize = 0.0
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def serialization_timer() -> Iterator[None]:
+    """Count the enclosed block as serialization time of the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.serialize += time.perf_counter() - start
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    """Wrap an endpoint to record its own duration; the signature is preserved for FastAPI."""
+
+    def record(start: float) -> None:
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.endpoint += time.perf_counter() - start
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                record(start)
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            record(start)
+
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """
+    Route class separating the endpoint from what FastAPI does around it.
+    Time outside the endpoint (mostly `response_model` validation and JSON
+    encoding) is counted as serialization.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            timings = _current_timings.get()
+            if timings is None:
+                return await handler(request)
+            start = time.perf_counter()
+            endpoint_before = timings.endpoint
+            try:
+                return await handler(request)
+            finally:
+                outside = (time.perf_counter() - start) - (timings.endpoint - endpoint_before)
+                timings.serialize += max(outside, 0.0)
+
+        return timed_handler
+
+
+def server_timing(queries: QueryStats, timings: RequestTimings, total: float) -> str:
+    """Format the `Server-Timing` header value (durations in milliseconds)."""
+    return (
+        f'db;dur={queries.seconds * 1000:.2f};desc="{queries.queries} queries", '
+        f"serialize;dur={timings.serialize * 1000:.2f}, "
+        f"total;dur={total * 1000:.2f}"
+    )
+
+
+class MetricsMiddleware:
+    """ASGI middleware adding `Server-Timing` headers and recording request metrics."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        status = 500
+        elapsed = None
+
+        with track_queries() as queries:
+
+            async def send_with_timing(message: Message) -> None:
+                nonlocal status, elapsed
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    elapsed = time.perf_counter() - start
+                    MutableHeaders(scope=message).append("Server-Timing", server_timing(queries, timings, elapsed))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                _current_timings.reset(token)
+                route = scope.get("route")
+                labels = (scope["method"], getattr(route, "path", UNMATCHED_ROUTE))
+                requests_total.inc((*labels, str(status)))
+                request_duration.observe(labels, elapsed if elapsed is not None else time.perf_counter() - start)
+                request_queries.observe(labels, queries.queries)
+                request_db_seconds.inc(labels, queries.seconds)
+                request_serialize_seconds.inc(labels, timings.serialize)
@@ -0,0 +1,190 @@
+"""
+Vectorized analytics over the snapshot history, with NumPy.
+
+The history of every book (its snapshots, then its current `books` row) is
+kept in memory as columnar arrays sorted by (book_id, scraped_at), with an
+offset array delimiting the run of each book. Statistics are computed with
+whole-array operations instead of per-book queries or Python loops.
+The arrays are refreshed incrementally when the data generation changes:
+only new snapshots are read, archived ones (see `db.archive`) are dropped by ID.
+"""
+
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from api.crud.snapshot_crud import (
+    get_current_book_values,
+    get_snapshot_ids,
+    get_snapshot_rows_after,
+)
+from api.utils.cache import response_cache
+
+
+class SnapshotHistory:
+    """Columnar price/stock/rating history sorted by (book_id, scraped_at)."""
+
+    def __init__(
+        self,
+        book_id: np.ndarray,
+        scraped_at: np.ndarray,
+        price: np.ndarray,
+        availability: np.ndarray,
+        rating: np.ndarray,
+        category_book_ids: np.ndarray,
+        category_ids: np.ndarray,
+    ):
+        order = np.lexsort((scraped_at, book_id))
+        self.book_id = book_id[order]
+        self.scraped_at = scraped_at[order]
+        self.price = price[order]
+        self.availability = availability[order]
+        self.rating = rating[order]
+
+        # books[i] owns rows offsets[i]:offsets[i + 1]; group maps each row to i
+        self.books, starts = np.unique(self.book_id, return_index=True)
+        self.offsets = np.append(starts, len(self.book_id))
+        self.group = np.repeat(np.arange(len(self.books)), np.diff(self.offsets))
+
+        # Category of each book (-1 when the book is no longer in `books`)
+        self.category = np.full(len(self.books), -1, dtype=np.int64)
+        if len(category_book_ids):
+            by_id = np.argsort(category_book_ids)
+            sorted_ids = category_book_ids[by_id]
+            position = np.clip(np.searchsorted(sorted_ids, self.books), 0, len(sorted_ids) - 1)
+            found = sorted_ids[position] == self.books
+            self.category[found] = category_ids[by_id][position[found]]
+
+    @property
+    def latest_price(self) -> np.ndarray:
+        """Most recent price of each book."""
+        return self.price[self.offsets[1:] - 1]
+
+    def book_mask(self, category_id: Optional[int] = None) -> np.ndarray:
+        """Boolean mask over `books`, optionally restricted to a category."""
+        if category_id is None:
+            return np.ones(len(self.books), dtype=bool)
+        return self.category == category_id
+
+    def volatility(self) -> Dict[str, np.ndarray]:
+        """
+        Per-book statistics of consecutive price moves:
+        observations, number of price changes and volatility (std of log returns).
+        """
+        count = len(self.books)
+        same_book = self.book_id[1:] == self.book_id[:-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.diff(np.log(self.price))
+        valid = same_book & np.isfinite(returns)
+        returns = returns[valid]
+        group = self.group[1:][valid]
+
+        moves = np.bincount(group, minlength=count)
+        changes = np.bincount(group, weights=returns != 0, minlength=count).astype(np.int64)
+        safe_moves = np.maximum(moves, 1)
+        mean = np.bincount(group, weights=returns, minlength=count) / safe_moves
+        variance = np.bincount(group, weights=returns**2, minlength=count) / safe_moves - mean**2
+        return {
+            "observations": np.diff(self.offsets),
+            "price_changes": changes,
+            "volatility": np.sqrt(np.clip(variance, 0, None)),
+        }
+
+    def price_percentiles(
+        self, percentiles: Sequence[float], category_id: Optional[int] = None
+    ) -> Tuple[int, np.ndarray]:
+        """Percentiles of the latest book prices; returns (book count, values)."""
+        prices = self.latest_price[self.book_mask(category_id)]
+        if not len(prices):
+            return 0, np.full(len(percentiles), np.nan)
+        return len(prices), np.percentile(prices, percentiles)
+
+    def price_histograms(self, bins: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Histogram of latest prices per category, on shared bin edges.
+        Returns (bin edges, category ids, counts of shape [categories, bins]).
+        """
+        prices = self.latest_price
+        edges = np.histogram_bin_edges(prices, bins=bins)
+        bin_index = np.clip(np.searchsorted(edges, prices, side="right") - 1, 0, bins - 1)
+        categories, category_index = np.unique(self.category, return_inverse=True)
+        counts = np.bincount(
+            category_index * bins + bin_index, minlength=len(categories) * bins
+        ).reshape(len(categories), bins)
+        return edges, categories, counts
+
+
+class SnapshotAnalyticsEngine:
+    """
+    Process-wide holder of the `SnapshotHistory`, rebuilt when the data
+    generation changes. Loaders are injectable (stand-ins for tests/benchmarks).
+    """
+
+    def __init__(
+        self,
+        fetch_snapshots_after: Callable[[int], List[Tuple]] = get_snapshot_rows_after,
+        fetch_snapshot_ids: Callable[[int], List[int]] = get_snapshot_ids,
+        fetch_current_books: Callable[[], List[Tuple]] = get_current_book_values,
+        generation_loader: Callable[[], Optional[int]] = response_cache.current_generation,
+    ):
+        self.fetch_snapshots_after = fetch_snapshots_after
+        self.fetch_snapshot_ids = fetch_snapshot_ids
+        self.fetch_current_books = fetch_current_books
+        self.generation_loader = generation_loader
+        self.generation: Optional[int] = None
+        self.history: Optional[SnapshotHistory] = None
+        # Snapshot columns loaded so far: id, book_id, scraped_at, price, availability, rating
+        self._columns = [
+            np.empty(0, dtype=dtype)
+            for dtype in (np.int64, np.int64, np.float64, np.float64, np.int64, np.int64)
+        ]
+        self._lock = threading.Lock()
+
+    def get(self) -> SnapshotHistory:
+        """Return the history, refreshing it first if a new crawl was recorded."""
+        generation = self.generation_loader()
+        with self._lock:
+            if self.history is None or (generation is not None and generation != self.generation):
+                self.refresh()
+                self.generation = generation
+            return self.history
+
+    def refresh(self) -> None:
+        """Drop archived snapshots, append new ones and rebuild the sorted arrays."""
+        ids = self._columns[0]
+        if len(ids):
+            kept = np.isin(ids, np.fromiter(self.fetch_snapshot_ids(int(ids.max())), dtype=np.int64))
+            self._columns = [column[kept] for column in self._columns]
+
+        last_id = int(self._columns[0].max()) if len(self._columns[0]) else 0
+        rows = self.fetch_snapshots_after(last_id)
+        if rows:
+            snapshot_id, book_id, scraped_at, price, availability, rating = zip(*rows)
+            new_columns = [
+                np.array(snapshot_id, dtype=np.int64),
+                np.array(book_id, dtype=np.int64),
+                np.array([moment.timestamp() for moment in scraped_at], dtype=np.float64),
+                np.array(price, dtype=np.float64),
+                np.array(availability, dtype=np.int64),
+                np.array(rating, dtype=np.int64),
+            ]
+            self._columns = [np.concatenate(pair) for pair in zip(self._columns, new_columns)]
+
+        # Current values close each book's history (after every snapshot)
+        books = self.fetch_current_books()
+        current = [np.array(column) for column in zip(*books)] if books else [np.empty(0)] * 5
+        book_ids, category_ids, prices, availabilities, ratings = current
+        _, snap_books, snap_times, snap_prices, snap_availability, snap_ratings = self._columns
+        self.history = SnapshotHistory(
+            np.concatenate([snap_books, book_ids.astype(np.int64)]),
+            np.concatenate([snap_times, np.full(len(book_ids), np.inf)]),
+            np.concatenate([snap_prices, prices.astype(np.float64)]),
+            np.concatenate([snap_availability, availabilities.astype(np.int64)]),
+            np.concatenate([snap_ratings, ratings.astype(np.int64)]),
+            book_ids.astype(np.int64),
+            category_ids.astype(np.int64),
+        )
+
+
+snapshot_engine = SnapshotAnalyticsEngine()
@@ -0,0 +1,140 @@
+"""
+Warm-up of a new API process before it takes traffic.
+
+The first requests after a deploy or a worker restart used to pay for the
+database connects, the first load of the dimension tables and of the
+snapshot history, cold Postgres buffers and SQLAlchemy's statement
+compilation. `StartupWarmup` does that work once, during the lifespan
+startup, before the server accepts connections:
+1. fill the connection pool (`DB_POOL_SIZE` connections opened at once);
+2. read the data generation and the dimension tables;
+3. load the in-memory snapshot history (`snapshot_engine`);
+4. send the popular read requests through the app itself, so their queries
+   are compiled and cached and their responses land in the response cache.
+
+Pre-forked workers share one listening socket, so a worker must not accept
+connections before it is warm; the warm-up is bounded by
+`API_WARMUP_TIMEOUT_SECONDS`. `/ready` reports the steps and their outcome.
+A failed step is reported but does not keep the process out of rotation:
+warming up is an optimization, not a health check.
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+
+from config.settings import settings
+from db.database import get_engine
+from api.crud.dimension_crud import dimensions
+from api.utils.cache import response_cache
+from api.utils.snapshot_engine import snapshot_engine
+
+# Popular read requests, sent in this order
+WARMUP_PATHS = (
+    "/books/",
+    "/books/query",
+    "/books/categories",
+    "/books/formatted",
+    "/analytics/average-book-price",
+    "/analytics/average-price-per-category",
+    "/analytics/top-categories",
+    "/analytics/volatility",
+    "/analytics/price-percentiles",
+    "/analytics/price-histogram",
+    "/snapshots/changes",
+)
+# Per-book requests, sent for the first book of `/books/`
+WARMUP_BOOK_PATHS = ("/books/{book_id}", "/books/{book_id}/similar", "/snapshots/book/{book_id}")
+
+
+def fill_connection_pool() -> int:
+    """Open `DB_POOL_SIZE` connections at once and return them to the pool; returns the count."""
+    engine = get_engine()
+    connections = []
+    try:
+        for _ in range(settings.db_pool_size):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+
+class StartupWarmup:
+    """Warm-up steps of the process and their outcome."""
+
+    def __init__(self):
+        self.ready = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: List[Dict[str, Any]] = []
+
+    def mark_ready(self) -> None:
+        """Declare the process ready (warm-up done or disabled)."""
+        self.ready = True
+        self.finished_at = time.time()
+
+    async def _step(self, name: str, func: Callable, *args, report: bool = False) -> Any:
+        """
+        Run one step, recording its duration and error (and its result with
+        `report`); returns its result (None on error).
+        """
+        start = time.perf_counter()
+        step: Dict[str, Any] = {"name": name}
+        try:
+            result = await func(*args)
+            if report:
+                step["result"] = result
+        except Exception as exc:  # pylint: disable=broad-except  # reported, the next steps still run
+            step["error"] = f"{type(exc).__name__}: {exc}"
+            print(f"[WARNING] Warm-up step '{name}' failed: {step['error']}")
+            result = None
+        step["seconds"] = round(time.perf_counter() - start, 4)
+        self.steps.append(step)
+        return result
+
+    async def run(self, app) -> None:
+        """Run every step, then mark the process ready."""
+        self.started_at = time.time()
+        await self._step("connection_pool", run_in_threadpool, fill_connection_pool)
+        await self._step("generation", run_in_threadpool, response_cache.current_generation)
+        await self._step("dimensions", run_in_threadpool, dimensions.fresh)
+        await self._step("snapshot_history", run_in_threadpool, snapshot_engine.get)
+        await self._step("requests", self._send_requests, app, report=True)
+        self.mark_ready()
+        print(f"[INFO] API warmed up in {self.finished_at - self.started_at:.2f}s.")
+
+    @staticmethod
+    async def _send_requests(app) -> Dict[str, int]:
+        """GET the popular paths in-process (through the middleware and the cache); returns their status codes."""
+        statuses = {}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://warmup") as client:
+            for path in WARMUP_PATHS:
+                statuses[path] = (await client.get(path)).status_code
+            first_page = await client.get("/books/", params={"limit": 1})
+            for book in first_page.json()["items"] if first_page.status_code == 200 else []:
+                for template in WARMUP_BOOK_PATHS:
+                    path = template.format(book_id=book["id"])
+                    statuses[path] = (await client.get(path)).status_code
+        return statuses
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the readiness flag, the steps and the total warm-up time."""
+        return {
+            "ready": self.ready,
+            "seconds": (
+                round(self.finished_at - self.started_at, 4)
+                if self.started_at is not None and self.finished_at is not None
+                else None
+            ),
+            "steps": self.steps,
+        }
+
+
+startup_warmup = StartupWarmup()
@@ -0,0 +1,88 @@
+"""
+Benchmark of bulk book exports for columnar consumers: NDJSON vs Arrow IPC.
+
+Encodes the same in-memory book rows (no database) the way `/export/books`
+does, then decodes them the way a data science job would, into columns:
+- NDJSON: `iter_ndjson` -> one `json.loads` per line -> lists per column
+- Arrow: `iter_arrow_ipc` (batches of `EXPORT_BATCH_SIZE` rows) -> the file
+  is memory-mapped and read without parsing
+Prints the time of each side per row and the payload size.
+
+Usage:
+    python -m benchmarks.bench_export [ROWS ...]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import pyarrow as pa
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from api.crud.export_crud import BOOK_EXPORT_COLUMNS, EXPORT_BATCH_SIZE  # noqa: E402
+from api.utils.export import book_arrow_schema, iter_arrow_ipc, iter_ndjson  # noqa: E402
+from benchmarks.bench_serialization import make_rows  # noqa: E402
+
+DEFAULT_ROW_COUNTS = [10_000, 100_000]
+
+
+def timed(func: Callable, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def encode_ndjson(rows: List[tuple]) -> bytes:
+    return b"".join(iter_ndjson(dict(zip(BOOK_EXPORT_COLUMNS, row)) for row in rows))
+
+
+def decode_ndjson(body: bytes) -> Dict[str, list]:
+    columns: Dict[str, list] = {column: [] for column in BOOK_EXPORT_COLUMNS}
+    for line in body.splitlines():
+        for column, value in json.loads(line).items():
+            columns[column].append(value)
+    return columns
+
+
+def encode_arrow(rows: List[tuple]) -> bytes:
+    batches = (rows[i:i + EXPORT_BATCH_SIZE] for i in range(0, len(rows), EXPORT_BATCH_SIZE))
+    return b"".join(iter_arrow_ipc(batches, book_arrow_schema(BOOK_EXPORT_COLUMNS), file_format=True))
+
+
+def decode_arrow(path: str) -> pa.Table:
+    return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+
+def main(row_counts: List[int]) -> None:
+    """Run both formats for each row count."""
+    print(f"{'rows':>8} {'format':>7} {'encode us/row':>14} {'decode us/row':>14} {'MB':>7}")
+    for count in row_counts:
+        rows = make_rows(count)
+
+        body, encode = timed(encode_ndjson, rows)
+        columns, decode = timed(decode_ndjson, body)
+        assert len(columns["id"]) == count
+        print(f"{count:>8} {'ndjson':>7} {encode / count * 1e6:>14.2f} {decode / count * 1e6:>14.2f} "
+              f"{len(body) / 1e6:>7.1f}")
+
+        body, encode = timed(encode_arrow, rows)
+        with tempfile.NamedTemporaryFile(suffix=".arrow", delete=False) as file:
+            file.write(body)
+        try:
+            table, decode = timed(decode_arrow, file.name)
+            assert table.num_rows == count and table.column("id")[count - 1].as_py() == rows[-1][0]
+        finally:
+            os.unlink(file.name)
+        print(f"{count:>8} {'arrow':>7} {encode / count * 1e6:>14.2f} {decode / count * 1e6:>14.2f} "
+              f"{len(body) / 1e6:>7.1f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_ROW_COUNTS)
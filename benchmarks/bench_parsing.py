@@ -0,0 +1,80 @@
+"""
+Benchmark of detail-page extraction throughput: inline vs the process pool.
+
+Parses the recorded detail page of the microbenchmark suite N times, first
+on one thread as `BooksSpider.parse_book` does, then through
+`OrderedParsePool` (the spider's `-a parse_workers=W` mode) for each worker
+count. Items are checked to come back complete and in submission order.
+Throughput scales with the worker count up to the number of cores.
+
+Usage:
+    python -m benchmarks.bench_parsing [PAGES] [WORKERS ...]
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+# The spider imports its project as `scrapy_books`, as `scrapy crawl` does
+sys.path.insert(0, str(PROJECT_ROOT / "scrapy_books"))
+
+from scrapy.http import HtmlResponse  # noqa: E402
+from scrapy_books.parse_pool import OrderedParsePool  # noqa: E402
+from scrapy_books.spiders.books import extract_book, load_book  # noqa: E402
+
+BOOK_PAGE = (PROJECT_ROOT / "benchmarks" / "suite" / "data" / "book_page.html").read_bytes()
+DEFAULT_PAGES = 2000
+
+
+def make_pages(count: int) -> List[bytes]:
+    """Copies of the recorded page, each with its own UPC."""
+    return [BOOK_PAGE.replace(b"a897fe39b1053632", f"upc{i:013d}".encode()) for i in range(count)]
+
+
+def run_inline(pages: List[bytes]) -> List[str]:
+    return [
+        load_book(HtmlResponse(url=f"https://books.toscrape.com/{i}", body=page, encoding="utf-8"))["upc"]
+        for i, page in enumerate(pages)
+    ]
+
+
+async def run_pool(pool: OrderedParsePool, pages: List[bytes]) -> List[str]:
+    order: List[str] = []
+
+    async def callback(i: int, page: bytes) -> None:
+        fields = await pool.run(extract_book, f"https://books.toscrape.com/{i}", page, "utf-8")
+        order.append(fields["upc"])
+
+    await asyncio.gather(*(callback(i, page) for i, page in enumerate(pages)))
+    return order
+
+
+def main() -> None:
+    pages_count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PAGES
+    worker_counts = [int(arg) for arg in sys.argv[2:]] or sorted({1, 2, os.cpu_count() or 1})
+    pages = make_pages(pages_count)
+    expected = [f"upc{i:013d}" for i in range(pages_count)]
+
+    print(f"{pages_count} pages, {os.cpu_count()} CPU(s)")
+    start = time.perf_counter()
+    assert run_inline(pages) == expected
+    inline = time.perf_counter() - start
+    print(f"{'inline':<12} {pages_count / inline:>9.0f} pages/s")
+
+    for workers in worker_counts:
+        pool = OrderedParsePool(workers)
+        asyncio.run(run_pool(pool, make_pages(workers)))  # start the workers
+        start = time.perf_counter()
+        order = asyncio.run(run_pool(pool, pages))
+        elapsed = time.perf_counter() - start
+        pool.close()
+        assert order == expected, "items out of order"
+        print(f"{f'{workers} worker(s)':<12} {pages_count / elapsed:>9.0f} pages/s  x{inline / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    main()
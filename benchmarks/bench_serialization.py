@@ -0,0 +1,108 @@
+"""
+Benchmark of the per-row cost of serializing book list responses.
+
+Compares the legacy path (ORM objects -> BookSchema.model_validate ->
+format_books -> response_model validation -> standard JSON encoder) with the
+row-tuple fast path (format_book_rows -> orjson) used by the `/books` routes.
+No database is needed: rows and ORM objects are built in memory, so the
+numbers measure serialization only (the fast path also skips ORM hydration
+and the three relation queries, which this benchmark does not count).
+
+Usage:
+    python -m benchmarks.bench_serialization [ROWS ...]
+"""
+
+import json
+import sys
+import time
+import warnings
+from pathlib import Path
+from typing import Callable, List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from db.models import Book, Category, ProductType, Tax  # noqa: E402
+from api.schemas.book import BookSchema  # noqa: E402
+from api.schemas.pagination import Page  # noqa: E402
+from api.utils.formatter import format_books, format_book_rows  # noqa: E402
+
+DEFAULT_ROW_COUNTS = [10_000, 100_000]
+DESCRIPTION = "It is a truth universally acknowledged that a benchmark needs text. " * 8
+
+
+def make_rows(count: int) -> List[tuple]:
+    """Build book row tuples in the `BOOK_ROW_FIELDS` layout."""
+    return [
+        (
+            i, f"Book {i}", f"upc{i:08d}", 10.0 + i % 50, 10.0 + i % 50, i % 22, 0, i % 5 + 1,
+            DESCRIPTION, f"https://books.toscrape.com/media/{i}.jpg",
+            i % 50, f"Category {i % 50}", 1, "Books", 1, 0.0,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def make_orm_books(rows: List[tuple]) -> List[Book]:
+    """Build ORM books with their relations attached, as `selectinload` would."""
+    categories = {}
+    product_type = ProductType(id=1, type_name="Books")
+    tax = Tax(id=1, amount=0.0)
+    books = []
+    for row in rows:
+        category = categories.setdefault(row[10], Category(id=row[10], name=row[11]))
+        book = Book(
+            id=row[0], title=row[1], upc=row[2], price_excl_tax=row[3], price_incl_tax=row[4],
+            availability=row[5], number_of_reviews=row[6], rating=row[7],
+            description=row[8], image_url=row[9],
+            category_id=row[10], product_type_id=1, tax_id=1,
+        )
+        book.category, book.product_type, book.tax = category, product_type, tax
+        books.append(book)
+    return books
+
+
+def legacy_path(books: List[Book]) -> bytes:
+    """ORM -> BookSchema -> format_books -> response_model validation -> json."""
+    schemas = [BookSchema.model_validate(book, from_attributes=True) for book in books]
+    payload = {"items": format_books(schemas, None, flatten=False), "next_cursor": None}
+    validated = TypeAdapter(Page[BookSchema]).validate_python(payload)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def fast_path(rows: List[tuple]) -> bytes:
+    """Row tuples -> format_book_rows -> orjson."""
+    return orjson.dumps({"items": format_book_rows(rows, None, flatten=False), "next_cursor": None})
+
+
+def best_of(func: Callable, arg, repeat: int) -> float:
+    """Return the best wall time of `repeat` runs of `func(arg)`."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(row_counts: List[int]) -> None:
+    """Run both paths for each row count and print the per-row cost."""
+    warnings.simplefilter("ignore", DeprecationWarning)  # BaseModel.dict() in format_books
+    print(f"{'rows':>8} {'legacy us/row':>14} {'fast us/row':>12} {'speedup':>8}")
+    for count in row_counts:
+        rows = make_rows(count)
+        books = make_orm_books(rows)
+        assert json.loads(legacy_path(books[:100])) == json.loads(fast_path(rows[:100]))
+        repeat = 3 if count <= 10_000 else 1
+        legacy = best_of(legacy_path, books, repeat) / count * 1e6
+        fast = best_of(fast_path, rows, repeat) / count * 1e6
+        print(f"{count:>8} {legacy:>14.2f} {fast:>12.2f} {legacy / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_ROW_COUNTS)
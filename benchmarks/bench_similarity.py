@@ -0,0 +1,91 @@
+"""
+Benchmark of the similar-books index: full build, incremental update, lookup.
+
+Builds the index of a synthetic catalog (Zipf-distributed words, 150-word
+descriptions, 50 categories; no database) in a temporary directory, then
+changes the description of 1% of the books and updates it incrementally, as
+at the end of a crawl. Checks a sample of neighbour lists against brute force
+on a dense TF-IDF matrix. Lookups are what `/books/{id}/similar` does.
+
+Usage:
+    python -m benchmarks.bench_similarity [BOOKS ...]
+"""
+
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from db.similar_books import SimilarBooksIndex, TfidfModel, book_terms  # noqa: E402
+
+DEFAULT_BOOK_COUNTS = [1_000, 10_000]
+VOCABULARY = [f"w{chr(97 + i % 26)}{chr(97 + i // 26 % 26)}{chr(97 + i // 676 % 26)}" for i in range(20_000)]
+CHECKED_BOOKS = 50
+
+Book = Tuple[int, str, Optional[str], Optional[str]]
+
+
+def make_books(count: int, rng: np.random.Generator) -> List[Book]:
+    """Synthetic books with Zipf-distributed words."""
+    def words(size: int) -> str:
+        ranks = np.minimum(rng.zipf(1.3, size), len(VOCABULARY)) - 1
+        return " ".join(VOCABULARY[rank] for rank in ranks)
+
+    return [(i + 1, words(5), words(150), f"Category {i % 50}") for i in range(count)]
+
+
+def brute_force_errors(index: SimilarBooksIndex, books: List[Book], sample: np.ndarray) -> int:
+    """Neighbour lists of `sample` (positions) whose scores differ from a dense computation."""
+    version = index.load()
+    model = TfidfModel(version.vocabulary, np.asarray(version.idf))
+    matrix = model.transform([book_terms(*book[1:]) for book in books])
+    dense = np.zeros((matrix.rows, len(model.vocabulary)))
+    dense[np.repeat(np.arange(matrix.rows), np.diff(matrix.indptr)), matrix.indices] = matrix.data
+    errors = 0
+    for position in sample:
+        similarities = dense @ dense[position]
+        similarities[position] = 0
+        expected = np.sort(similarities[similarities > 0])[::-1][:index.k]
+        _, scores = index.neighbors(books[position][0])
+        errors += not np.allclose(scores, expected, atol=1e-5)
+    return errors
+
+
+def main(book_counts: List[int]) -> None:
+    """Build, update and query the index for each catalog size."""
+    rng = np.random.default_rng(0)
+    print(f"{'books':>7} {'full build':>11} {'1% update':>10} {'recomputed':>11} {'lookup us':>10} {'errors':>7}")
+    for count in book_counts:
+        books = make_books(count, rng)
+        with tempfile.TemporaryDirectory() as root:
+            index = SimilarBooksIndex(Path(root))
+            start = time.perf_counter()
+            index.update(books)
+            full = time.perf_counter() - start
+
+            changed = rng.choice(count, max(1, count // 100), replace=False)
+            for position in changed:
+                book_id, title, description, category = books[position]
+                books[position] = (book_id, title, description + " " + make_books(1, rng)[0][2], category)
+            index._checked_at = 0.0  # pylint: disable=protected-access  # see the new version at once
+            start = time.perf_counter()
+            stats = index.update(books)
+            update = time.perf_counter() - start
+            index._checked_at = 0.0  # pylint: disable=protected-access
+
+            lookup = min(timeit.repeat(lambda: index.neighbors(count // 2), number=1000, repeat=3)) / 1000
+            sample = np.concatenate([changed[:CHECKED_BOOKS // 2], rng.choice(count, CHECKED_BOOKS // 2)])
+            errors = brute_force_errors(index, books, sample)
+        print(f"{count:>7} {full:>10.2f}s {update:>9.2f}s {stats['recomputed']:>11} {lookup * 1e6:>10.1f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_BOOK_COUNTS)
@@ -0,0 +1,98 @@
+"""
+Benchmark of the cold-start cost of the API and spider processes.
+
+Each target runs in a fresh interpreter under `python -X importtime`, so
+nothing is shared with a warm process. For each one the wall time of the
+process and the total import time are printed, followed by the
+top-level packages that take the most import time (e.g. `sqlalchemy`, `azure`).
+
+Targets:
+- `api`: `import api.main`, what every uvicorn worker does before serving
+- `scrapy`: what `scrapy crawl books` does before its first request
+  (project settings, spider class, item pipelines instantiated)
+
+Neither target needs the database: startup must not connect to it.
+
+Usage:
+    python -m benchmarks.bench_startup [TARGET ...] [--top N] [--runs N]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SCRAPY_DIR = PROJECT_ROOT / "scrapy_books"
+
+SCRAPY_STARTUP = """
+from scrapy.utils.misc import load_object
+from scrapy.utils.project import get_project_settings
+from scrapy.spiderloader import SpiderLoader
+
+settings = get_project_settings()
+SpiderLoader.from_settings(settings).load("books")
+pipelines = [load_object(path)() for path in settings.getdict("ITEM_PIPELINES")]
+"""
+
+# name -> (code run with `python -c`, working directory)
+TARGETS: Dict[str, Tuple[str, Path]] = {
+    "api": ("import api.main", PROJECT_ROOT),
+    "scrapy": (SCRAPY_STARTUP, SCRAPY_DIR),
+}
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+\d+ \|\s+(\S+)")
+
+
+def run_target(code: str, cwd: Path) -> Tuple[float, Dict[str, int]]:
+    """
+    Run `code` in a fresh interpreter under `-X importtime`.
+    Returns the wall time (s) and the import time (us) spent in each top-level package.
+    """
+    env = {**os.environ, "PYTHONPATH": str(PROJECT_ROOT)}
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=cwd, env=env, capture_output=True, text=True, check=False,
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup failed:\n{result.stderr[-2000:]}")
+
+    # Self times, so that each microsecond is counted once
+    packages: Dict[str, int] = defaultdict(int)
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            packages[match.group(2).split(".")[0]] += int(match.group(1))
+    return wall, packages
+
+
+def main(targets: List[str], top: int, runs: int) -> None:
+    """Run each target `runs` times; report the best run and its slowest packages."""
+    for name in targets:
+        code, cwd = TARGETS[name]
+        best_wall, packages = min(
+            (run_target(code, cwd) for _ in range(runs)), key=lambda result: result[0]
+        )
+        total_ms = sum(packages.values()) / 1000
+        print(f"== {name}: wall {best_wall * 1000:.0f} ms, imports {total_ms:.0f} ms (best of {runs})")
+        for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            print(f"  {self_us / 1000:>8.1f} ms  {package}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("targets", nargs="*", help=f"any of {', '.join(TARGETS)} (default: all)")
+    parser.add_argument("--top", type=int, default=10, help="number of imports listed per target")
+    parser.add_argument("--runs", type=int, default=3, help="runs per target (best is kept)")
+    args = parser.parse_args()
+    unknown = set(args.targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown target(s): {', '.join(sorted(unknown))}")
+    main(args.targets or list(TARGETS), args.top, args.runs)
@@ -0,0 +1,334 @@
+"""
+Scenario-based HTTP load test of the FastAPI app.
+
+Starts `api.main:app` with uvicorn and N workers (or targets a running server
+with `--url`), then replays a weighted mix of list, search, by-id, snapshot
+and analytics calls from concurrent clients for a fixed duration. Book and
+category IDs are sampled from the API itself, so any seeded database works.
+
+Reports, per scenario: request count, throughput, latency percentiles
+(p50/p90/p99/max) and error rate (transport errors and 5xx; 4xx counts as
+an error too, except 404 on lookups of possibly missing data). Results are
+saved as JSON; pass a previous file with `--compare` to see the difference.
+
+Usage:
+    python -m benchmarks.loadtest --workers 4 --concurrency 32 --duration 30
+    python -m benchmarks.loadtest --no-cache --compare benchmarks/results/loadtest-before.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = PROJECT_ROOT / "benchmarks" / "results"
+PERCENTILES = (50, 90, 99)
+SEARCH_WORDS = ["the", "light", "love", "night", "girl", "life", "sea", "war"]
+
+# Statuses that are not errors for a scenario besides 2xx/304 (e.g. a book without history)
+EXPECTED_MISSES = {404}
+
+
+@dataclass
+class Catalog:
+    """IDs sampled from the API to build realistic requests."""
+    book_ids: List[int]
+    category_ids: List[int]
+    category_names: List[str]
+
+
+# A scenario builds (method, path, params) from the catalog and the random generator
+ScenarioRequest = Tuple[str, str, Dict]
+
+
+@dataclass
+class Scenario:
+    """One kind of call in the traffic mix."""
+    name: str
+    weight: int
+    build: Callable[[Catalog, random.Random], ScenarioRequest]
+    allowed_statuses: set = field(default_factory=set)
+
+
+SCENARIOS = [
+    # Lists
+    Scenario("books.list", 10, lambda c, r: ("GET", "/books/", {"limit": 50})),
+    Scenario("books.with-category", 8, lambda c, r: (
+        "GET", "/books/with-category", {"category_id": r.choice(c.category_ids), "limit": 50})),
+    Scenario("books.formatted", 4, lambda c, r: (
+        "GET", "/books/formatted", {"fields": ["id", "title", "price_incl_tax"], "limit": 100})),
+    # Searches
+    Scenario("books.search-title", 8, lambda c, r: (
+        "GET", "/books/search-title", {"title": r.choice(SEARCH_WORDS), "limit": 20}), EXPECTED_MISSES),
+    Scenario("books.search-category", 4, lambda c, r: (
+        "GET", "/books/search-category", {"category_name": r.choice(c.category_names)}), EXPECTED_MISSES),
+    Scenario("books.query", 6, lambda c, r: (
+        "GET", "/books/query",
+        {"min_rating": r.randint(1, 4), "sort_by": "price_incl_tax", "order": "desc", "limit": 20},
+    ), EXPECTED_MISSES),
+    # Lookups by ID
+    Scenario("books.by-id", 20, lambda c, r: ("GET", f"/books/{r.choice(c.book_ids)}", {}), EXPECTED_MISSES),
+    Scenario("books.batch", 3, lambda c, r: (
+        "POST", "/books/batch", {"ids": r.sample(c.book_ids, min(50, len(c.book_ids)))})),
+    # Snapshots
+    Scenario("snapshots.book", 10, lambda c, r: (
+        "GET", f"/snapshots/book/{r.choice(c.book_ids)}", {}), EXPECTED_MISSES),
+    Scenario("snapshots.compare-price", 4, lambda c, r: (
+        "GET", f"/snapshots/compare-price/{r.choice(c.book_ids)}", {}), EXPECTED_MISSES),
+    Scenario("snapshots.timeseries", 4, lambda c, r: (
+        "GET", "/snapshots/timeseries", {"category_id": r.choice(c.category_ids), "interval": "day"}),
+        EXPECTED_MISSES),
+    Scenario("snapshots.changes", 3, lambda c, r: ("GET", "/snapshots/changes", {"limit": 50})),
+    # Analytics
+    Scenario("analytics.average-price-per-category", 4, lambda c, r: (
+        "GET", "/analytics/average-price-per-category", {})),
+    Scenario("analytics.top-categories", 4, lambda c, r: ("GET", "/analytics/top-categories", {})),
+    Scenario("analytics.volatility", 2, lambda c, r: ("GET", "/analytics/volatility", {"limit": 20})),
+    Scenario("analytics.price-percentiles", 2, lambda c, r: (
+        "GET", "/analytics/price-percentiles", {"category_id": r.choice(c.category_ids)}), EXPECTED_MISSES),
+]
+
+
+@dataclass
+class ScenarioStats:
+    """Latencies (seconds) and outcomes of one scenario."""
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: Dict[str, int] = field(default_factory=dict)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+# -----------------------------
+# Server
+# -----------------------------
+def free_port() -> int:
+    """Return a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int, no_cache: bool) -> subprocess.Popen:
+    """Start uvicorn with `workers` processes on `port`."""
+    env = {**os.environ, "DB_ECHO": "False"}
+    if no_cache:
+        env["CACHE_ENABLED"] = "False"
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "api.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+        ],
+        cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL,
+    )
+
+
+def wait_until_ready(url: str, timeout: float = 30.0) -> None:
+    """Poll the server until it answers, or raise TimeoutError."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/books/categories", timeout=2).status_code < 500:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"Server at {url} did not start in {timeout:.0f}s")
+
+
+def load_catalog(url: str, sample_size: int = 2000) -> Catalog:
+    """Sample book IDs and categories from the API."""
+    categories = httpx.get(f"{url}/books/categories", timeout=30).json()
+    book_ids, cursor = [], None
+    while len(book_ids) < sample_size:
+        params = {"fields": "id", "limit": 500, **({"cursor": cursor} if cursor else {})}
+        page = httpx.get(f"{url}/books/", params=params, timeout=30).json()
+        book_ids += [book["id"] for book in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    if not book_ids or not categories:
+        raise RuntimeError("The database is empty: seed it or run a crawl first")
+    return Catalog(
+        book_ids=book_ids,
+        category_ids=[category["id"] for category in categories],
+        category_names=[category["name"] for category in categories],
+    )
+
+
+# -----------------------------
+# Load
+# -----------------------------
+async def virtual_user(
+    client: httpx.AsyncClient,
+    catalog: Catalog,
+    rng: random.Random,
+    deadline: float,
+    stats: Dict[str, ScenarioStats],
+) -> None:
+    """Send requests from the weighted mix, back to back, until the deadline."""
+    weights = [scenario.weight for scenario in SCENARIOS]
+    while time.perf_counter() < deadline:
+        scenario = rng.choices(SCENARIOS, weights)[0]
+        method, path, params = scenario.build(catalog, rng)
+        scenario_stats = stats[scenario.name]
+        start = time.perf_counter()
+        try:
+            if method == "POST":
+                response = await client.post(path, json=params)
+            else:
+                response = await client.get(path, params=params)
+            status = str(response.status_code)
+            ok = response.status_code < 400 or response.status_code in scenario.allowed_statuses
+        except httpx.HTTPError as exc:
+            status, ok = type(exc).__name__, False
+        scenario_stats.latencies.append(time.perf_counter() - start)
+        scenario_stats.statuses[status] = scenario_stats.statuses.get(status, 0) + 1
+        if not ok:
+            scenario_stats.errors += 1
+
+
+async def run_load(url: str, catalog: Catalog, concurrency: int, duration: float, seed: int) -> Dict:
+    """Run `concurrency` virtual users for `duration` seconds; return the summary."""
+    stats = {scenario.name: ScenarioStats() for scenario in SCENARIOS}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(
+            virtual_user(client, catalog, random.Random(seed + i), deadline, stats)
+            for i in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+    return summarize(stats, elapsed)
+
+
+def summarize(stats: Dict[str, ScenarioStats], elapsed: float) -> Dict:
+    """Aggregate per-scenario and overall throughput, latency percentiles and error rates."""
+
+    def describe(latencies: List[float], errors: int, statuses: Dict[str, int]) -> Dict:
+        latencies = sorted(latencies)
+        count = len(latencies)
+        return {
+            "requests": count,
+            "rps": count / elapsed,
+            **{f"p{q}_ms": percentile(latencies, q) * 1000 for q in PERCENTILES},
+            "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+            "errors": errors,
+            "error_rate": errors / count if count else 0.0,
+            "statuses": statuses,
+        }
+
+    scenarios = {
+        name: describe(s.latencies, s.errors, s.statuses) for name, s in stats.items() if s.latencies
+    }
+    all_statuses: Dict[str, int] = {}
+    for s in stats.values():
+        for status, count in s.statuses.items():
+            all_statuses[status] = all_statuses.get(status, 0) + count
+    total = describe(
+        [latency for s in stats.values() for latency in s.latencies],
+        sum(s.errors for s in stats.values()),
+        all_statuses,
+    )
+    return {"elapsed_s": elapsed, "total": total, "scenarios": scenarios}
+
+
+# -----------------------------
+# Report
+# -----------------------------
+def print_report(summary: Dict, previous: Optional[Dict] = None) -> None:
+    """Print the per-scenario table; with `previous`, also the relative change of rps and p99."""
+    header = (
+        f"{'scenario':<38} {'reqs':>7} {'rps':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}"
+        f" {'max ms':>8} {'err %':>6}"
+    )
+    if previous:
+        header += f" {'Δrps':>7} {'Δp99':>7}"
+    print(header)
+    rows = sorted(summary["scenarios"].items()) + [("TOTAL", summary["total"])]
+    for name, row in rows:
+        line = (
+            f"{name:<38} {row['requests']:>7} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p90_ms']:>8.1f}"
+            f" {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f} {row['error_rate'] * 100:>6.2f}"
+        )
+        if previous:
+            before = previous["total"] if name == "TOTAL" else previous["scenarios"].get(name)
+            if before and before["rps"] and before["p99_ms"]:
+                line += f" {row['rps'] / before['rps'] - 1:>+7.0%} {row['p99_ms'] / before['p99_ms'] - 1:>+7.0%}"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="target a running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds of unmeasured load first")
+    parser.add_argument("--no-cache", action="store_true", help="start the server with CACHE_ENABLED=False")
+    parser.add_argument("--seed", type=int, default=1, help="random seed of the traffic mix")
+    parser.add_argument("--output", type=Path, help="result file (default: benchmarks/results/loadtest-<time>.json)")
+    parser.add_argument("--compare", type=Path, help="previous result file to compare with")
+    parser.add_argument("--label", default="", help="free text stored with the results (e.g. a commit)")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        server = start_server(args.workers, port, args.no_cache)
+    try:
+        wait_until_ready(url)
+        catalog = load_catalog(url)
+        print(f"[INFO] {len(catalog.book_ids)} books, {len(catalog.category_ids)} categories sampled from {url}")
+        if args.warmup > 0:
+            asyncio.run(run_load(url, catalog, args.concurrency, args.warmup, args.seed + 10_000))
+        summary = asyncio.run(run_load(url, catalog, args.concurrency, args.duration, args.seed))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    result = {
+        "label": args.label,
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "url": args.url, "workers": args.workers if server else None, "concurrency": args.concurrency,
+            "duration": args.duration, "cache": not args.no_cache, "seed": args.seed,
+        },
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        **summary,
+    }
+    previous = json.loads(args.compare.read_text()) if args.compare else None
+    print_report(result, previous)
+
+    output = args.output or RESULTS_DIR / f"loadtest-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2) + "\n")
+    print(f"[INFO] Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Pytest plumbing of the microbenchmark suite.
+
+- `bench` fixture: times a callable (best of several rounds, each round long
+  enough to be measurable) and records the time per call under the test name.
+- Baselines: results are compared with `baselines.json` at the end of the run;
+  a benchmark slower than its baseline by more than the threshold is reported
+  as a regression and fails the run. `--bench-save` rewrites the baselines.
+  Timings only compare on the same hardware: baselines store the fingerprint
+  of the machine that recorded them, and on another machine regressions are
+  reported as warnings without failing the run.
+  Noisy benchmarks (e.g. committed writes) can set their own threshold with
+  `@pytest.mark.bench_threshold(0.5)`.
+- `bench_db` fixture: a dedicated Postgres database (`BENCH_DATABASE_URL`),
+  recreated and seeded once per run, with an empty snapshot archive.
+  DB benchmarks are skipped without it.
+
+Usage:
+    BENCH_DATABASE_URL=postgresql://.../books_bench python -m pytest benchmarks/suite -q
+    python -m pytest benchmarks/suite --bench-save        # record new baselines
+"""
+
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+# The spider and the pipeline import the Scrapy project as `scrapy_books`, as `scrapy crawl` does.
+# Import it now: pytest later puts PROJECT_ROOT (whose `scrapy_books` is the outer folder) first.
+sys.path.insert(0, str(PROJECT_ROOT / "scrapy_books"))
+import scrapy_books  # noqa: E402,F401 pylint: disable=wrong-import-position,unused-import
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines.json"
+DEFAULT_THRESHOLD = 0.25
+
+BENCH_CATEGORIES = 20
+BENCH_BOOKS = 2000
+BENCH_SNAPSHOTS_PER_BOOK = 4
+
+# name -> seconds per call, for this run; name -> threshold for marked benchmarks
+RESULTS: Dict[str, float] = {}
+THRESHOLDS: Dict[str, float] = {}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("bench", "microbenchmarks")
+    group.addoption("--bench-save", action="store_true", help="write the results as the new baselines")
+    group.addoption(
+        "--bench-threshold", type=float, default=DEFAULT_THRESHOLD,
+        help=f"relative slowdown reported as a regression (default: {DEFAULT_THRESHOLD})",
+    )
+    group.addoption("--bench-baseline", default=str(BASELINE_PATH), help="baseline file")
+    group.addoption("--bench-rounds", type=int, default=5, help="rounds per benchmark (best is kept)")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "bench_threshold(value): regression threshold of this benchmark")
+
+
+def measure(func: Callable[[], Any], rounds: int, min_round_time: float = 0.02) -> float:
+    """Return the best time per call of `func` over `rounds` rounds."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_time:
+            break
+        loops *= 2
+    best = elapsed / loops
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best
+
+
+@pytest.fixture
+def bench(request):
+    """Time `func(*args, **kwargs)` and record it under the test name; returns its last result."""
+    rounds = request.config.getoption("--bench-rounds")
+
+    def run(func: Callable, *args, **kwargs):
+        result = None
+
+        def call():
+            nonlocal result
+            result = func(*args, **kwargs)
+
+        RESULTS[request.node.name] = measure(call, rounds)
+        marker = request.node.get_closest_marker("bench_threshold")
+        if marker is not None:
+            THRESHOLDS[request.node.name] = marker.args[0]
+        return result
+
+    return run
+
+
+# -----------------------------
+# Baselines
+# -----------------------------
+def _cpu_model() -> str:
+    """CPU model name (Linux), else the processor reported by `platform`."""
+    try:
+        for line in Path("/proc/cpuinfo").read_text().splitlines():
+            if line.startswith("model name"):
+                return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def machine_fingerprint() -> Dict[str, Any]:
+    """What timings depend on: interpreter, OS, CPU model and core count."""
+    return {
+        "python": platform.python_version(),
+        "system": platform.system(),
+        "machine": platform.machine(),
+        "cpu": _cpu_model(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _compare(baseline: Dict[str, float], threshold: float) -> Dict[str, list]:
+    """Sort the results into regressions, improvements, unchanged and new benchmarks."""
+    report = {"regressions": [], "improvements": [], "unchanged": [], "new": []}
+    for name, seconds in sorted(RESULTS.items()):
+        reference = baseline.get(name)
+        if reference is None:
+            report["new"].append((name, None, seconds))
+            continue
+        ratio = seconds / reference
+        limit = 1 + THRESHOLDS.get(name, threshold)
+        if ratio > limit:
+            report["regressions"].append((name, reference, seconds))
+        elif ratio < 1 / limit:
+            report["improvements"].append((name, reference, seconds))
+        else:
+            report["unchanged"].append((name, reference, seconds))
+    return report
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    if not RESULTS:
+        return
+    path = Path(config.getoption("--bench-baseline"))
+    if config.getoption("--bench-save"):
+        baseline = json.loads(path.read_text()) if path.exists() else {"results": {}}
+        baseline["machine"] = machine_fingerprint()
+        baseline["results"] = {**baseline.get("results", {}), **RESULTS}
+        path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        config.bench_report = None
+        return
+
+    stored = json.loads(path.read_text()) if path.exists() else {}
+    config.bench_report = _compare(stored.get("results", {}), config.getoption("--bench-threshold"))
+    config.bench_gated = stored.get("machine") == machine_fingerprint()
+    if config.bench_gated and config.bench_report["regressions"] and session.exitstatus == 0:
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+
+def _format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if not RESULTS:
+        return
+    report = getattr(config, "bench_report", None)
+    if report is None:
+        terminalreporter.write_sep("=", f"benchmarks: {len(RESULTS)} baselines saved")
+        return
+    threshold = config.getoption("--bench-threshold")
+    terminalreporter.write_sep("=", f"benchmarks (regression threshold: +{threshold:.0%})")
+    for status in ("regressions", "improvements", "unchanged", "new"):
+        for name, reference, seconds in report[status]:
+            change = f"{seconds / reference - 1:+7.1%}" if reference else "    new"
+            reference_text = _format_seconds(reference) if reference else "-"
+            line = f"{name:<60} {reference_text:>10} -> {_format_seconds(seconds):>10} {change}"
+            terminalreporter.write_line(line, red=status == "regressions", green=status == "improvements")
+    if report["regressions"]:
+        if config.bench_gated:
+            terminalreporter.write_line(f"{len(report['regressions'])} benchmark(s) regressed", red=True, bold=True)
+        else:
+            terminalreporter.write_line(
+                f"{len(report['regressions'])} benchmark(s) slower than the baselines, which were recorded "
+                "on another machine: not failing (run with --bench-save to record baselines here)",
+                yellow=True,
+            )
+
+
+# -----------------------------
+# Database
+# -----------------------------
+def _seed(engine) -> None:
+    """Insert a deterministic catalog with snapshot history and one recorded crawl."""
+    # pylint: disable=import-outside-toplevel  # imported once the engine points at the bench DB
+    from sqlalchemy import insert
+    from sqlmodel import Session
+    from db.models import Book, BookSnapshot, Category, CrawlRun, ProductType, Tax
+    from scrapy_books.pipelines.sql_pipeline import SQLPipeline
+
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        session.execute(insert(Category), [{"name": f"Category {i}"} for i in range(1, BENCH_CATEGORIES + 1)])
+        session.execute(insert(ProductType), [{"type_name": "Books"}, {"type_name": "Ebooks"}])
+        session.execute(insert(Tax), [{"amount": 0.0}, {"amount": 2.0}])
+        books = []
+        for i in range(1, BENCH_BOOKS + 1):
+            price = round(rng.uniform(10, 60), 2)
+            books.append({
+                "title": f"Book {i} {rng.choice(['light', 'dark', 'sea', 'attic', 'night'])}",
+                "upc": f"bench{i:011d}",
+                "category_id": rng.randint(1, BENCH_CATEGORIES),
+                "product_type_id": 1 + i % 2,
+                "tax_id": 1,
+                "price_excl_tax": price,
+                "price_incl_tax": price,
+                "availability": rng.randint(0, 22),
+                "number_of_reviews": 0,
+                "rating": rng.randint(1, 5),
+                "description": "A benchmark book. " * 20,
+                "image_url": f"https://books.toscrape.com/media/{i}.jpg",
+            })
+        session.execute(insert(Book), books)
+        snapshots = [
+            {
+                "book_id": i,
+                "scraped_at": now - timedelta(days=BENCH_SNAPSHOTS_PER_BOOK - day),
+                "title": book["title"],
+                "price_excl_tax": round(book["price_excl_tax"] * rng.uniform(0.9, 1.1), 2),
+                "price_incl_tax": round(book["price_incl_tax"] * rng.uniform(0.9, 1.1), 2),
+                "availability": rng.randint(0, 22),
+                "number_of_reviews": 0,
+                "rating": rng.randint(1, 5),
+            }
+            for i, book in enumerate(books, start=1)
+            for day in range(BENCH_SNAPSHOTS_PER_BOOK)
+        ]
+        session.execute(insert(BookSnapshot), snapshots)
+        crawl = CrawlRun(started_at=now - timedelta(hours=1), finished_at=now, items_processed=BENCH_BOOKS)
+        session.add(crawl)
+        session.flush()
+        SQLPipeline()._write_rollups(session, crawl.id)  # pylint: disable=protected-access
+        session.commit()
+
+
+@pytest.fixture(scope="session")
+def bench_db(tmp_path_factory):
+    """
+    Point the application at `BENCH_DATABASE_URL`, then drop, recreate and seed it.
+    Use a dedicated database: its tables are dropped.
+    """
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        pytest.skip("BENCH_DATABASE_URL is not set")
+
+    # pylint: disable=import-outside-toplevel
+    from config.settings import settings
+    from db.archive import get_snapshot_archive
+    from db.database import get_engine, init_db
+
+    settings.db_user = None  # `database_url` falls back to DATABASE_URL
+    settings.db_echo = False
+    settings.snapshot_archive_dir = str(tmp_path_factory.mktemp("archive"))
+    get_snapshot_archive.cache_clear()
+    os.environ["DATABASE_URL"] = url
+    get_engine.cache_clear()
+    engine = get_engine()
+    init_db(drop_existing=True)  # with the pg_trgm extension of the title index
+    _seed(engine)
+    return engine
@@ -0,0 +1,66 @@
+"""
+Benchmarks of the snapshot archive (`db.archive`): bulk write and filtered reads.
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from db.archive import SnapshotArchive
+
+ARCHIVE_BOOKS = 1000
+ARCHIVE_SNAPSHOTS_PER_BOOK = 90  # e.g. daily crawls over three months
+
+
+def _rows():
+    rng = random.Random(42)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for day in range(ARCHIVE_SNAPSHOTS_PER_BOOK):
+        for book_id in range(1, ARCHIVE_BOOKS + 1):
+            price = round(rng.uniform(10, 60), 2)
+            rows.append((
+                len(rows) + 1, book_id, start + timedelta(days=day, minutes=book_id % 60), f"Book {book_id}",
+                price, price, rng.randint(0, 22), 0, rng.randint(1, 5),
+            ))
+    return rows
+
+
+@pytest.fixture(scope="module")
+def archive(tmp_path_factory):
+    archive = SnapshotArchive(tmp_path_factory.mktemp("archive"))
+    archive.write(_rows())
+    return archive
+
+
+def test_archive_write(bench, tmp_path):
+    rows = _rows()[:ARCHIVE_BOOKS * 30]
+    counter = iter(range(10**6))
+    paths = bench(lambda: SnapshotArchive(tmp_path / str(next(counter))).write(rows))
+    assert len(paths) == 1
+
+
+def test_archive_read_book(bench, archive):
+    table = bench(archive.read, book_ids=[42])
+    assert table.num_rows == ARCHIVE_SNAPSHOTS_PER_BOOK
+
+
+def test_archive_read_month(bench, archive):
+    start = datetime(2026, 2, 1, tzinfo=timezone.utc)
+    table = bench(archive.read, start=start, end=start + timedelta(days=28), columns=["book_id", "price_incl_tax"])
+    assert table.num_rows == ARCHIVE_BOOKS * 28
+
+
+def test_archive_iter_batches_month(bench, archive):
+    """Streamed read of a month: one record batch at a time, each file in (book, time) order."""
+    start = datetime(2026, 2, 1, tzinfo=timezone.utc)
+
+    def stream():
+        return list(archive.iter_batches(start=start, end=start + timedelta(days=28), batch_size=1000))
+
+    batches = bench(stream)
+    assert sum(batch.num_rows for batch in batches) == ARCHIVE_BOOKS * 28
+    assert max(batch.num_rows for batch in batches) <= 1000
+    book_ids = [book_id for batch in batches for book_id in batch.column("book_id").to_pylist()]
+    assert book_ids == sorted(book_ids)
@@ -0,0 +1,69 @@
+"""
+Benchmarks of every function of `api/crud` on the seeded bench database, and
+of the stored state read by sweep crawls (`db.sweep`).
+"""
+
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from db import sweep
+from db.models import Category
+from api.crud import analytics_crud, books_crud, crawl_crud, export_crud, snapshot_crud
+from api.utils.formatter import BOOK_ROW_FIELDS
+
+PAGE = 50
+LIST_COLUMNS = ["id", "title", "price_incl_tax", "rating", "category_name"]
+
+
+def _consume(iterator) -> None:
+    deque(iterator, maxlen=0)
+
+
+CASES = {
+    # analytics_crud
+    "get_average_book_price": analytics_crud.get_average_book_price,
+    "get_average_price_per_category": analytics_crud.get_average_price_per_category,
+    "get_top_categories_by_book_count": analytics_crud.get_top_categories_by_book_count,
+    "get_rollup_history": lambda: analytics_crud.get_rollup_history("category"),
+    # books_crud
+    "get_book_rows": lambda: books_crud.get_book_rows(BOOK_ROW_FIELDS, limit=PAGE),
+    "get_book_rows-projected": lambda: books_crud.get_book_rows(LIST_COLUMNS, min_rating=3, limit=PAGE),
+    "get_book_rows_by_keys": lambda: books_crud.get_book_rows_by_keys(BOOK_ROW_FIELDS, ids=list(range(1, 501))),
+    "query_books": lambda: books_crud.query_books(
+        LIST_COLUMNS, sort_by="price_incl_tax", descending=True, limit=PAGE, with_total=True, min_rating=2
+    ),
+    "get_all_categories": books_crud.get_all_categories,
+    "get_book_by_id": lambda: books_crud.get_book_by_id(42),
+    "get_table_data": lambda: books_crud.get_table_data(Category, limit=PAGE),
+    # crawl_crud
+    "get_data_generation": crawl_crud.get_data_generation,
+    # export_crud
+    "iter_books_for_export": lambda: _consume(export_crud.iter_books_for_export()),
+    "iter_snapshots_for_export": lambda: _consume(export_crud.iter_snapshots_for_export()),
+    "iter_book_row_batches": lambda: _consume(export_crud.iter_book_row_batches()),
+    "iter_snapshot_row_batches": lambda: _consume(export_crud.iter_snapshot_row_batches()),
+    # snapshot_crud
+    "get_snapshots_by_book_id": lambda: snapshot_crud.get_snapshots_by_book_id(42, limit=PAGE),
+    "compare_snapshots_price": lambda: snapshot_crud.compare_snapshots_price(42),
+    "compare_snapshots_rating": lambda: snapshot_crud.compare_snapshots_rating(42),
+    "get_price_stats": lambda: snapshot_crud.get_price_stats(42),
+    "get_snapshot_timeseries": lambda: snapshot_crud.get_snapshot_timeseries(
+        category_id=3, interval="day", metrics=("price", "availability"), aggregations=("avg", "last")
+    ),
+    "get_latest_crawl_start": snapshot_crud.get_latest_crawl_start,
+    "get_book_changes": lambda: snapshot_crud.get_book_changes(
+        since=datetime.now(timezone.utc) - timedelta(days=30), limit=PAGE
+    ),
+    "get_snapshot_rows_after": snapshot_crud.get_snapshot_rows_after,
+    "get_snapshot_ids": lambda: snapshot_crud.get_snapshot_ids(10**9),
+    "get_current_book_values": snapshot_crud.get_current_book_values,
+    # db.sweep
+    "load_listing_state": sweep.load_listing_state,
+}
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_crud(bench_db, bench, case):
+    bench(CASES[case])
@@ -0,0 +1,47 @@
+"""
+Benchmarks of book formatting: `format_books` (legacy, on schemas) and `format_book_rows`.
+"""
+
+import warnings
+
+import pytest
+
+from api.schemas.book import BookSchema
+from api.utils.formatter import BOOK_ROW_FIELDS, book_row_columns, format_book_rows, format_books
+from benchmarks.bench_serialization import make_orm_books, make_rows
+
+ROWS = 1000
+FIELD_CASES = {
+    "all": (None, False),
+    "flatten": (None, True),
+    "fields": (["id", "title", "price_incl_tax"], False),
+    "flatten-fields": (["id", "title", "category_name"], True),
+}
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return make_rows(ROWS)
+
+
+@pytest.fixture(scope="module")
+def schemas(rows):
+    return [BookSchema.model_validate(book, from_attributes=True) for book in make_orm_books(rows)]
+
+
+@pytest.mark.parametrize("case", FIELD_CASES)
+def test_format_books(bench, schemas, case):
+    fields, flatten = FIELD_CASES[case]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)  # BaseModel.dict()
+        assert len(bench(format_books, schemas, fields, flatten=flatten)) == ROWS
+
+
+@pytest.mark.parametrize("case", FIELD_CASES)
+def test_format_book_rows(bench, rows, case):
+    fields, flatten = FIELD_CASES[case]
+    columns = book_row_columns(fields, flatten=flatten)
+    # Rows as the SQL projection returns them: only the needed columns
+    indexes = [BOOK_ROW_FIELDS.index(column) for column in columns]
+    projected = [tuple(row[i] for i in indexes) for row in rows]
+    assert len(bench(format_book_rows, projected, fields, flatten=flatten, columns=columns)) == ROWS
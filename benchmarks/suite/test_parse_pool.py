@@ -0,0 +1,70 @@
+"""
+Guarantees of `OrderedParsePool` (the spider's `parse_workers` mode): results
+released in submission order, at most `max_pending` submissions in flight,
+and cancelled callbacks not blocking the ones after them. Not timed.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from scrapy_books.parse_pool import OrderedParsePool
+
+WORKERS = 2
+MAX_PENDING = 3
+
+
+@pytest.fixture
+def pool():
+    parse_pool = OrderedParsePool(WORKERS, max_pending=MAX_PENDING)
+    yield parse_pool
+    parse_pool.close()
+
+
+def test_results_released_in_submission_order(pool):
+    # Later submissions finish first
+    delays = [0.4, 0.3, 0.2, 0.1, 0.0, 0.0, 0.2, 0.0]
+
+    async def crawl():
+        released, in_flight = [], []
+
+        async def callback(index: int, delay: float) -> None:
+            await pool.run(time.sleep, delay)
+            released.append(index)
+
+        async def monitor() -> None:
+            while True:
+                in_flight.append(pool.submitted - pool.released)
+                await asyncio.sleep(0.005)
+
+        watcher = asyncio.ensure_future(monitor())
+        await asyncio.gather(*(callback(i, delay) for i, delay in enumerate(delays)))
+        watcher.cancel()
+        return released, in_flight
+
+    released, in_flight = asyncio.run(crawl())
+    assert released == list(range(len(delays)))
+    assert max(in_flight) == MAX_PENDING
+
+
+def test_cancelled_callback_does_not_block_later_ones(pool):
+    async def crawl():
+        released = []
+
+        async def callback(index: int, delay: float) -> None:
+            await pool.run(time.sleep, delay)
+            released.append(index)
+
+        first = asyncio.ensure_future(callback(0, 0.5))
+        waiting = asyncio.ensure_future(callback(1, 0.0))
+        await asyncio.sleep(0.3)  # the second one is done and waits for its turn
+        waiting.cancel()
+        later = asyncio.ensure_future(callback(2, 0.0))
+        await asyncio.wait_for(asyncio.gather(first, later), timeout=10)
+        return released, waiting.cancelled()
+
+    released, cancelled = asyncio.run(crawl())
+    assert cancelled
+    assert released == [0, 2]
+    assert pool.released == pool.submitted == 3
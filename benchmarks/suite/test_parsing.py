@@ -0,0 +1,42 @@
+"""
+Benchmarks of the spider: `parse_book` on a recorded detail page and the `clean_*` helpers.
+"""
+
+from pathlib import Path
+
+import pytest
+from scrapy.http import HtmlResponse
+
+from scrapy_books.spiders.books import BooksSpider, clean_availability, clean_description, clean_price
+
+BOOK_PAGE = (Path(__file__).resolve().parent / "data" / "book_page.html").read_bytes()
+BOOK_URL = "https://books.toscrape.com/catalogue/a-light-in-the-attic_1000/index.html"
+
+
+def test_parse_book(bench):
+    spider = BooksSpider()
+
+    def parse():
+        # A fresh response per call: selectors are cached on the response
+        response = HtmlResponse(url=BOOK_URL, body=BOOK_PAGE, encoding="utf-8")
+        return list(spider.parse_book(response))
+
+    (item,) = bench(parse)
+    assert item["upc"] == "a897fe39b1053632"
+    assert item["price_incl_tax"] == 51.77
+    assert item["availability"] == 22
+    assert item["rating"] == 3
+    assert item["category"] == "Poetry"
+
+
+@pytest.mark.parametrize(
+    "func, value",
+    [
+        (clean_price, "£51.77"),
+        (clean_availability, "In stock (22 available)"),
+        (clean_description, "It's hard to imagine a world without A Light in the Attic. " * 10),
+    ],
+    ids=["clean_price", "clean_availability", "clean_description"],
+)
+def test_clean(bench, func, value):
+    assert bench(func, value) is not None
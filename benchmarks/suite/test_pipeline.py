@@ -0,0 +1,53 @@
+"""
+Benchmark of `SQLPipeline.process_item` throughput against the bench database.
+Every item is committed, so timings depend on disk flushes: the threshold is looser.
+"""
+
+import itertools
+import logging
+
+import pytest
+
+from scrapy_books.pipelines.sql_pipeline import SQLPipeline
+
+
+class _Spider:
+    logger = logging.getLogger("bench")
+
+
+pytestmark = pytest.mark.bench_threshold(0.5)
+
+
+def _item(upc: str, price: float) -> dict:
+    return {
+        "upc": upc,
+        "title": "A Light in the Attic",
+        "category": "Poetry",
+        "product_type": "Books",
+        "tax": 0.0,
+        "price_excl_tax": price,
+        "price_incl_tax": price,
+        "availability": 22,
+        "number_of_reviews": 0,
+        "rating": 3,
+        "description": "It's hard to imagine a world without A Light in the Attic. " * 10,
+        "image_url": "https://books.toscrape.com/media/cache/fe/72/fe72f0532301ec28892ae79a629a293c.jpg",
+    }
+
+
+def test_process_item_new_book(bench_db, bench):
+    pipeline = SQLPipeline()
+    counter = itertools.count()
+    bench(lambda: pipeline.process_item(_item(f"new{next(counter):013d}", 51.77), _Spider()))
+
+
+def test_process_item_existing_book(bench_db, bench):
+    """Update of a seeded book: one snapshot written (old ones are archived at crawl end, not here)."""
+    pipeline = SQLPipeline()
+    counter = itertools.count()
+
+    def process():
+        pipeline.seen_upcs.clear()  # the same books are processed again on every round
+        return pipeline.process_item(_item(f"bench{next(counter) % 2000 + 1:011d}", 42.0), _Spider())
+
+    bench(process)
@@ -0,0 +1,39 @@
+"""
+Benchmarks of the similar-books index (`db.similar_books`): builds and lookup.
+"""
+
+import numpy as np
+import pytest
+
+from db.similar_books import SimilarBooksIndex
+from benchmarks.bench_similarity import make_books
+
+INDEX_BOOKS = 1000
+
+
+@pytest.fixture(scope="module")
+def books():
+    return make_books(INDEX_BOOKS, np.random.default_rng(42))
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory, books):
+    index = SimilarBooksIndex(tmp_path_factory.mktemp("similar_books"))
+    index.update(books)
+    return index
+
+
+def test_similar_books_full_build(bench, tmp_path, books):
+    counter = iter(range(10**6))
+    stats = bench(lambda: SimilarBooksIndex(tmp_path / str(next(counter))).update(books))
+    assert stats["mode"] == "full"
+
+
+def test_similar_books_update_unchanged(bench, index, books):
+    stats = bench(index.update, books)
+    assert stats["mode"] == "unchanged"
+
+
+def test_similar_books_lookup(bench, index):
+    ids, _ = bench(index.neighbors, 42)
+    assert len(ids) == index.k
@@ -5,15 +5,11 @@ Application settings management using Pydantic and optional Azure Key Vault inte
 import os
 from pathlib import Path
 from urllib.parse import quote_plus
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-from azure.identity import DefaultAzureCredential
-from azure.keyvault.secrets import SecretClient
-from azure.core.exceptions import AzureError
-
 def to_snake_case(name: str) -> str:
     """Convert kebab-case from Key Vault to snake_case Python variable."""
     return name.lower().replace("-", "_")
@@ -52,6 +48,68 @@ class Settings(BaseSettings):
     docker_on: bool = Field(False, alias="DOCKER_ON")
     run_scrapy: bool = Field(True, alias="RUN_SCRAPY")
     run_api: bool = Field(True, alias="RUN_API")
+    # Log every SQL statement (slow, for debugging only)
+    db_echo: bool = Field(False, alias="DB_ECHO")
+    # Connection pool of each process (API worker, spider): keep
+    # workers * (pool size + overflow) under Postgres' max_connections
+    db_pool_size: int = Field(5, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(10, alias="DB_MAX_OVERFLOW")
+
+    # -----------------------------
+    # API server (runner.py)
+    # -----------------------------
+    # "development": one uvicorn process with --reload;
+    # "production": pre-forked workers (gunicorn if installed, else uvicorn --workers)
+    api_env: Literal["development", "production"] = Field("development", alias="API_ENV")
+    api_host: str = Field("127.0.0.1", alias="API_HOST")
+    api_port: int = Field(8000, alias="API_PORT")
+    # Production worker processes (0: one per CPU core)
+    api_workers: int = Field(0, alias="API_WORKERS")
+    # Seconds a worker has to finish its requests on restart or shutdown
+    api_graceful_timeout: int = Field(30, alias="API_GRACEFUL_TIMEOUT")
+    # Recycle a worker after this many requests, with jitter (0: never)
+    api_max_requests: int = Field(0, alias="API_MAX_REQUESTS")
+    # Warm pools, caches and popular queries before /ready answers 200
+    api_warmup: bool = Field(True, alias="API_WARMUP")
+    # Longest warm-up before the worker accepts connections anyway
+    api_warmup_timeout_seconds: float = Field(60.0, alias="API_WARMUP_TIMEOUT_SECONDS")
+
+    # -----------------------------
+    # Crawl scheduler (runner.py, own process)
+    # -----------------------------
+    crawl_interval_minutes: int = Field(15, alias="CRAWL_INTERVAL_MINUTES")
+    # Listing-only price sweeps between full crawls (unset: no sweeps)
+    sweep_interval_minutes: Optional[int] = Field(None, alias="SWEEP_INTERVAL_MINUTES")
+
+    # -----------------------------
+    # API response cache
+    # -----------------------------
+    cache_enabled: bool = Field(True, alias="CACHE_ENABLED")
+    cache_ttl_seconds: int = Field(300, alias="CACHE_TTL_SECONDS")
+    cache_max_entries: int = Field(1024, alias="CACHE_MAX_ENTRIES")
+    cache_max_bytes: int = Field(64 * 1024 * 1024, alias="CACHE_MAX_BYTES")
+    # Shared backend for multiple workers (requires the `redis` package)
+    cache_redis_url: Optional[str] = Field(None, alias="CACHE_REDIS_URL")
+    # How often the latest crawl id is re-read to detect new data
+    cache_generation_poll_seconds: float = Field(1.0, alias="CACHE_GENERATION_POLL_SECONDS")
+    # Cache-Control max-age of read endpoints (clients revalidate with the ETag)
+    http_cache_max_age: int = Field(0, alias="HTTP_CACHE_MAX_AGE")
+
+    # -----------------------------
+    # Snapshot archive (cold tier)
+    # -----------------------------
+    # Snapshots beyond the hot window are moved here as Parquet files, partitioned by month
+    snapshot_archive_dir: str = Field(
+        str(Path(__file__).resolve().parents[1] / "archive" / "snapshots"), alias="SNAPSHOT_ARCHIVE_DIR"
+    )
+
+    # -----------------------------
+    # Similar books index
+    # -----------------------------
+    # Top-K neighbours of each book, rebuilt at the end of each crawl (memory-mapped by the API)
+    similar_books_index_dir: str = Field(
+        str(Path(__file__).resolve().parents[1] / "index" / "similar_books"), alias="SIMILAR_BOOKS_INDEX_DIR"
+    )
 
     # -----------------------------
     # Pydantic config
@@ -78,6 +136,12 @@ class Settings(BaseSettings):
             print("[INFO] Configuration loaded from cache.")
             return
 
+        # The Azure SDK is slow to import: only pay for it when a vault is configured
+        # pylint: disable=import-outside-toplevel
+        from azure.identity import DefaultAzureCredential
+        from azure.keyvault.secrets import SecretClient
+        from azure.core.exceptions import AzureError
+
         try:
             credential = DefaultAzureCredential()
             client = SecretClient(vault_url=self.azure_key_vault_url, credential=credential)
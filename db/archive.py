@@ -0,0 +1,197 @@
+"""
+Cold tier of the snapshot history: compressed Parquet files on local disk.
+
+Postgres keeps the latest snapshots of each book (the hot window, see
+`SQLPipeline.MAX_SNAPSHOTS_TO_KEEP`); older ones are moved here in bulk at the
+end of each crawl instead of being deleted. Layout:
+
+    <SNAPSHOT_ARCHIVE_DIR>/month=2026-09/part-<first id>-<last id>.parquet
+
+Rows are sorted by (book_id, scraped_at) and written in row groups, so a read
+filtered by book or by date only opens the matching months (partition
+pruning) and the matching row groups (min/max statistics).
+pyarrow is imported on first use: neither the API nor the spider pays for it
+at startup.
+"""
+
+import os
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from config.settings import settings
+
+# Archived columns, in the order of the rows given to `SnapshotArchive.write`
+ARCHIVE_COLUMNS = (
+    "id", "book_id", "scraped_at", "title",
+    "price_excl_tax", "price_incl_tax", "availability", "number_of_reviews", "rating",
+)
+ROW_GROUP_SIZE = 8192  # small enough for row group statistics to skip most of a month
+
+
+def archive_schema():
+    """Arrow schema of the archive files."""
+    import pyarrow as pa  # pylint: disable=import-outside-toplevel
+
+    return pa.schema([
+        ("id", pa.int64()),
+        ("book_id", pa.int64()),
+        ("scraped_at", pa.timestamp("us", tz="UTC")),
+        ("title", pa.string()),
+        ("price_excl_tax", pa.float64()),
+        ("price_incl_tax", pa.float64()),
+        ("availability", pa.int64()),
+        ("number_of_reviews", pa.int64()),
+        ("rating", pa.int64()),
+    ])
+
+
+def _utc(value: datetime) -> datetime:
+    """Archived times are UTC; naive datetimes are taken as UTC, like the database session does."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _month(value: datetime) -> str:
+    return _utc(value).strftime("%Y-%m")
+
+
+class SnapshotArchive:
+    """Monthly Parquet partitions of archived snapshots under `root`."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def months(self) -> List[str]:
+        """Archived months ("YYYY-MM"), oldest first (a directory listing, no file is read)."""
+        if not self.root.is_dir():
+            return []
+        return sorted(
+            entry.name.split("=", 1)[1]
+            for entry in self.root.iterdir()
+            if entry.is_dir() and entry.name.startswith("month=")
+        )
+
+    def covers(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> bool:
+        """Whether any archived month overlaps [start, end)."""
+        return any(
+            (start is None or month >= _month(start)) and (end is None or month <= _month(end))
+            for month in self.months()
+        )
+
+    def write(self, rows: Sequence[Tuple]) -> List[Path]:
+        """
+        Write snapshot rows (`ARCHIVE_COLUMNS` order) as one new file per month.
+        Files are written under a temporary name and renamed once complete.
+        Returns the written paths.
+        """
+        # pylint: disable=import-outside-toplevel
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        by_month: Dict[str, List[Tuple]] = {}
+        for row in rows:
+            by_month.setdefault(_month(row[2]), []).append(row)
+
+        schema = archive_schema()
+        paths = []
+        for month, month_rows in sorted(by_month.items()):
+            columns = list(zip(*month_rows))
+            table = pa.table(
+                {name: pa.array(values, type=schema.field(name).type) for name, values in zip(ARCHIVE_COLUMNS, columns)},
+                schema=schema,
+            ).sort_by([("book_id", "ascending"), ("scraped_at", "ascending")])
+            first_id, last_id = pc.min(table["id"]).as_py(), pc.max(table["id"]).as_py()
+            directory = self.root / f"month={month}"
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f"part-{first_id}-{last_id}.parquet"
+            # Hidden until renamed: dataset discovery skips names starting with "."
+            temporary = directory / f".{path.name}.tmp"
+            pq.write_table(table, temporary, compression="zstd", row_group_size=ROW_GROUP_SIZE)
+            os.replace(temporary, path)
+            paths.append(path)
+        return paths
+
+    def _dataset(self, book_ids, start, end, before=None):
+        """The archive as a `pyarrow.dataset.Dataset` and the filter expression of the given bounds."""
+        # pylint: disable=import-outside-toplevel
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        partitioning = ds.partitioning(pa.schema([("month", pa.string())]), flavor="hive")
+        dataset = ds.dataset(self.root, format="parquet", partitioning=partitioning)
+        conditions = []
+        if book_ids is not None:
+            conditions.append(ds.field("book_id").isin(list(book_ids)))
+        if start is not None:
+            conditions += [ds.field("month") >= _month(start), ds.field("scraped_at") >= _utc(start)]
+        if end is not None:
+            conditions += [ds.field("month") <= _month(end), ds.field("scraped_at") < _utc(end)]
+        if before is not None:
+            scraped_at, snapshot_id = _utc(before[0]), before[1]
+            conditions.append(
+                (ds.field("scraped_at") < scraped_at)
+                | ((ds.field("scraped_at") == scraped_at) & (ds.field("id") < snapshot_id))
+            )
+        condition = None
+        for item in conditions:
+            condition = item if condition is None else condition & item
+        return dataset, condition
+
+    def read(
+        self,
+        book_ids: Optional[Sequence[int]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        before: Optional[Tuple[datetime, int]] = None,
+        columns: Optional[Sequence[str]] = None,
+    ):
+        """
+        Return the archived snapshots matching the filters as a `pyarrow.Table`
+        (unordered). `before` is a (scraped_at, id) key: only older rows are read.
+        """
+        columns = list(columns or ARCHIVE_COLUMNS)
+        if not self.months():
+            return archive_schema().empty_table().select(columns)
+        dataset, condition = self._dataset(book_ids, start, end, before)
+        return dataset.to_table(columns=columns, filter=condition)
+
+    def iter_batches(
+        self,
+        book_ids: Optional[Sequence[int]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        columns: Optional[Sequence[str]] = None,
+        batch_size: int = ROW_GROUP_SIZE,
+    ) -> Iterator:
+        """
+        Yield the archived snapshots matching the filters as `pyarrow.RecordBatch`es,
+        file by file (oldest month and first IDs first), each file ordered by
+        book and scrape time. Only one batch is held in memory at a time.
+        """
+        columns = list(columns or ARCHIVE_COLUMNS)
+        if not self.months():
+            return
+        dataset, condition = self._dataset(book_ids, start, end)
+        fragments = sorted(dataset.get_fragments(filter=condition), key=lambda fragment: _part_key(fragment.path))
+        for fragment in fragments:
+            # The dataset schema includes the `month` partition field used by the filter
+            batches = fragment.to_batches(
+                schema=dataset.schema, columns=columns, filter=condition, batch_size=batch_size
+            )
+            for batch in batches:
+                if batch.num_rows:
+                    yield batch
+
+
+def _part_key(path: str) -> Tuple[str, int]:
+    """Sort key of an archive file: its month, then its first snapshot ID."""
+    part = Path(path)
+    return part.parent.name, int(part.name.split("-")[1])
+
+
+@lru_cache(maxsize=None)
+def get_snapshot_archive() -> SnapshotArchive:
+    """Return the archive under `SNAPSHOT_ARCHIVE_DIR`."""
+    return SnapshotArchive(Path(settings.snapshot_archive_dir))
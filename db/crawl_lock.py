@@ -0,0 +1,50 @@
+"""
+Marker of a crawl in progress: a Postgres advisory lock held by the Scrapy
+pipeline from the start of the crawl until its CrawlRun is committed.
+
+The pipeline commits every item as it goes, so while a crawl runs the tables
+hold partial data that belongs to no generation yet. The API reads the
+marker along with the generation (`api.crud.crawl_crud.get_data_generation`)
+and neither caches responses nor sends ETags until the crawl is recorded.
+The lock belongs to the pipeline's connection: a crawl that dies releases it.
+"""
+
+from typing import Optional
+
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.engine import Connection
+
+from db.database import get_engine
+
+CRAWL_LOCK_KEY = 0x424F4F4B  # "BOOK": advisory lock key of this application
+
+# True while any session holds the lock (a 32-bit key shows as classid 0 / objid key in pg_locks)
+CRAWL_IN_PROGRESS = literal_column(
+    "EXISTS (SELECT 1 FROM pg_locks WHERE locktype = 'advisory' AND classid = 0 "
+    f"AND objid = {CRAWL_LOCK_KEY} AND objsubid = 1 AND granted)"
+)
+
+
+def acquire_crawl_lock() -> Optional[Connection]:
+    """
+    Take the lock on a dedicated connection and return it, or None if another
+    crawl already holds it (the marker is set either way).
+    """
+    connection = get_engine().connect()
+    acquired = connection.execute(select(func.pg_try_advisory_lock(CRAWL_LOCK_KEY))).scalar()
+    connection.commit()  # session-level lock: kept after the transaction, which must not stay open
+    if not acquired:
+        connection.close()
+        return None
+    return connection
+
+
+def release_crawl_lock(connection: Optional[Connection]) -> None:
+    """Release a lock taken by `acquire_crawl_lock`."""
+    if connection is None:
+        return
+    try:
+        connection.execute(select(func.pg_advisory_unlock(CRAWL_LOCK_KEY)))
+        connection.commit()
+    finally:
+        connection.close()
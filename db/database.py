@@ -4,33 +4,127 @@ Database initialization and session management.
 This module configures the SQLModel engine using settings, 
 handles database initialization, readiness checks, 
 and provides a FastAPI dependency for sessions.
+
+The engine is created on first use (`get_engine()`), not at import time,
+so importing models or CRUD modules stays cheap and side-effect free.
+Each process gets its own connection pool, including forked server workers.
+Event hooks on the engine count queries and their time, process-wide and
+per request (see `track_queries`).
 """
 
+import os
+import threading
 import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Iterator, Optional
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
 from sqlmodel import create_engine, SQLModel, Session
 from sqlalchemy.exc import OperationalError
 from config.settings import settings
-from db.models import Book, Category, ProductType, Tax  # noqa: F401 - used for table creation
+from db.models import Book, Category, ProductType, Tax, CrawlRun, CrawlRollup  # noqa: F401 - used for table creation
+
+# --- Query instrumentation ---
+class QueryStats:
+    """Number of queries executed and time spent in them (seconds)."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        """Record one query."""
+        with self._lock:
+            self.queries += 1
+            self.seconds += seconds
+
+
+# Every query of the process, and the queries of the current request (if tracked)
+query_totals = QueryStats()
+_current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    Count the queries of the enclosed block (e.g. an HTTP request).
+    Threads started from it (FastAPI's threadpool) share the stats.
+    """
+    stats = QueryStats()
+    token = _current_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_query_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started_at"].pop()
+    query_totals.add(elapsed)
+    stats = _current_query_stats.get()
+    if stats is not None:
+        stats.add(elapsed)
+
+
+def _handle_error(exception_context):
+    # A failed query never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started_at"):
+        connection.info["query_started_at"].pop()
+
+
+# --- Global engine (created lazily) ---
+@lru_cache(maxsize=None)
+def get_engine() -> Engine:
+    """Return the process-wide engine, creating it on first call."""
+    engine = create_engine(
+        settings.database_url,
+        echo=settings.db_echo,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        connect_args={"options": "-c timezone=utc"}
+    )
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    return engine
+
+
+def _drop_inherited_pool() -> None:
+    """
+    In a forked child (e.g. a pre-forked API worker), forget the connections
+    pooled by the parent without closing them: they belong to the parent.
+    The child then opens its own pool on first use.
+    """
+    if get_engine.cache_info().currsize:
+        get_engine().dispose(close=False)
 
-# --- Global engine ---
-DATABASE_URL = settings.database_url
-print(f"[INFO] Using database URL: {DATABASE_URL}")
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=True,
-    connect_args={"options": "-c timezone=utc"}
-)
+os.register_at_fork(after_in_child=_drop_inherited_pool)
 
 # --- Database initialization ---
 def init_db(drop_existing: bool = False) -> None:
     """Create all tables in the database."""
     if drop_existing:
         print("[INFO] Dropping existing tables...")
-        SQLModel.metadata.drop_all(engine)
+        SQLModel.metadata.drop_all(get_engine())
 
     print("[INFO] Creating tables...")
+    engine = get_engine()
+    with engine.begin() as connection:
+        # Trigram operators of the title search index
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
     SQLModel.metadata.create_all(engine)
+    # create_all skips the indexes of tables that already exist
+    for index in Book.__table__.indexes:
+        index.create(engine, checkfirst=True)
     print("[INFO] Tables created successfully!")
 
 # --- Wait for PostgreSQL readiness ---
@@ -39,7 +133,7 @@ def wait_for_postgres(timeout: int = 30, interval: float = 1.0) -> None:
     start = time.time()
     while True:
         try:
-            with engine.connect():
+            with get_engine().connect():
                 print("[INFO] PostgreSQL is ready!")
                 return
         except OperationalError as exc:
@@ -53,5 +147,5 @@ def wait_for_postgres(timeout: int = 30, interval: float = 1.0) -> None:
 # --- Dependency for FastAPI ---
 def get_db():
     """Yield a SQLModel session for FastAPI dependency injection."""
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         yield session
@@ -5,7 +5,7 @@ Defines entities, their attributes, and relationships using SQLModel.
 
 from datetime import datetime, timezone
 from typing import List, Optional
-from sqlmodel import SQLModel, Field, Relationship, Column, TEXT
+from sqlmodel import SQLModel, Field, Relationship, Column, TEXT, Index
 
 
 class Category(SQLModel, table=True):
@@ -53,20 +53,24 @@ class Book(SQLModel, table=True):
     Contains descriptive and financial information.
     """
     __tablename__ = "books"
+    __table_args__ = (
+        # Substring search on titles (`ILIKE '%...%'`): a trigram index, btree cannot serve it
+        Index("ix_books_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str = Field(max_length=255, nullable=False)
     upc: str = Field(max_length=50, unique=True, index=True, nullable=False)
     price_excl_tax: float = Field(nullable=False)
-    price_incl_tax: float = Field(nullable=False)
+    price_incl_tax: float = Field(index=True, nullable=False)
     availability: int = Field(nullable=False)
     number_of_reviews: int = Field(nullable=False)
-    rating: int = Field(default=0, nullable=False)
+    rating: int = Field(default=0, index=True, nullable=False)
     description: Optional[str] = Field(default=None, sa_column=Column(TEXT))
     image_url: Optional[str] = Field(default=None)
 
     # Foreign keys
-    category_id: int = Field(foreign_key="categories.id", nullable=False)
+    category_id: int = Field(foreign_key="categories.id", index=True, nullable=False)
     product_type_id: int = Field(foreign_key="product_types.id", nullable=False)
     tax_id: int = Field(foreign_key="taxes.id", nullable=False)
 
@@ -85,6 +89,10 @@ class BookSnapshot(SQLModel, table=True):
     Only keeps dynamic and identifying fields.
     """
     __tablename__ = "book_snapshots"
+    __table_args__ = (
+        # Per-book history ordered by time (keyset pagination on (scraped_at, id))
+        Index("ix_book_snapshots_book_id_scraped_at", "book_id", "scraped_at", "id"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     book_id: int = Field(foreign_key="books.id", nullable=False)
@@ -104,3 +112,43 @@ class BookSnapshot(SQLModel, table=True):
 
     # Relationships
     book: Book = Relationship(back_populates="snapshots")
+
+
+class CrawlRun(SQLModel, table=True):
+    """
+    One completed crawl, recorded by the Scrapy pipeline when the spider closes.
+    The latest ID is the data generation: it changes whenever new data lands.
+    """
+    __tablename__ = "crawl_runs"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    started_at: datetime = Field(nullable=False)
+    finished_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc), index=True, nullable=False
+    )
+    items_processed: int = Field(default=0, nullable=False)
+
+
+class CrawlRollup(SQLModel, table=True):
+    """
+    Aggregates of the `books` table per category or product type, written once
+    at the end of each crawl. Trend queries read this table instead of the
+    snapshot history.
+    """
+    __tablename__ = "crawl_rollups"
+    __table_args__ = (
+        Index("ix_crawl_rollups_dimension", "dimension", "dimension_id", "crawl_id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    crawl_id: int = Field(foreign_key="crawl_runs.id", index=True, nullable=False)
+    dimension: str = Field(max_length=20, nullable=False)  # "category" or "product_type"
+    dimension_id: int = Field(nullable=False)
+    dimension_name: str = Field(max_length=100, nullable=False)
+
+    book_count: int = Field(nullable=False)
+    avg_price: float = Field(nullable=False)
+    min_price: float = Field(nullable=False)
+    max_price: float = Field(nullable=False)
+    avg_rating: float = Field(nullable=False)
+    total_stock: int = Field(nullable=False)
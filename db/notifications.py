@@ -0,0 +1,51 @@
+"""
+Catalog change events, published with Postgres `NOTIFY`.
+
+The Scrapy pipeline queues one event per committed created or changed book
+and sends them in batches: every `SQLPipeline.NOTIFY_BATCH_SIZE` events in a
+transaction of their own, then at crawl end along with a `crawl` event in the
+transaction that records the crawl. NOTIFY is delivered on commit, so
+listeners only hear about committed rows.
+The API listens on the channel and fans events out to clients
+(`api/utils/events.py`).
+
+Event shapes:
+- `{"type": "book", "action": "created" | "updated", "book_id", "category_id",
+  "title", "changes": {"price_incl_tax": [old, new], ...}}`
+- `{"type": "crawl", "crawl_id", "items_processed", "archived"}`
+
+A payload is a JSON array of events, split to stay under the 8000-byte limit
+of NOTIFY payloads.
+"""
+
+import json
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import func, select
+from sqlmodel import Session
+
+CHANNEL = "catalog_events"
+MAX_PAYLOAD_BYTES = 7900
+
+Event = Dict[str, Any]
+
+
+def encode_batches(events: Sequence[Event]) -> List[str]:
+    """Pack events into as few JSON-array payloads as fit under MAX_PAYLOAD_BYTES."""
+    payloads, batch, size = [], [], 2
+    for event in events:
+        encoded = json.dumps(event, separators=(",", ":"), default=str)
+        if batch and size + len(encoded.encode()) + 1 > MAX_PAYLOAD_BYTES:
+            payloads.append("[" + ",".join(batch) + "]")
+            batch, size = [], 2
+        batch.append(encoded)
+        size += len(encoded.encode()) + 1
+    if batch:
+        payloads.append("[" + ",".join(batch) + "]")
+    return payloads
+
+
+def notify(session: Session, events: Sequence[Event]) -> None:
+    """Queue `events` on CHANNEL; they are delivered when `session` commits."""
+    for payload in encode_batches(events):
+        session.exec(select(func.pg_notify(CHANNEL, payload)))
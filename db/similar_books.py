@@ -0,0 +1,463 @@
+"""
+Precomputed "similar books" index, built offline from the catalog text.
+
+Each book is a TF-IDF vector of its title, description and category
+(sublinear term frequencies, L2-normalized, kept as sparse CSR rows in NumPy
+arrays). The cosine similarity of every book with every other one is scored
+block by block through an inverted index, and only the top
+`SIMILAR_BOOKS_K` neighbours of each book are kept. They are stored as
+`.npy` files that the API memory-maps:
+
+    <SIMILAR_BOOKS_INDEX_DIR>/manifest.json      current version, build stats
+    <SIMILAR_BOOKS_INDEX_DIR>/<version>/*.npy    neighbours, scores, text hashes...
+
+A dense `book_id -> row` array makes a lookup O(1). New versions are written
+to a new directory and published by replacing the manifest, so readers never
+see a partial index; the previous version stays on disk for readers that
+read the old manifest just before.
+
+Updates are incremental: a hash of the text of each book tells which books
+changed since the last build (in practice, during the last crawl). Only their
+rows are scored again, with the vocabulary and IDF weights of the last full
+build, and they are merged into the neighbour lists of the other books. A
+list that may have lost a neighbour is recomputed. Once more than
+`FULL_REBUILD_RATIO` of the catalog changed, the model is fitted again.
+
+Build or update from the command line:
+    python -m db.similar_books [--full]
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlmodel import Session, select
+
+from config.settings import settings
+from db.database import get_engine
+from db.models import Book, Category
+
+SIMILAR_BOOKS_K = 20
+# Weight of each field in the term counts of a book
+FIELD_WEIGHTS = {"title": 2.0, "description": 1.0, "category": 3.0}
+# Terms kept in the vocabulary: in at least MIN_DF books and at most MAX_DF_RATIO of them
+MIN_DF = 2
+MAX_DF_RATIO = 0.5
+# Changed share of the catalog above which the model is fitted again
+FULL_REBUILD_RATIO = 0.2
+# Books scored at once (a dense block of BLOCK_ROWS x catalog size)
+BLOCK_ROWS = 256
+# Versions left on disk after a publish: the new one and the previous one
+KEPT_VERSIONS = 2
+# How often readers check the manifest for a new version
+RELOAD_CHECK_SECONDS = 1.0
+
+TOKEN_PATTERN = re.compile(r"[^\W\d_]{2,}")
+STOP_WORDS = frozenset("""
+    a about after again all also an and any are as at be been before being but by can could did do does
+    for from had has have he her here him his how if in into is it its just like more most my no not now
+    of on one only or other our out over she so some such than that the their them then there these they
+    this those through to too under up very was we were what when where which while who why will with
+    would you your
+""".split())
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase words of at least two letters, without stop words."""
+    return [token for token in TOKEN_PATTERN.findall((text or "").lower()) if token not in STOP_WORDS]
+
+
+def book_terms(title: str, description: Optional[str], category: Optional[str]) -> Dict[str, float]:
+    """Weighted term counts of a book; the category is one term of its own."""
+    terms: Counter = Counter()
+    for token in tokenize(title):
+        terms[token] += FIELD_WEIGHTS["title"]
+    for token in tokenize(description):
+        terms[token] += FIELD_WEIGHTS["description"]
+    if category:
+        terms[f"category:{category.lower()}"] += FIELD_WEIGHTS["category"]
+    return terms
+
+
+def text_hash(title: str, description: Optional[str], category: Optional[str]) -> int:
+    """64-bit hash of the indexed text of a book."""
+    text = "\x00".join((title or "", description or "", category or ""))
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+class SparseRows(NamedTuple):
+    """Row-compressed (CSR) sparse matrix: row i holds `data[indptr[i]:indptr[i + 1]]` at columns `indices[...]`."""
+
+    indptr: np.ndarray
+    indices: np.ndarray
+    data: np.ndarray
+
+    @property
+    def rows(self) -> int:
+        return len(self.indptr) - 1
+
+
+class TfidfModel:
+    """Vocabulary and IDF weights, fitted on the whole catalog."""
+
+    def __init__(self, vocabulary: Dict[str, int], idf: np.ndarray):
+        self.vocabulary = vocabulary
+        self.idf = idf
+
+    @classmethod
+    def fit(cls, documents: Sequence[Dict[str, float]]) -> "TfidfModel":
+        """Keep the terms within the document frequency bounds; smooth IDF as ln((1 + n) / (1 + df)) + 1."""
+        frequencies: Counter = Counter()
+        for terms in documents:
+            frequencies.update(terms.keys())
+        count = len(documents)
+        max_df = max(MIN_DF, MAX_DF_RATIO * count)
+        kept = sorted(term for term, df in frequencies.items() if MIN_DF <= df <= max_df)
+        df = np.array([frequencies[term] for term in kept], dtype=np.float64)
+        return cls({term: index for index, term in enumerate(kept)}, np.log((1 + count) / (1 + df)) + 1)
+
+    def transform(self, documents: Sequence[Dict[str, float]]) -> SparseRows:
+        """L2-normalized TF-IDF rows, with sublinear term frequencies (1 + ln(count))."""
+        indptr = np.zeros(len(documents) + 1, dtype=np.int64)
+        indices: List[int] = []
+        weights: List[float] = []
+        for row, terms in enumerate(documents):
+            known = [(self.vocabulary[term], count) for term, count in terms.items() if term in self.vocabulary]
+            known.sort()
+            indices.extend(index for index, _ in known)
+            weights.extend(count for _, count in known)
+            indptr[row + 1] = len(indices)
+        indices_array = np.array(indices, dtype=np.int64)
+        data = (1 + np.log(np.array(weights, dtype=np.float64))) * self.idf[indices_array]
+        row_of_entry = np.repeat(np.arange(len(documents)), np.diff(indptr))
+        norms = np.sqrt(np.bincount(row_of_entry, weights=data ** 2, minlength=len(documents)))
+        data /= norms[row_of_entry]
+        return SparseRows(indptr, indices_array, data)
+
+
+def _concat_ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Indices of the ranges [start, start + length), concatenated."""
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(lengths.sum())
+
+
+class SimilarityScorer:
+    """Cosine similarities of books with the whole catalog, through an inverted index of `matrix`."""
+
+    def __init__(self, matrix: SparseRows):
+        self.matrix = matrix
+        row_of_entry = np.repeat(np.arange(matrix.rows), np.diff(matrix.indptr))
+        order = np.argsort(matrix.indices, kind="stable")
+        self.posting_rows = row_of_entry[order]
+        self.posting_values = matrix.data[order]
+        self.posting_ptr = np.zeros(int(matrix.indices.max(initial=-1)) + 2, dtype=np.int64)
+        np.cumsum(np.bincount(matrix.indices, minlength=len(self.posting_ptr) - 1), out=self.posting_ptr[1:])
+
+    def block(self, rows: np.ndarray) -> np.ndarray:
+        """Dense `len(rows) x catalog` similarity matrix."""
+        matrix = self.matrix
+        count = matrix.rows
+        starts = matrix.indptr[rows]
+        lengths = matrix.indptr[rows + 1] - starts
+        entries = _concat_ranges(starts, lengths)
+        terms = matrix.indices[entries]
+        posting_lengths = self.posting_ptr[terms + 1] - self.posting_ptr[terms]
+        postings = _concat_ranges(self.posting_ptr[terms], posting_lengths)
+        local_rows = np.repeat(np.repeat(np.arange(len(rows)), lengths), posting_lengths)
+        weights = np.repeat(matrix.data[entries], posting_lengths) * self.posting_values[postings]
+        flat = local_rows * count + self.posting_rows[postings]
+        return np.bincount(flat, weights=weights, minlength=len(rows) * count).reshape(len(rows), count)
+
+    def blocks(self, rows: np.ndarray) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield (rows, similarities) in blocks of `BLOCK_ROWS`, a book's similarity with itself excluded."""
+        for start in range(0, len(rows), BLOCK_ROWS):
+            block_rows = rows[start:start + BLOCK_ROWS]
+            similarities = self.block(block_rows)
+            similarities[np.arange(len(block_rows)), block_rows] = 0.0
+            yield block_rows, similarities
+
+
+def top_k(candidates: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Best `k` candidates of each row by score, best first. Candidates with a
+    score <= 0 are dropped: their slots hold -1 and 0.
+    """
+    if scores.shape[1] > k:
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        candidates = np.take_along_axis(candidates, best, axis=1)
+        scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    candidates = np.take_along_axis(candidates, order, axis=1)
+    scores = np.take_along_axis(scores, order, axis=1)
+    if scores.shape[1] < k:
+        padding = k - scores.shape[1]
+        candidates = np.pad(candidates, ((0, 0), (0, padding)), constant_values=-1)
+        scores = np.pad(scores, ((0, 0), (0, padding)))
+    candidates = np.where(scores > 0, candidates, -1)
+    return candidates, np.where(scores > 0, scores, 0.0)
+
+
+class IndexVersion:
+    """Arrays of one published version (memory-mapped when loaded from disk)."""
+
+    ARRAYS = ("book_ids", "rows", "neighbors", "scores", "hashes", "idf")
+
+    def __init__(self, manifest: Dict[str, Any], vocabulary: Dict[str, int], **arrays: np.ndarray):
+        self.manifest = manifest
+        self.vocabulary = vocabulary
+        self.book_ids = arrays["book_ids"]  # sorted
+        self.rows = arrays["rows"]  # book_id -> row, -1 if absent
+        self.neighbors = arrays["neighbors"]  # row -> neighbour book IDs, best first, -1 padded
+        self.scores = arrays["scores"]
+        self.hashes = arrays["hashes"]
+        self.idf = arrays["idf"]
+
+    def row(self, book_id: int) -> int:
+        """Row of a book, -1 if it is not indexed."""
+        return int(self.rows[book_id]) if 0 <= book_id < len(self.rows) else -1
+
+
+class SimilarBooksIndex:
+    """Versioned top-K neighbour lists under `root`."""
+
+    def __init__(self, root: Path, k: int = SIMILAR_BOOKS_K):
+        self.root = Path(root)
+        self.k = k
+        self._version: Optional[IndexVersion] = None
+        self._manifest_mtime: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.root / "manifest.json"
+
+    def load(self) -> Optional[IndexVersion]:
+        """Return the published version, reloading it when the manifest changed (checked every few seconds)."""
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < RELOAD_CHECK_SECONDS:
+            return self._version
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = self.manifest_path.stat().st_mtime_ns
+            except FileNotFoundError:
+                self._version, self._manifest_mtime = None, None
+                return None
+            if mtime != self._manifest_mtime:
+                try:
+                    self._version = self._read_version()
+                except FileNotFoundError:
+                    # Published again between reading the manifest and opening its files: once more
+                    try:
+                        self._version = self._read_version()
+                    except FileNotFoundError:
+                        return self._version  # keep the loaded version, check again later
+                self._manifest_mtime = mtime
+        return self._version
+
+    def _read_version(self) -> IndexVersion:
+        """Map the files of the version named in the manifest."""
+        manifest = json.loads(self.manifest_path.read_text())
+        directory = self.root / manifest["version"]
+        return IndexVersion(
+            manifest,
+            json.loads((directory / "vocabulary.json").read_text()),
+            **{name: np.load(directory / f"{name}.npy", mmap_mode="r") for name in IndexVersion.ARRAYS},
+        )
+
+    def neighbors(self, book_id: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(neighbour book IDs, cosine similarities) of a book, best first; None if the book is not indexed."""
+        version = self.load()
+        if version is None:
+            return None
+        row = version.row(book_id)
+        if row < 0:
+            return None
+        ids, scores = version.neighbors[row], version.scores[row]
+        valid = ids >= 0
+        return np.asarray(ids[valid]), np.asarray(scores[valid])
+
+    def update(self, books: Sequence[Tuple[int, str, Optional[str], Optional[str]]], full: bool = False) -> Dict[str, Any]:
+        """
+        Bring the index up to date with `books` (id, title, description,
+        category name), scoring again only the books whose text changed unless
+        `full`. Returns the build stats (nothing is written if nothing changed).
+        """
+        start = time.perf_counter()
+        books = sorted(books)
+        book_ids = np.array([book[0] for book in books], dtype=np.int64)
+        hashes = np.array([text_hash(*book[1:]) for book in books], dtype=np.uint64)
+        documents = [book_terms(*book[1:]) for book in books]
+
+        previous = self.load()
+        changed = removed = None
+        if previous is not None and not full and previous.manifest.get("k") == self.k:
+            previous_rows = np.full(len(book_ids), -1, dtype=np.int64)
+            in_range = book_ids < len(previous.rows)
+            previous_rows[in_range] = previous.rows[book_ids[in_range]]
+            known = previous_rows >= 0
+            changed = ~known
+            changed[known] = previous.hashes[previous_rows[known]] != hashes[known]
+            removed = np.setdiff1d(previous.book_ids, book_ids)
+            if not changed.any() and not len(removed):
+                return {"mode": "unchanged", "books": len(books), "changed": 0, "removed": 0}
+            if changed.sum() + len(removed) > FULL_REBUILD_RATIO * max(len(books), 1):
+                changed = None
+
+        if changed is None:
+            model = TfidfModel.fit(documents)
+            scorer = SimilarityScorer(model.transform(documents))
+            neighbors, scores = self._score_rows(scorer, np.arange(len(books)))
+            stats = {"mode": "full", "changed": len(books), "removed": 0, "recomputed": 0}
+        else:
+            model = TfidfModel(previous.vocabulary, np.asarray(previous.idf))
+            scorer = SimilarityScorer(model.transform(documents))
+            neighbors, scores, recomputed = self._merge_changed(scorer, previous, book_ids, previous_rows, changed)
+            stats = {
+                "mode": "incremental", "changed": int(changed.sum()), "removed": len(removed), "recomputed": recomputed,
+            }
+
+        # Positions -> book IDs
+        neighbors = np.where(neighbors >= 0, book_ids[np.maximum(neighbors, 0)], -1)
+        stats.update(
+            books=len(books), vocabulary=len(model.vocabulary), seconds=round(time.perf_counter() - start, 3)
+        )
+        self._publish(book_ids, neighbors, scores.astype(np.float32), hashes, model, stats)
+        return stats
+
+    def _score_rows(self, scorer: SimilarityScorer, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-K neighbour positions and scores of `rows`."""
+        count = scorer.matrix.rows
+        neighbors = np.full((len(rows), self.k), -1, dtype=np.int64)
+        scores = np.zeros((len(rows), self.k))
+        done = 0
+        for block_rows, similarities in scorer.blocks(rows):
+            candidates = np.broadcast_to(np.arange(count), similarities.shape)
+            neighbors[done:done + len(block_rows)], scores[done:done + len(block_rows)] = top_k(
+                candidates, similarities, self.k
+            )
+            done += len(block_rows)
+        return neighbors, scores
+
+    def _merge_changed(
+        self,
+        scorer: SimilarityScorer,
+        previous: IndexVersion,
+        book_ids: np.ndarray,
+        previous_rows: np.ndarray,
+        changed: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Score the changed books against the catalog, and merge them into the
+        previous lists of the others. Returns positions, scores and the number
+        of unchanged books whose list had to be recomputed.
+        """
+        count, k = len(book_ids), self.k
+        changed_rows = np.flatnonzero(changed)
+
+        # Previous lists of every book, in current positions; changed/removed neighbours dropped
+        neighbors = np.full((count, k), -1, dtype=np.int64)
+        scores = np.zeros((count, k))
+        known = previous_rows >= 0
+        old_ids = np.asarray(previous.neighbors[previous_rows[known]])
+        positions = np.searchsorted(book_ids, old_ids)
+        found = (old_ids >= 0) & (positions < count) & (book_ids[np.minimum(positions, count - 1)] == old_ids)
+        keep = found & ~changed[np.minimum(positions, count - 1)]
+        neighbors[known] = np.where(keep, positions, -1)
+        scores[known] = np.where(keep, np.asarray(previous.scores[previous_rows[known]]), 0.0)
+        # A book outside a previous list scored at most its last score (0 if the list was not full)
+        threshold = np.zeros(count)
+        threshold[known] = np.asarray(previous.scores[previous_rows[known], k - 1], dtype=np.float64)
+
+        unchanged = np.flatnonzero(~changed)
+        for block_rows, similarities in scorer.blocks(changed_rows):
+            neighbors[block_rows], scores[block_rows] = top_k(
+                np.broadcast_to(np.arange(count), similarities.shape), similarities, k
+            )
+            # Similarity is symmetric: column j of the block scores book j against the changed books
+            candidates = np.concatenate(
+                [neighbors[unchanged], np.broadcast_to(block_rows, (len(unchanged), len(block_rows)))], axis=1
+            )
+            candidate_scores = np.concatenate([scores[unchanged], similarities[:, unchanged].T], axis=1)
+            neighbors[unchanged], scores[unchanged] = top_k(candidates, candidate_scores, k)
+
+        # Exact unless a list lost a neighbour that an unlisted book could replace
+        stale = np.flatnonzero(~changed & (threshold > 0) & (scores[:, k - 1] < threshold))
+        if len(stale):
+            neighbors[stale], scores[stale] = self._score_rows(scorer, stale)
+        return neighbors, scores, len(stale)
+
+    def _publish(
+        self,
+        book_ids: np.ndarray,
+        neighbors: np.ndarray,
+        scores: np.ndarray,
+        hashes: np.ndarray,
+        model: TfidfModel,
+        stats: Dict[str, Any],
+    ) -> None:
+        """
+        Write a new version directory, switch the manifest to it and remove the
+        older ones but the previous version, which readers that just read the
+        old manifest may still be opening.
+        """
+        version = datetime.now(timezone.utc).strftime("v%Y%m%dT%H%M%S%f")
+        directory = self.root / version
+        directory.mkdir(parents=True)
+        rows = np.full(int(book_ids.max(initial=-1)) + 1, -1, dtype=np.int32)
+        rows[book_ids] = np.arange(len(book_ids), dtype=np.int32)
+        arrays = {
+            "book_ids": book_ids, "rows": rows, "neighbors": neighbors, "scores": scores,
+            "hashes": hashes, "idf": model.idf,
+        }
+        for name, array in arrays.items():
+            np.save(directory / f"{name}.npy", array)
+        (directory / "vocabulary.json").write_text(json.dumps(model.vocabulary))
+
+        manifest = {"version": version, "k": self.k, "built_at": datetime.now(timezone.utc).isoformat(), **stats}
+        temporary = self.root / ".manifest.json.tmp"
+        temporary.write_text(json.dumps(manifest))
+        os.replace(temporary, self.manifest_path)
+        # Version names sort by build time. Readers may still map the old files:
+        # unlinking keeps their data until they let go
+        versions = sorted(entry for entry in self.root.iterdir() if entry.is_dir() and entry.name.startswith("v"))
+        for entry in versions[:-KEPT_VERSIONS]:
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+def load_book_texts() -> List[Tuple[int, str, Optional[str], Optional[str]]]:
+    """(id, title, description, category name) of every book."""
+    with Session(get_engine()) as session:
+        return [
+            tuple(row)
+            for row in session.exec(
+                select(Book.id, Book.title, Book.description, Category.name).join(Category, isouter=True)
+            )
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_similar_books_index() -> SimilarBooksIndex:
+    """Return the index under `SIMILAR_BOOKS_INDEX_DIR`."""
+    return SimilarBooksIndex(Path(settings.similar_books_index_dir))
+
+
+def update_similar_books_index(full: bool = False) -> Dict[str, Any]:
+    """Update the index from the `books` table; returns the build stats."""
+    return get_similar_books_index().update(load_book_texts(), full=full)
+
+
+if __name__ == "__main__":
+    print(json.dumps(update_similar_books_index(full="--full" in sys.argv[1:])))
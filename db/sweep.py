@@ -0,0 +1,31 @@
+"""
+Stored state read by sweep crawls (`scrapy crawl books -a mode=sweep`).
+
+A listing page shows the title, price including tax, whether the book is in
+stock and its rating. The spider compares them with these values to decide
+which detail pages it needs.
+"""
+
+from typing import Dict, Optional
+
+from sqlmodel import Session, select
+
+from db.database import get_engine
+from db.models import Book
+
+
+def load_listing_state() -> Dict[str, Optional[dict]]:
+    """
+    Return, per book title, the stored values a listing page shows.
+    Titles shared by several books map to None: a listing cannot tell them apart.
+    """
+    with Session(get_engine()) as session:
+        rows = session.exec(
+            select(Book.title, Book.upc, Book.price_incl_tax, Book.availability, Book.rating)
+        ).all()
+    state = {}
+    for title, upc, price_incl_tax, availability, rating in rows:
+        state[title] = None if title in state else {
+            "upc": upc, "price_incl_tax": price_incl_tax, "availability": availability, "rating": rating,
+        }
+    return state
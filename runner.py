@@ -3,16 +3,24 @@ Main entry point for the project.
 - Starts PostgreSQL via Docker if enabled
 - Waits for the DB to be ready
 - Initializes tables via SQLModel
-- Runs Scrapy spider via scheduler
-- Starts FastAPI server
+- Runs Scrapy spider via scheduler, in its own process
+- Starts FastAPI server (API_ENV: development or production)
+
+In production the API runs in pre-forked workers (one per core by default):
+gunicorn with uvicorn workers when gunicorn is installed (app preloaded in the
+master, `kill -HUP <master pid>` replaces the workers gracefully), otherwise
+`uvicorn --workers`. Each worker opens its own connection pool. The crawl
+scheduler never runs inside an API worker.
 """
 
+import importlib.util
+import os
 import subprocess
 import sys
 from pathlib import Path
+from typing import List
 from db.database import init_db, wait_for_postgres
 from config.settings import settings
-from scrapy_books.scheduler import start_scheduler
 
 # -----------------------------
 # Project paths
@@ -21,6 +29,66 @@ PROJECT_ROOT = Path(__file__).resolve().parent
 DOCKER_COMPOSE_FILE = PROJECT_ROOT / "docker-compose.yml"
 BACKEND_DIR = PROJECT_ROOT / "api"
 
+# Seconds the scheduler has to stop before it is killed
+SCHEDULER_STOP_TIMEOUT = 30
+
+
+# -----------------------------
+# API server command
+# -----------------------------
+def api_workers() -> int:
+    """Production worker count: API_WORKERS, or one per CPU core."""
+    return settings.api_workers or os.cpu_count() or 1
+
+
+def api_command() -> List[str]:
+    """Command line of the API server for API_ENV."""
+    if settings.api_env != "production":
+        return [
+            sys.executable, "-m", "uvicorn",
+            "api.main:app",
+            "--host", settings.api_host,
+            "--port", str(settings.api_port),
+            "--reload"
+        ]
+
+    max_requests = settings.api_max_requests
+    if importlib.util.find_spec("gunicorn") is not None:
+        # `uvicorn-worker` package, or the class still shipped with uvicorn
+        worker_class = (
+            "uvicorn_worker.UvicornWorker"
+            if importlib.util.find_spec("uvicorn_worker") is not None
+            else "uvicorn.workers.UvicornWorker"
+        )
+        command = [
+            sys.executable, "-m", "gunicorn",
+            "api.main:app",
+            "--worker-class", worker_class,
+            "--workers", str(api_workers()),
+            "--bind", f"{settings.api_host}:{settings.api_port}",
+            "--preload",
+            "--graceful-timeout", str(settings.api_graceful_timeout),
+            # Workers warm up before their first heartbeat: give them the warm-up time
+            "--timeout", str(int(settings.api_warmup_timeout_seconds) + 30),
+        ]
+        if max_requests:
+            command += ["--max-requests", str(max_requests), "--max-requests-jitter", str(max(1, max_requests // 10))]
+        return command
+
+    print("[WARNING] API_ENV=production but `gunicorn` is not installed. Using uvicorn --workers (no preloading).")
+    command = [
+        sys.executable, "-m", "uvicorn",
+        "api.main:app",
+        "--host", settings.api_host,
+        "--port", str(settings.api_port),
+        "--workers", str(api_workers()),
+        "--timeout-graceful-shutdown", str(settings.api_graceful_timeout),
+    ]
+    if max_requests:
+        command += ["--limit-max-requests", str(max_requests), "--limit-max-requests-jitter", str(max(1, max_requests // 10))]
+    return command
+
+
 # -----------------------------
 # Optional: Load secrets from Azure Key Vault
 # -----------------------------
@@ -52,27 +120,34 @@ print("✅ Database tables created successfully!")
 # -----------------------------
 # Run Scrapy crawl via scheduler if enabled
 # -----------------------------
+# A separate process: crawls neither block the API start nor share its workers
+scheduler_process = None
 if settings.run_scrapy:
-    print("[INFO] Starting Scrapy scheduler...")
-    start_scheduler()
+    print("[INFO] Starting Scrapy scheduler in a dedicated process...")
+    scheduler_process = subprocess.Popen(
+        [sys.executable, "-m", "scrapy_books.scheduler"],
+        cwd=PROJECT_ROOT
+    )
 else:
     print("[INFO] Skipping Scrapy crawl.")
 
 # -----------------------------
 # Start FastAPI server if enabled
 # -----------------------------
-if settings.run_api:
-    print("[INFO] Starting FastAPI server...")
-    subprocess.run(
-        [
-            sys.executable, "-m", "uvicorn",
-            "api.main:app",
-            "--host", "127.0.0.1",
-            "--port", "8000",
-            "--reload"
-        ],
-        cwd=PROJECT_ROOT,
-        check=True
-    )
-else:
-    print("[INFO] Skipping FastAPI server.")
+try:
+    if settings.run_api:
+        print(f"[INFO] Starting FastAPI server ({settings.api_env})...")
+        subprocess.run(api_command(), cwd=PROJECT_ROOT, check=True)
+    else:
+        print("[INFO] Skipping FastAPI server.")
+        if scheduler_process is not None:
+            scheduler_process.wait()
+except KeyboardInterrupt:
+    print("[INFO] Stopping...")
+finally:
+    if scheduler_process is not None and scheduler_process.poll() is None:
+        scheduler_process.terminate()
+        try:
+            scheduler_process.wait(timeout=SCHEDULER_STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            scheduler_process.kill()
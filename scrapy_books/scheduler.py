@@ -1,12 +1,19 @@
 """
 Scheduler module to run the Scrapy books spider periodically
 using APScheduler.
+
+`runner.py` starts it in a dedicated process, away from the API workers:
+    python -m scrapy_books.scheduler
+(intervals from CRAWL_INTERVAL_MINUTES and SWEEP_INTERVAL_MINUTES).
 """
 
 import logging
 import subprocess
+import threading
 from pathlib import Path
+from typing import Optional
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.blocking import BlockingScheduler
 
 # Logging setup
 LOG_DIR = Path(__file__).resolve().parent.parent / "logs"
@@ -27,12 +34,16 @@ logger = logging.getLogger(__name__)
 PROJECT_ROOT = Path(__file__).resolve().parent
 SCRAPY_DIR = PROJECT_ROOT
 
+# Held while a spider runs: a full crawl and a sweep must never overlap (both
+# archive snapshots, write rollups and publish the similar books index at the end)
+CRAWL_LOCK = threading.Lock()
+
 # Spider runner
-def run_spider():
-    """Launch the Scrapy 'books' spider via subprocess."""
+def run_spider(mode: str = "full"):
+    """Launch the Scrapy 'books' spider via subprocess (`mode`: "full" or "sweep")."""
     try:
-        logger.info("Running Scrapy spider...")
-        subprocess.run(["scrapy", "crawl", "books"], cwd=SCRAPY_DIR, check=True)
+        logger.info("Running Scrapy spider (%s)...", mode)
+        subprocess.run(["scrapy", "crawl", "books", "-a", f"mode={mode}"], cwd=SCRAPY_DIR, check=True)
         logger.info("Scrapy spider finished successfully.")
     except subprocess.CalledProcessError as e:
         logger.error("Scrapy spider failed: %s", e)  # lazy formatting for Pylint
@@ -41,15 +52,35 @@ def run_spider():
 def run_spider_job():
     """Job wrapper for scheduler to run the spider."""
     logger.info("Scheduler triggered: starting spider job...")
-    run_spider()
+    with CRAWL_LOCK:  # waits for a running sweep
+        run_spider()
     logger.info("Spider job finished.")
 
-def start_scheduler(test_interval_minutes: int = 15):
+def run_sweep_job():
+    """Job wrapper for scheduler to run a listing-only price sweep."""
+    logger.info("Scheduler triggered: starting sweep job...")
+    if not CRAWL_LOCK.acquire(blocking=False):
+        logger.info("Sweep skipped: a crawl is running.")
+        return
+    try:
+        run_spider(mode="sweep")
+    finally:
+        CRAWL_LOCK.release()
+    logger.info("Sweep job finished.")
+
+def start_scheduler(
+    test_interval_minutes: int = 15, sweep_interval_minutes: Optional[int] = None, blocking: bool = False
+):
     """Start APScheduler to run the spider periodically.
     For testing, the interval is set to every `test_interval_minutes` minutes.
     In production, consider setting this to every few hours or daily.
+    With `sweep_interval_minutes`, listing-only sweeps (~5% of the requests of
+    a full crawl) also run in between, e.g. hourly. Runs never overlap: a
+    sweep due while a crawl runs is skipped, a crawl waits for a running sweep.
+    With `blocking`, the scheduler runs in the calling thread until the process stops
+    (dedicated scheduler process); otherwise in a background thread.
     """
-    scheduler = BackgroundScheduler()
+    scheduler = BlockingScheduler() if blocking else BackgroundScheduler()
 
     # First run immediately
     run_spider_job()
@@ -59,9 +90,41 @@ def start_scheduler(test_interval_minutes: int = 15):
         run_spider_job,
         trigger='interval',
         minutes=test_interval_minutes,
-        id='books_spider'
+        id='books_spider',
+        max_instances=1,
+        coalesce=True
     )
     logger.info("Scheduler set to run every %d minutes for testing.", test_interval_minutes)
 
-    scheduler.start()
-    logger.info("APScheduler started. Spider will run automatically in the background.")
+    if sweep_interval_minutes:
+        scheduler.add_job(
+            run_sweep_job,
+            trigger='interval',
+            minutes=sweep_interval_minutes,
+            id='books_sweep',
+            max_instances=1,
+            coalesce=True
+        )
+        logger.info("Price sweeps scheduled every %d minutes.", sweep_interval_minutes)
+
+    if blocking:
+        logger.info("APScheduler started. Spider will run automatically until the process stops.")
+        scheduler.start()
+    else:
+        scheduler.start()
+        logger.info("APScheduler started. Spider will run automatically in the background.")
+
+
+if __name__ == "__main__":
+    # pylint: disable=import-outside-toplevel
+    import signal
+    import sys
+
+    from config.settings import settings
+
+    # Stop on SIGTERM (sent by runner.py) like on Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        start_scheduler(settings.crawl_interval_minutes, settings.sweep_interval_minutes, blocking=True)
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("Scheduler stopped.")
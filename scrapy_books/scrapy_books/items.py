@@ -19,3 +19,5 @@ class ScrapyBooksItem(scrapy.Item):
     category = scrapy.Field()
     description = scrapy.Field()
     image_url = scrapy.Field()
+    # Sweep mode: book whose listing matches the stored values (only counted as seen)
+    listing_only = scrapy.Field()
@@ -0,0 +1,80 @@
+"""
+Process pool for CPU-bound extraction, used by the spider's `parse_workers` mode.
+
+Scrapy runs every callback on the reactor thread, so once downloads are fast
+(local HTTP cache, stand-in server) HTML parsing and text cleaning become the
+bottleneck. `OrderedParsePool` sends that work to worker processes and gives
+the results back to the callbacks:
+- in the order the callbacks submitted them (a result waits for the ones
+  before it), so items reach the pipeline in response order;
+- with backpressure: at most `max_pending` submissions are in flight or
+  waiting for their turn. Further callbacks wait for a slot, and Scrapy stops
+  downloading while its callbacks are busy (`SCRAPER_SLOT_MAX_ACTIVE_SIZE`).
+A callback cancelled while waiting for its turn (spider closing, timeout)
+gives its turn up, so the submissions after it are still released.
+
+Requires the asyncio reactor (Scrapy's default, set in settings.py).
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set
+
+
+class OrderedParsePool:
+    """Bounded process pool releasing results in submission order."""
+
+    def __init__(self, workers: int, max_pending: Optional[int] = None):
+        self.workers = workers
+        self.max_pending = max_pending or workers * 4
+        # "spawn": forking the reactor process (and its threads) is unsafe
+        self.executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        self.submitted = 0
+        self.released = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._turns: Dict[int, asyncio.Future] = {}
+        self._abandoned: Set[int] = set()
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Run `func(*args)` in a worker; return (or raise) once every earlier submission was released."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        async with self._slots:
+            sequence = self.submitted
+            self.submitted += 1
+            try:
+                return await asyncio.wrap_future(self.executor.submit(func, *args))
+            finally:
+                try:
+                    await self._wait_turn(sequence)
+                except asyncio.CancelledError:
+                    self._abandon(sequence)
+                    raise
+                self._release()
+
+    async def _wait_turn(self, sequence: int) -> None:
+        if sequence != self.released:
+            turn = self._turns[sequence] = asyncio.get_running_loop().create_future()
+            await turn
+
+    def _abandon(self, sequence: int) -> None:
+        """Give up the turn of a cancelled submission: it is skipped once the earlier ones are released."""
+        self._turns.pop(sequence, None)
+        if sequence == self.released:  # its turn had already come
+            self._release()
+        else:
+            self._abandoned.add(sequence)
+
+    def _release(self) -> None:
+        self.released += 1
+        while self.released in self._abandoned:
+            self._abandoned.remove(self.released)
+            self.released += 1
+        turn = self._turns.pop(self.released, None)
+        if turn is not None:
+            turn.set_result(None)
+
+    def close(self) -> None:
+        """Stop the workers (pending work is cancelled)."""
+        self.executor.shutdown(wait=True, cancel_futures=True)
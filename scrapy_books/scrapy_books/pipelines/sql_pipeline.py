@@ -2,46 +2,118 @@
 import sys
 from pathlib import Path
 from datetime import datetime, timezone
+from typing import Optional
 from sqlmodel import Session, select
+from sqlalchemy import Float, Integer, any_, bindparam, delete, func, insert, literal
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import SQLAlchemyError
 
 # Add project root to PYTHONPATH
 project_root = Path(__file__).resolve().parents[3]
 if str(project_root) not in sys.path:
     sys.path.append(str(project_root))
 
-from db.models import Book, BookSnapshot, Category, ProductType, Tax
-from db.database import engine
+from db.models import Book, BookSnapshot, Category, ProductType, Tax, CrawlRun, CrawlRollup
+from db.database import get_engine
+from db.archive import ARCHIVE_COLUMNS, get_snapshot_archive
+from db.notifications import notify
+from db.crawl_lock import acquire_crawl_lock, release_crawl_lock
 
 
 class SQLPipeline:
     """
-    Scrapy pipeline to store books in DB, create historical snapshots,
-    and purge oldest snapshots beyond MAX_SNAPSHOTS_TO_KEEP.
+    Scrapy pipeline to store books in DB and create historical snapshots.
+    Records a CrawlRun when the spider closes, which bumps the data generation
+    used by the API response cache, and moves snapshots beyond
+    MAX_SNAPSHOTS_TO_KEEP to the Parquet archive (`db.archive`).
+    Created and changed books are announced with NOTIFY (`db.notifications`),
+    in batches of NOTIFY_BATCH_SIZE events and at crawl end.
+    The crawl holds the advisory lock of `db.crawl_lock` until it is recorded,
+    so the API does not cache partial data.
     """
 
-    MAX_SNAPSHOTS_TO_KEEP = 5  # Keep latest 5 snapshots per book
+    MAX_SNAPSHOTS_TO_KEEP = 5  # Latest 5 snapshots per book stay in Postgres (hot window)
+    NOTIFY_BATCH_SIZE = 100
+    # Changes of these fields are reported in `book` events
+    TRACKED_FIELDS = ("price_incl_tax", "availability", "rating")
 
     def __init__(self):
         self.seen_upcs = set()
         self.categories_cache = {}
         self.product_types_cache = {}
         self.taxes_cache = {}
+        self.reference_loaded = False
+        self.pending_events = []
+        self.books_created = 0
+        self.started_at = datetime.now(timezone.utc)
+        self.crawl_lock = None
 
-        # Preload categories, product types, taxes for caching
-        with Session(engine) as session:
-            for cat in session.exec(select(Category)).all():
-                self.categories_cache[cat.name] = cat.id
-            for ptype in session.exec(select(ProductType)).all():
-                self.product_types_cache[ptype.type_name] = ptype.id
-            for tax in session.exec(select(Tax)).all():
-                self.taxes_cache[tax.amount] = tax.id
+    def open_spider(self, spider):
+        """Remember when the crawl started and mark it in progress."""
+        self.started_at = datetime.now(timezone.utc)
+        try:
+            self.crawl_lock = acquire_crawl_lock()
+        except SQLAlchemyError as exc:
+            spider.logger.warning(f"Crawl not marked in progress, API responses may be cached mid-crawl: {exc}")
+
+    def close_spider(self, spider):
+        """
+        Record the finished crawl with its category/product type rollups and
+        archive the snapshots that left the hot window, in one transaction.
+        Committing the CrawlRun invalidates the API response caches and
+        delivers the last book events with a `crawl` event, so the similar
+        books index is updated first. The crawl is no longer marked in
+        progress once recorded (or failed).
+        """
+        try:
+            self._update_similar_books(spider)
+            self._record_crawl(spider)
+        finally:
+            release_crawl_lock(self.crawl_lock)
+            self.crawl_lock = None
+
+    def _record_crawl(self, spider):
+        """Insert the CrawlRun and its rollups, archive old snapshots and send the last events (one commit)."""
+        with Session(get_engine()) as session:
+            crawl = CrawlRun(started_at=self.started_at, items_processed=len(self.seen_upcs))
+            session.add(crawl)
+            session.flush()
+            self._write_rollups(session, crawl.id)
+            archived, paths = self._archive_old_snapshots(session)
+            notify(session, self.pending_events + [{
+                "type": "crawl", "crawl_id": crawl.id, "items_processed": crawl.items_processed, "archived": archived,
+            }])
+            self.pending_events = []
+            try:
+                session.commit()
+            except SQLAlchemyError:
+                # The rows are still in Postgres: drop their copies
+                for path in paths:
+                    path.unlink(missing_ok=True)
+                raise
+        spider.logger.info(f"Crawl recorded: {len(self.seen_upcs)} books processed, {archived} snapshots archived")
+
+    def _update_similar_books(self, spider) -> None:
+        """Rescore the books whose text changed; a failure is logged, the crawl is still recorded."""
+        if getattr(spider, "mode", "full") == "sweep" and not self.books_created:
+            return  # sweeps only change the text of the books they create
+        # NumPy is only needed here: keep it out of the spider's startup
+        from db.similar_books import update_similar_books_index  # pylint: disable=import-outside-toplevel
+
+        try:
+            stats = update_similar_books_index()
+        except (SQLAlchemyError, OSError, ValueError) as exc:
+            spider.logger.warning(f"Similar books index not updated: {exc}")
+            return
+        spider.logger.info(f"Similar books index: {stats}")
 
     def process_item(self, item, spider):
         """
         Process a single book item:
         - Skip if UPC missing or already seen in this run
         - Create/update Book and BookSnapshot
-        - Purge old snapshots beyond MAX_SNAPSHOTS_TO_KEEP
+        Listing-only items (sweep mode: books whose listing is unchanged) are
+        only counted as seen, without a query.
         """
         upc = item.get("upc")
         if not upc:
@@ -52,25 +124,143 @@ class SQLPipeline:
             spider.logger.info(f"Duplicate UPC in current run skipped: {upc}")
             return item
 
-        with Session(engine) as session:
+        if item.get("listing_only"):
+            self.seen_upcs.add(upc)
+            return item
+
+        with Session(get_engine()) as session:
+            if not self.reference_loaded:
+                self._load_reference_data(session)
             category_id = self._get_or_create_category(session, item.get("category", "Unknown"))
             product_type_id = self._get_or_create_product_type(session, item.get("product_type", "Unknown"))
             tax_id = self._get_or_create_tax(session, item.get("tax", 0.0))
 
             existing_book = session.exec(select(Book).where(Book.upc == upc)).first()
             if existing_book:
+                before = self._tracked_values(existing_book)
                 self._update_book_with_snapshot(session, existing_book, item, category_id, product_type_id, tax_id)
+                event = self._book_event("updated", existing_book, before)
             else:
-                self._create_new_book(session, item, upc, category_id, product_type_id, tax_id)
+                book = self._create_new_book(session, item, upc, category_id, product_type_id, tax_id)
+                event = self._book_event("created", book)
 
             session.commit()
+            if not existing_book:
+                self.books_created += 1
             self.seen_upcs.add(upc)
+            self._queue_event(session, event)
 
         return item
 
     # -----------------------------
     # Helper Methods
     # -----------------------------
+    def _load_reference_data(self, session: Session):
+        """
+        Preload categories, product types, taxes for caching.
+        Done on the first item rather than at construction, so that starting
+        a spider does not wait for the database.
+        """
+        for cat in session.exec(select(Category)).all():
+            self.categories_cache[cat.name] = cat.id
+        for ptype in session.exec(select(ProductType)).all():
+            self.product_types_cache[ptype.type_name] = ptype.id
+        for tax in session.exec(select(Tax)).all():
+            self.taxes_cache[tax.amount] = tax.id
+        self.reference_loaded = True
+
+    def _write_rollups(self, session: Session, crawl_id: int):
+        """Aggregate the books table per category and per product type (INSERT ... SELECT)."""
+        dimensions = [
+            ("category", Category.id, Category.name, Book.category_id),
+            ("product_type", ProductType.id, ProductType.type_name, Book.product_type_id),
+        ]
+        for dimension, dim_id, dim_name, foreign_key in dimensions:
+            rollup = (
+                select(
+                    literal(crawl_id),
+                    literal(dimension),
+                    dim_id,
+                    dim_name,
+                    func.count(Book.id),
+                    func.avg(Book.price_incl_tax),
+                    func.min(Book.price_incl_tax),
+                    func.max(Book.price_incl_tax),
+                    func.avg(Book.rating).cast(Float),
+                    func.sum(Book.availability),
+                )
+                .join(Book, foreign_key == dim_id)
+                .group_by(dim_id, dim_name)
+            )
+            session.exec(
+                insert(CrawlRollup).from_select(
+                    [
+                        "crawl_id", "dimension", "dimension_id", "dimension_name",
+                        "book_count", "avg_price", "min_price", "max_price",
+                        "avg_rating", "total_stock",
+                    ],
+                    rollup,
+                )
+            )
+
+    def _tracked_values(self, book: Book) -> tuple:
+        return tuple(getattr(book, field) for field in self.TRACKED_FIELDS)
+
+    def _book_event(self, action: str, book: Book, before: Optional[tuple] = None) -> Optional[dict]:
+        """Build a `book` event (None for an update that changed no tracked field)."""
+        changes = {}
+        if before is not None:
+            changes = {
+                field: [old, getattr(book, field)]
+                for field, old in zip(self.TRACKED_FIELDS, before)
+                if old != getattr(book, field)
+            }
+            if not changes:
+                return None
+        return {
+            "type": "book", "action": action, "book_id": book.id, "category_id": book.category_id,
+            "title": book.title, "changes": changes,
+        }
+
+    def _queue_event(self, session: Session, event: Optional[dict]):
+        """
+        Queue the event of a committed item. Once the queue holds NOTIFY_BATCH_SIZE
+        events, send it with NOTIFY in its own transaction; the queue is cleared
+        only when that commit succeeds, so a failure keeps the events for later.
+        """
+        if event is not None:
+            self.pending_events.append(event)
+        if len(self.pending_events) < self.NOTIFY_BATCH_SIZE:
+            return
+        notify(session, self.pending_events)
+        session.commit()
+        self.pending_events = []
+
+    def _archive_old_snapshots(self, session: Session):
+        """
+        Write the snapshots beyond MAX_SNAPSHOTS_TO_KEEP per book to the archive
+        and delete them (one read, one DELETE). Returns (count, written files).
+        """
+        rank = func.row_number().over(
+            partition_by=BookSnapshot.book_id,
+            order_by=(BookSnapshot.scraped_at.desc(), BookSnapshot.id.desc()),
+        )
+        ranked = select(*(getattr(BookSnapshot, column) for column in ARCHIVE_COLUMNS), rank.label("rank")).subquery()
+        rows = session.exec(
+            select(*(ranked.c[column] for column in ARCHIVE_COLUMNS))
+            .where(ranked.c.rank > self.MAX_SNAPSHOTS_TO_KEEP)
+            .order_by(ranked.c.id)
+        ).all()
+        if not rows:
+            return 0, []
+
+        paths = get_snapshot_archive().write(rows)
+        ids = [row[0] for row in rows]
+        session.exec(
+            delete(BookSnapshot).where(BookSnapshot.id == any_(bindparam("ids", ids, type_=ARRAY(Integer))))
+        )
+        return len(rows), paths
+
     def _get_or_create_category(self, session: Session, name: str) -> int:
         if name in self.categories_cache:
             return self.categories_cache[name]
@@ -98,8 +288,8 @@ class SQLPipeline:
         self.taxes_cache[amount] = tax.id
         return tax.id
 
-    def _update_book_with_snapshot(self, session: Session, book: Book, item: dict, category_id: int, product_type_id: int, tax_id: int):
-        # Create snapshot with latest data
+    def _add_snapshot(self, session: Session, book: Book):
+        """Snapshot the current values of `book` (archived at the end of the crawl once old enough)."""
         snapshot = BookSnapshot(
             book_id=book.id,
             scraped_at=datetime.now(timezone.utc),
@@ -112,6 +302,10 @@ class SQLPipeline:
         )
         session.add(snapshot)
 
+    def _update_book_with_snapshot(self, session: Session, book: Book, item: dict, category_id: int, product_type_id: int, tax_id: int):
+        # Create snapshot with latest data
+        self._add_snapshot(session, book)
+
         # Update main book
         book.title = item.get("title", book.title)
         book.price_excl_tax = item.get("price_excl_tax", book.price_excl_tax)
@@ -125,15 +319,6 @@ class SQLPipeline:
         book.product_type_id = product_type_id
         book.tax_id = tax_id
 
-        # Purge old snapshots
-        snapshots = session.exec(
-            select(BookSnapshot)
-            .where(BookSnapshot.book_id == book.id)
-            .order_by(BookSnapshot.scraped_at.desc())
-        ).all()
-        for old_snap in snapshots[self.MAX_SNAPSHOTS_TO_KEEP:]:
-            session.delete(old_snap)
-
     def _create_new_book(self, session: Session, item: dict, upc: str, category_id: int, product_type_id: int, tax_id: int):
         book = Book(
             title=item.get("title", "Unknown"),
@@ -150,3 +335,5 @@ class SQLPipeline:
             image_url=item.get("image_url"),
         )
         session.add(book)
+        session.flush()  # assigns the ID, used by the `created` event
+        return book
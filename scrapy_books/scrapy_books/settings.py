@@ -28,6 +28,9 @@ AUTOTHROTTLE_MAX_DELAY = 5
 AUTOTHROTTLE_TARGET_CONCURRENCY = 2.0
 AUTOTHROTTLE_DEBUG = False
 
+# Scrapy's default, required by the `parse_workers` mode (callbacks await worker results)
+TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
+
 FEED_EXPORT_ENCODING = "utf-8"
 DOWNLOAD_TIMEOUT = 15
 RETRY_ENABLED = True
@@ -1,13 +1,26 @@
 """
 Spider for scraping books from books.toscrape.com.
 Includes data cleaning functions for price, availability, and description.
+
+Two modes (`scrapy crawl books -a mode=sweep`):
+- `full` (default): every detail page is fetched (~1,050 requests).
+- `sweep`: only listing pages are fetched (~50 requests). Their price, stock
+  status and rating are compared with the stored books; detail pages are
+  fetched only for unknown books, titles shared by several books and books
+  whose listing data changed.
+
+`-a parse_workers=N` extracts detail pages in N worker processes instead of
+the reactor thread (see `scrapy_books.parse_pool`); items still reach the
+pipeline in response order.
 """
 
 import re
 import scrapy
 from scrapy.loader import ItemLoader
 from itemloaders.processors import TakeFirst, MapCompose, Join
+from scrapy.http import HtmlResponse
 from scrapy_books.items import ScrapyBooksItem
+from scrapy_books.parse_pool import OrderedParsePool
 
 
 # --- Data cleaning functions ---
@@ -34,58 +47,130 @@ def clean_description(value: str) -> str:
     return value
 
 
+RATING_MAP = {"One": 1, "Two": 2, "Three": 3, "Four": 4, "Five": 5}
+
+
+# --- Extraction ---
+def load_book(response) -> ScrapyBooksItem:
+    """Extract and clean a book from its detail page using ItemLoader."""
+    loader = ItemLoader(item=ScrapyBooksItem(), response=response)
+    loader.default_output_processor = TakeFirst()
+
+    # UPC
+    upc = response.css("table.table-striped tr:nth-child(1) td::text").get()
+    loader.add_value("upc", upc)
+
+    # Simple fields
+    loader.add_css("title", "h1::text")
+    loader.add_css("product_type", "table.table-striped tr:nth-child(2) td::text")
+    loader.add_css("price_excl_tax", "table.table-striped tr:nth-child(3) td::text", MapCompose(clean_price))
+    loader.add_css("price_incl_tax", "table.table-striped tr:nth-child(4) td::text", MapCompose(clean_price))
+    loader.add_css("tax", "table.table-striped tr:nth-child(5) td::text", MapCompose(clean_price))
+    loader.add_css("availability", "table.table-striped tr:nth-child(6) td::text", MapCompose(clean_availability))
+    loader.add_css("number_of_reviews", "table.table-striped tr:nth-child(7) td::text", MapCompose(int))
+
+    # Rating
+    rating_class = response.css("p.star-rating").attrib.get("class", "").split()[-1]
+    loader.add_value("rating", RATING_MAP.get(rating_class, 0))
+
+    # Category
+    breadcrumb = response.css("ul.breadcrumb li a::text").getall()
+    loader.add_value("category", breadcrumb[-1].strip() if len(breadcrumb) >= 3 else "Unknown")
+
+    # Description
+    desc = response.css("#product_description + p::text").getall()
+    loader.add_value("description", desc, MapCompose(clean_description), Join(" "))
+
+    # Image URL
+    image_rel = response.css("div.carousel-inner img::attr(src), div.thumbnail img::attr(src)").get()
+    loader.add_value("image_url", response.urljoin(image_rel) if image_rel else None)
+
+    return loader.load_item()
+
+
+def extract_book(url: str, body: bytes, encoding: str) -> dict:
+    """Process-pool entry point: `load_book` on a raw page, as a picklable dict."""
+    return dict(load_book(HtmlResponse(url=url, body=body, encoding=encoding)))
+
+
 # --- Spider ---
 class BooksSpider(scrapy.Spider):
     """Scrapy spider for books.toscrape.com."""
     name = "books"
     allowed_domains = ["books.toscrape.com"]
     start_urls = ["https://books.toscrape.com"]
+    modes = ("full", "sweep")
+
+    def __init__(self, mode: str = "full", parse_workers: int = 0, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if mode not in self.modes:
+            raise ValueError(f"Unknown mode {mode!r}, expected one of {self.modes}")
+        self.mode = mode
+        self.known_books = None  # sweep mode: title -> stored listing values, loaded on the first page
+        parse_workers = int(parse_workers)
+        self.parse_pool = OrderedParsePool(parse_workers) if parse_workers > 0 else None
+        self.book_callback = self.parse_book if self.parse_pool is None else self.parse_book_offloaded
 
     def parse(self, response):
-        """Parse book list page and follow links to detail pages."""
+        """Parse book list page and follow links to detail pages (or sweep it)."""
         for book in response.css("article.product_pod"):
             link = book.css("h3 a::attr(href)").get()
-            if link:
-                yield response.follow(link, callback=self.parse_book)
+            if not link:
+                continue
+            if self.mode == "sweep":
+                item = self.parse_listing(book)
+                if item is not None:
+                    yield item
+                    continue
+            yield response.follow(link, callback=self.book_callback)
 
         # Pagination
         next_page = response.css("li.next a::attr(href)").get()
         if next_page:
             yield response.follow(next_page, callback=self.parse)
 
+    def parse_listing(self, book):
+        """
+        Build a listing-only item from a `product_pod` when its listing values
+        (price incl. tax, in stock or not, rating) match the stored ones, or
+        return None when the detail page is needed: unknown book, ambiguous
+        title or changed values.
+        """
+        if self.known_books is None:
+            # The database is only needed in sweep mode
+            # (the project root is on sys.path once the pipeline is loaded)
+            from db.sweep import load_listing_state  # pylint: disable=import-outside-toplevel
+            self.known_books = load_listing_state()
+            self.logger.info(f"Sweep: {len(self.known_books)} stored books loaded")
+
+        title = book.css("h3 a::attr(title)").get()
+        stored = self.known_books.get(title)
+        if stored is None:
+            return None
+
+        price = clean_price(book.css("p.price_color::text").get())
+        in_stock = "in stock" in " ".join(book.css("p.availability::text").getall()).lower()
+        rating = RATING_MAP.get(book.css("p.star-rating").attrib.get("class", "").split()[-1], 0)
+        listed = (round(price, 2), in_stock, rating)
+        if listed != (round(stored["price_incl_tax"], 2), stored["availability"] > 0, stored["rating"]):
+            return None
+
+        item = ScrapyBooksItem()
+        item["upc"] = stored["upc"]
+        item["title"] = title
+        item["listing_only"] = True
+        return item
+
     def parse_book(self, response):
         """Parse book detail page and clean data using ItemLoader."""
-        loader = ItemLoader(item=ScrapyBooksItem(), response=response)
-        loader.default_output_processor = TakeFirst()
-
-        # UPC
-        upc = response.css("table.table-striped tr:nth-child(1) td::text").get()
-        loader.add_value("upc", upc)
-
-        # Simple fields
-        loader.add_css("title", "h1::text")
-        loader.add_css("product_type", "table.table-striped tr:nth-child(2) td::text")
-        loader.add_css("price_excl_tax", "table.table-striped tr:nth-child(3) td::text", MapCompose(clean_price))
-        loader.add_css("price_incl_tax", "table.table-striped tr:nth-child(4) td::text", MapCompose(clean_price))
-        loader.add_css("tax", "table.table-striped tr:nth-child(5) td::text", MapCompose(clean_price))
-        loader.add_css("availability", "table.table-striped tr:nth-child(6) td::text", MapCompose(clean_availability))
-        loader.add_css("number_of_reviews", "table.table-striped tr:nth-child(7) td::text", MapCompose(int))
-
-        # Rating
-        rating_class = response.css("p.star-rating").attrib.get("class", "").split()[-1]
-        rating_map = {"One": 1, "Two": 2, "Three": 3, "Four": 4, "Five": 5}
-        loader.add_value("rating", rating_map.get(rating_class, 0))
-
-        # Category
-        breadcrumb = response.css("ul.breadcrumb li a::text").getall()
-        loader.add_value("category", breadcrumb[-1].strip() if len(breadcrumb) >= 3 else "Unknown")
-
-        # Description
-        desc = response.css("#product_description + p::text").getall()
-        loader.add_value("description", desc, MapCompose(clean_description), Join(" "))
-
-        # Image URL
-        image_rel = response.css("div.carousel-inner img::attr(src), div.thumbnail img::attr(src)").get()
-        loader.add_value("image_url", response.urljoin(image_rel) if image_rel else None)
-
-        yield loader.load_item()
+        yield load_book(response)
+
+    async def parse_book_offloaded(self, response):
+        """`parse_book` run in the process pool (`parse_workers` mode)."""
+        fields = await self.parse_pool.run(extract_book, response.url, response.body, response.encoding)
+        yield ScrapyBooksItem(**fields)
+
+    def closed(self, reason):
+        """Stop the parsing workers."""
+        if self.parse_pool is not None:
+            self.parse_pool.close()